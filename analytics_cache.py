@@ -0,0 +1,364 @@
+"""
+Local Columnar Analytics Cache
+Mirrors finished snapshots from SQL Server into Parquet files partitioned by snapshot
+date (analytics_cache/snapshot_date=2025-01-31/snapshot-42.parquet) and answers the
+utils lookups from them, so analysts' repeated queries never reach the production
+database. Syncs are incremental: only snapshots above the stored watermark are copied.
+
+Lookups never sync and never load the whole history: they read only the files of the
+snapshots they need (picked from the manifest), and history lookups stream the files
+through a pyarrow dataset scan with the filter pushed down. The cache is brought up to
+date by the daemon after its runs (see sync_if_due) or from the command line.
+
+Usage:
+    python analytics_cache.py sync      # copy new snapshots
+    python analytics_cache.py rebuild   # drop the cache and copy everything again
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import argparse
+import threading
+import pandas as pd
+from datetime import datetime , timedelta
+from typing import List , Dict , Optional
+
+from config import (
+    ANALYTICS_CACHE_ENABLED,
+    ANALYTICS_CACHE_DIR,
+    ANALYTICS_CACHE_SYNC_INTERVAL,
+    CHECKPOINT_MAX_AGE,
+    EXPORT_CHUNK_SIZE
+)
+from database import get_sql_connection , TABLE_NAME , SNAPSHOT_TABLE , COIN_KEY_COLUMNS
+from coin_index import get_coin_index
+from metrics import timed , increment
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; without it every lookup goes to SQL Server
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = '_manifest.json'
+# Layout of the cached files; a cache written in an older layout is rebuilt by the next sync
+CACHE_FORMAT = 2
+
+# CryptoCurrency column -> cached column (named like the lookup frames of utils.py)
+CACHE_COLUMNS = {
+    'rank': 'rank',
+    'name': 'name',
+    'symbol': 'symbol',
+    'price': 'price',
+    'one_hour_change': '1h_change',
+    'twenty_four_hour_change': '24h_change',
+    'seven_day_change': '7d_change',
+    'market_cap': 'market_cap',
+    'volume_24h': 'volume_24h',
+    'circulating_supply': 'circulating_supply',
+    'scraped_at': 'scraped_at',
+    'snapshot_id': 'snapshot_id',
+    'coin_id': 'coin_id',
+}
+# Columns used only to pick rows; dropped from lookup results
+KEY_COLUMNS = ['snapshot_id', 'coin_id']
+
+_lock = threading.Lock()
+# manifest as last read from disk: {'manifest': dict, 'mtime': manifest file mtime}
+_state: Dict = {'manifest': None, 'mtime': None}
+_sync_lock = threading.Lock()
+_sync_state: Dict = {'next_sync': 0.0, 'thread': None}
+
+
+def is_available() -> bool:
+    return ANALYTICS_CACHE_ENABLED and pa is not None
+
+
+def _schema():
+    floats = ['price', '1h_change', '24h_change', '7d_change', 'market_cap', 'volume_24h', 'circulating_supply']
+    return pa.schema(
+        [('rank', pa.int64()), ('name', pa.string()), ('symbol', pa.string())]
+        + [(column , pa.float64()) for column in floats]
+        + [('scraped_at', pa.timestamp('us')), ('snapshot_id', pa.int64()), ('coin_id', pa.int64())]
+    )
+
+
+def _manifest_path(directory: str) -> str:
+    return os.path.join(directory , MANIFEST_FILE)
+
+
+def _read_manifest(directory: str) -> Dict:
+    try:
+        with open(_manifest_path(directory) , encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'format': CACHE_FORMAT, 'watermark': 0, 'snapshots': []}
+
+
+def _write_manifest(directory: str , manifest: Dict) -> None:
+    """ Replace the manifest atomically, so readers never see half of it."""
+    temp_path = f"{_manifest_path(directory)}.tmp"
+    with open(temp_path , 'w' , encoding='utf-8') as f:
+        json.dump(manifest , f , indent=1)
+    os.replace(temp_path , _manifest_path(directory))
+
+
+def _pending_snapshots(connection , watermark: int) -> List[tuple]:
+    cursor = connection.cursor()
+    cursor.execute(
+        f"SELECT id, started_at, finished_at, is_keyframe, is_partial FROM {SNAPSHOT_TABLE} WHERE id > ? ORDER BY id",
+        watermark
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def _record_batch(rows: List , schema) -> 'pa.RecordBatch':
+    """ One fetchmany() chunk as a record batch of the cache schema (DECIMALs become floats)."""
+    columns = list(zip(*rows))
+    arrays = []
+    for values , field in zip(columns , schema):
+        if pa.types.is_floating(field.type):
+            values = [None if value is None else float(value) for value in values]
+        arrays.append(pa.array(values , type=field.type))
+    return pa.RecordBatch.from_arrays(arrays , schema=schema)
+
+
+def _copy_snapshot(connection , snapshot_id: int , started_at: datetime , directory: str) -> Optional[str]:
+    """
+        Stream one snapshot's stored rows into its date partition, a chunk at a time.
+
+        Returns:
+            The file path relative to the cache directory, or None when the snapshot
+            stored no rows.
+    """
+    relative_path = os.path.join(f"snapshot_date={started_at:%Y-%m-%d}" , f"snapshot-{snapshot_id}.parquet")
+    path = os.path.join(directory , relative_path)
+    temp_path = f"{path}.tmp"
+    schema = _schema()
+    writer = None
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT {', '.join(CACHE_COLUMNS)} FROM {TABLE_NAME} WHERE snapshot_id = ? ORDER BY rank" , snapshot_id)
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            if writer is None:
+                os.makedirs(os.path.dirname(path) , exist_ok=True)
+                writer = pq.ParquetWriter(temp_path , schema)
+            writer.write_batch(_record_batch(rows , schema))
+    finally:
+        cursor.close()
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        return None
+    os.replace(temp_path , path)
+    return relative_path
+
+
+def sync(directory: str = ANALYTICS_CACHE_DIR) -> int:
+    """
+        Copy finished snapshots newer than the watermark into the cache.
+
+        The watermark only moves past a snapshot once it is cached (or known to be
+        abandoned), so a resumed run that finishes after a newer one is not missed.
+
+        Args:
+            directory: cache directory
+        Returns:
+            Number of snapshots copied.
+    """
+    if pa is None:
+        raise ImportError("The analytics cache needs pyarrow (pip install pyarrow)")
+
+    with _sync_lock:
+        manifest = _read_manifest(directory)
+        if manifest.get('format') != CACHE_FORMAT:
+            logger.info("Analytics cache was written in an older layout; rebuilding it.")
+            clear(directory)
+            manifest = _read_manifest(directory)
+        os.makedirs(directory , exist_ok=True)
+        cached_ids = {entry['id'] for entry in manifest['snapshots']}
+        abandoned_before = datetime.now() - timedelta(seconds=CHECKPOINT_MAX_AGE)
+        copied = 0
+
+        with get_sql_connection() as connection:
+            watermark_blocked = False
+            for snapshot_id , started_at , finished_at , is_keyframe , is_partial in _pending_snapshots(connection , manifest['watermark']):
+                if finished_at is None:
+                    # still running (or resumable); later snapshots are copied but the watermark waits
+                    if started_at >= abandoned_before:
+                        watermark_blocked = True
+                    elif not watermark_blocked:
+                        manifest['watermark'] = snapshot_id
+                    continue
+
+                if snapshot_id not in cached_ids:
+                    with timed('cache_sync'):
+                        relative_path = _copy_snapshot(connection , snapshot_id , started_at , directory)
+                    manifest['snapshots'].append({
+                        'id': snapshot_id,
+                        'started_at': started_at.isoformat(),
+                        'is_keyframe': bool(is_keyframe),
+                        'is_partial': bool(is_partial),
+                        'file': relative_path,
+                    })
+                    cached_ids.add(snapshot_id)
+                    copied += 1
+                if not watermark_blocked:
+                    manifest['watermark'] = snapshot_id
+
+        manifest['snapshots'].sort(key=lambda entry: entry['id'])
+        _write_manifest(directory , manifest)
+
+    if copied:
+        increment('cache_snapshots_synced' , copied)
+        logger.info(f"Analytics cache synced {copied} snapshot(s); watermark at {manifest['watermark']}.")
+    return copied
+
+
+def sync_if_due(directory: str = ANALYTICS_CACHE_DIR) -> None:
+    """
+        Start a background sync when ANALYTICS_CACHE_SYNC_INTERVAL has passed since the
+        last one and none is running (called by the daemon after each run).
+    """
+    if not is_available():
+        return
+    with _lock:
+        thread = _sync_state['thread']
+        if (thread is not None and thread.is_alive()) or time.monotonic() < _sync_state['next_sync']:
+            return
+        _sync_state['next_sync'] = time.monotonic() + ANALYTICS_CACHE_SYNC_INTERVAL
+
+        def run() -> None:
+            try:
+                sync(directory)
+            except Exception as e:
+                logger.warning(f"Analytics cache sync failed: {e}")
+
+        _sync_state['thread'] = threading.Thread(target=run , name='analytics-cache-sync' , daemon=True)
+        _sync_state['thread'].start()
+
+
+def _snapshots(directory: str) -> List[Dict]:
+    """ Cached snapshots with rows, oldest first (the manifest is re-read only when it changes)."""
+    try:
+        mtime = os.stat(_manifest_path(directory)).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    with _lock:
+        if _state['mtime'] != mtime:
+            manifest = _read_manifest(directory)
+            _state['manifest'] = manifest if manifest.get('format') == CACHE_FORMAT else None
+            _state['mtime'] = mtime
+        manifest = _state['manifest']
+    if manifest is None:
+        return []
+    return [entry for entry in manifest['snapshots'] if entry['file']]
+
+
+def _read(entries: List[Dict] , directory: str , condition=None) -> Optional[pd.DataFrame]:
+    """
+        Rows of the given snapshots' files matching `condition` (a pyarrow expression).
+
+        Only those files are opened, and the scan streams them batch by batch, so
+        memory holds the matching rows rather than the files.
+    """
+    if not entries:
+        return None
+    dataset = ds.dataset([os.path.join(directory , entry['file']) for entry in entries] , schema=_schema() , format='parquet')
+    with timed('cache_read'):
+        frame = dataset.to_table(filter=condition).to_pandas()
+    increment('cache_hits')
+    return frame
+
+
+def _in_range(entries: List[Dict] , since: Optional[datetime] , until: Optional[datetime]) -> List[Dict]:
+    """ Prune the cached snapshots to those started in [since, until)."""
+    if since is None and until is None:
+        return entries
+    return [entry for entry in entries
+            if (since is None or datetime.fromisoformat(entry['started_at']) >= since)
+            and (until is None or datetime.fromisoformat(entry['started_at']) < until)]
+
+
+def latest_market(limit: Optional[int] = None , directory: str = ANALYTICS_CACHE_DIR) -> Optional[pd.DataFrame]:
+    """ Latest cached full snapshot (rebuilt from the last keyframe in delta mode), in rank order."""
+    if not is_available():
+        return None
+    entries = _snapshots(directory)
+    full = [entry['id'] for entry in entries if not entry.get('is_partial')]
+    if not full:
+        return None
+    keyframes = [entry['id'] for entry in entries if entry['is_keyframe'] and entry['id'] <= full[-1]]
+    first = keyframes[-1] if keyframes else full[-1]
+    frame = _read([entry for entry in entries if first <= entry['id'] <= full[-1]] , directory)
+    if frame is None or frame.empty:
+        return None
+    frame = frame.sort_values('snapshot_id' , kind='stable')
+    latest = frame.drop_duplicates(COIN_KEY_COLUMNS , keep='last').sort_values('rank' , ignore_index=True)
+    latest = latest.drop(columns=KEY_COLUMNS)
+    return latest.head(limit) if limit else latest
+
+
+def search(name: str , since: Optional[datetime] = None , until: Optional[datetime] = None ,
+           directory: str = ANALYTICS_CACHE_DIR) -> Optional[pd.DataFrame]:
+    """
+        Stored rows of the coins whose name contains `name` or whose symbol equals it
+        (case-insensitive), resolved through the coin index like the SQL path.
+
+        Args:
+            since / until: only snapshots started in [since, until)
+    """
+    if not is_available():
+        return None
+    entries = _in_range(_snapshots(directory) , since , until)
+    index = get_coin_index()
+    if not entries or index is None or not len(index):
+        return None
+    coin_ids = index.search(name)
+    if not coin_ids:
+        logger.info(f"No coin matches '{name}'.")
+        return pd.DataFrame()
+    frame = _read(entries , directory , ds.field('coin_id').isin(coin_ids))
+    return frame.sort_values(['scraped_at' , 'rank'] , ignore_index=True).drop(columns=KEY_COLUMNS)
+
+
+def by_rank(rank: int , since: Optional[datetime] = None , until: Optional[datetime] = None ,
+            directory: str = ANALYTICS_CACHE_DIR) -> Optional[pd.DataFrame]:
+    """ Stored rows that held `rank` (in snapshots started in [since, until)), oldest first."""
+    if not is_available():
+        return None
+    frame = _read(_in_range(_snapshots(directory) , since , until) , directory , ds.field('rank') == rank)
+    if frame is None:
+        return None
+    return frame.sort_values(['snapshot_id'] , ignore_index=True).drop(columns=KEY_COLUMNS)
+
+
+def clear(directory: str = ANALYTICS_CACHE_DIR) -> None:
+    """ Delete the cache; the next sync copies every snapshot again."""
+    shutil.rmtree(directory , ignore_errors=True)
+    with _lock:
+        _state.update({'manifest': None, 'mtime': None})
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO , format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Sync the local Parquet analytics cache from SQL Server.')
+    parser.add_argument('command' , choices=['sync' , 'rebuild'])
+    parser.add_argument('--dir' , default=ANALYTICS_CACHE_DIR , help='cache directory')
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        clear(args.dir)
+    print(f"Copied {sync(args.dir)} snapshot(s) into {args.dir}.")
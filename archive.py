@@ -0,0 +1,342 @@
+"""
+Raw Page Archive
+Keeps the HTML of every scraped listing page, compressed (gzip, or zstd when the
+zstandard package is installed) and stored under its sha256, so identical pages are
+stored once. A manifest records which page of which run each capture was. Replaying
+the archive parses the stored pages again in a process pool and saves every run as a
+snapshot, without a browser, e.g. after a parser fix or into a rebuilt database.
+
+Usage:
+    python archive.py stats
+    python archive.py replay [--since 2025-01-01] [--until 2025-02-01] [--processes 4] [--include-older] [--dry-run]
+"""
+
+import os
+import gzip
+import bisect
+import json
+import hashlib
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List , Dict , Optional , Iterator , Tuple
+
+from config import ARCHIVE_ENABLED , ARCHIVE_DIR , ARCHIVE_COMPRESSION , ARCHIVE_REPLAY_PROCESSES
+from parsers import parse_page_source
+from metrics import timed , increment
+import http_scraper
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; archives are gzip-compressed without it
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.jsonl'
+OBJECTS_DIR = 'objects'
+# compression -> file extension
+EXTENSIONS = {'gzip': '.html.gz', 'zstd': '.html.zst'}
+
+# Kinds of archived pages: a Selenium page_source is parsed from the table, an HTTP
+# response through its embedded __NEXT_DATA__ JSON
+PAGE_SOURCE = 'page_source'
+HTTP = 'http'
+
+_lock = threading.Lock()
+# started_at of the run being scraped, set by the pipelines so captures can be replayed
+# per run; captures outside a pipeline all belong to the first capture's time
+_run: Dict = {'started_at': None, 'partial': False}
+_warned = set()
+
+
+def begin_run(started_at: datetime , partial: bool = False) -> None:
+    """ Record the run that following captures belong to (its snapshot's started_at and scope)."""
+    _run['started_at'] = started_at
+    _run['partial'] = partial
+
+
+def _compression() -> str:
+    if ARCHIVE_COMPRESSION == 'zstd' and zstandard is None:
+        if 'zstd' not in _warned:
+            _warned.add('zstd')
+            logger.warning("zstandard is not installed, archiving with gzip.")
+        return 'gzip'
+    return ARCHIVE_COMPRESSION
+
+
+def _compress(data: bytes , compression: str) -> bytes:
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor().compress(data)
+    return gzip.compress(data , compresslevel=6)
+
+
+def _decompress(data: bytes , path: str) -> bytes:
+    if path.endswith(EXTENSIONS['zstd']):
+        if zstandard is None:
+            raise ImportError(f"{path} is zstd-compressed; pip install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _object_path(digest: str , extension: str) -> str:
+    """ Path of a stored page relative to the archive directory (objects/ab/abcd....html.gz)."""
+    return os.path.join(OBJECTS_DIR , digest[:2] , f"{digest}{extension}")
+
+
+def archive_page(html: str , page: int , kind: str = PAGE_SOURCE , directory: str = ARCHIVE_DIR) -> Optional[str]:
+    """
+        Store one scraped page and record the capture in the manifest.
+
+        The page is written only if no page with the same content is stored yet.
+        Archiving never fails a scrape: errors are logged and None is returned.
+
+        Args:
+            html: page HTML as scraped
+            page: listing page number
+            kind: PAGE_SOURCE (Selenium) or HTTP (downloaded HTML with embedded JSON)
+            directory: archive directory
+        Returns:
+            sha256 of the page, or None when the archive is off or writing failed.
+    """
+    if not ARCHIVE_ENABLED:
+        return None
+    try:
+        with timed('archive'):
+            data = html.encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()
+            stored = next((path for path in (_object_path(digest , extension) for extension in EXTENSIONS.values())
+                           if os.path.exists(os.path.join(directory , path))) , None)
+            if stored is None:
+                compression = _compression()
+                stored = _object_path(digest , EXTENSIONS[compression])
+                path = os.path.join(directory , stored)
+                os.makedirs(os.path.dirname(path) , exist_ok=True)
+                temp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(temp_path , 'wb') as f:
+                    f.write(_compress(data , compression))
+                os.replace(temp_path , path)
+                increment('archive_pages_stored')
+            else:
+                increment('archive_pages_deduplicated')
+
+            captured_at = datetime.now()
+            with _lock:
+                if _run['started_at'] is None:
+                    _run['started_at'] = captured_at
+                entry = {
+                    'run': _run['started_at'].isoformat(),
+                    'page': page,
+                    'kind': kind,
+                    'sha256': digest,
+                    'file': stored,
+                    'captured_at': captured_at.isoformat(),
+                }
+                if _run['partial']:
+                    entry['partial'] = True
+                with open(os.path.join(directory , MANIFEST_FILE) , 'a' , encoding='utf-8') as f:
+                    f.write(json.dumps(entry) + "\n")
+        return digest
+    except Exception as e:
+        logger.warning(f"Could not archive page {page}: {e}")
+        return None
+
+
+def read_manifest(directory: str = ARCHIVE_DIR) -> List[Dict]:
+    """ Every capture recorded in the archive, oldest first."""
+    try:
+        with open(os.path.join(directory , MANIFEST_FILE) , encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def read_page(entry: Dict , directory: str = ARCHIVE_DIR) -> str:
+    """ HTML of an archived capture."""
+    path = os.path.join(directory , entry['file'])
+    with open(path , 'rb') as f:
+        return _decompress(f.read() , path).decode('utf-8')
+
+
+def parse_archived_page(entry: Dict , directory: str = ARCHIVE_DIR) -> Optional[List[Dict[str,str]]]:
+    """
+        Parse an archived capture with the current parsers (a top-level function,
+        so it can run in a worker process).
+
+        Returns:
+            List of crypto dicts, or None if the page could not be read or parsed.
+    """
+    try:
+        html = read_page(entry , directory)
+        if entry['kind'] == HTTP:
+            return http_scraper.parse_listing_html(html)
+        return parse_page_source(html)
+    except Exception as e:
+        logger.warning(f"Could not parse archived page {entry['page']} of run {entry['run']}: {e}")
+        return None
+
+
+def archived_runs(since: Optional[datetime] = None , until: Optional[datetime] = None ,
+                  directory: str = ARCHIVE_DIR) -> Dict[datetime, List[Dict]]:
+    """
+        Captures grouped by run, in run order, one capture per page (the last one
+        when a page was captured more than once, e.g. by a resumed run).
+
+        Args:
+            since / until: only runs started at or after `since` and before `until`
+        Returns:
+            {run started_at: [captures in page order]}
+    """
+    runs: Dict[datetime, Dict[int, Dict]] = {}
+    for entry in read_manifest(directory):
+        started_at = datetime.fromisoformat(entry['run'])
+        if (since is not None and started_at < since) or (until is not None and started_at >= until):
+            continue
+        runs.setdefault(started_at , {})[entry['page']] = entry
+    return OrderedDict((started_at , [pages[page] for page in sorted(pages)]) for started_at , pages in sorted(runs.items()))
+
+
+def _stored_runs(connection , snapshot_table: str) -> Tuple[List[datetime], Optional[datetime]]:
+    """ started_at of every snapshot (sorted), and of the newest finished one."""
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT started_at FROM {snapshot_table} ORDER BY started_at")
+    started = [row[0] for row in cursor.fetchall()]
+    cursor.execute(f"SELECT TOP 1 started_at FROM {snapshot_table} WHERE finished_at IS NOT NULL ORDER BY id DESC")
+    row = cursor.fetchone()
+    cursor.close()
+    return started , row[0] if row else None
+
+
+def _is_stored(started_at: datetime , stored: List[datetime]) -> bool:
+    """ Whether a snapshot started with the run (`stored` sorted ascending)."""
+    # DATETIME keeps ~3 ms, so a snapshot matches its run within a few milliseconds
+    position = bisect.bisect_left(stored , started_at)
+    return any(abs((started_at - stored[index]).total_seconds()) < 0.01
+               for index in (position - 1 , position) if 0 <= index < len(stored))
+
+
+def _parsed_pages(futures: List[Tuple[Dict , object]]) -> Iterator[Tuple[int, List[Dict[str,str]]]]:
+    for entry , future in futures:
+        page_data = future.result()
+        if page_data:
+            yield entry['page'] , page_data
+
+
+def replay(since: Optional[datetime] = None , until: Optional[datetime] = None ,
+           processes: int = ARCHIVE_REPLAY_PROCESSES , include_older: bool = False ,
+           dry_run: bool = False , directory: str = ARCHIVE_DIR) -> Dict:
+    """
+        Parse archived runs again and save each one as a snapshot.
+
+        Runs that already have a snapshot are skipped, so a replay can be repeated.
+        The next run's pages are parsed in the process pool while the current run is
+        being saved. Runs older than the newest stored snapshot are skipped unless
+        include_older is set: their snapshots get newer ids and would be read as the
+        latest market until the next scrape. To rebuild the table, replay into an
+        empty database.
+
+        Args:
+            since / until: only runs started in this range
+            processes: worker processes parsing pages
+            include_older: also replay runs older than the newest stored snapshot
+            dry_run: parse and count only, save nothing
+            directory: archive directory
+        Returns:
+            Report: runs_replayed, runs_skipped, pages and rows.
+    """
+    # imported here: the scrapers import this module, and must not need pyodbc;
+    # the pipeline also imports it for begin_run()
+    from database import get_sql_connection , SNAPSHOT_TABLE
+    from pipeline import stream_to_sql_server
+
+    runs = archived_runs(since , until , directory)
+    report = {'runs_replayed': 0, 'runs_skipped': 0, 'pages': 0, 'rows': 0}
+    if not dry_run:
+        with get_sql_connection() as connection:
+            stored , newest = _stored_runs(connection , SNAPSHOT_TABLE)
+        selected = OrderedDict()
+        for started_at , entries in runs.items():
+            if _is_stored(started_at , stored) or (newest is not None and started_at < newest and not include_older):
+                report['runs_skipped'] += 1
+                continue
+            selected[started_at] = entries
+        if report['runs_skipped']:
+            logger.info(f"Skipping {report['runs_skipped']} run(s) that are stored already or older than the newest snapshot.")
+        runs = selected
+    if not runs:
+        logger.info("Nothing to replay.")
+        return report
+
+    with ProcessPoolExecutor(max_workers=max(1 , processes)) as executor:
+        def submit(entries: List[Dict]) -> List[Tuple[Dict , object]]:
+            return [(entry , executor.submit(parse_archived_page , entry , directory)) for entry in entries]
+
+        items = list(runs.items())
+        pending = submit(items[0][1])
+        for position , (started_at , _) in enumerate(items):
+            futures = pending
+            # parse the next run while this one is saved
+            pending = submit(items[position + 1][1]) if position + 1 < len(items) else []
+
+            counted = {'pages': 0, 'rows': 0}
+
+            def counted_pages(futures=futures , counted=counted):
+                for page , page_data in _parsed_pages(futures):
+                    counted['pages'] += 1
+                    counted['rows'] += len(page_data)
+                    yield page , page_data
+
+            if dry_run:
+                for _ in counted_pages():
+                    pass
+            elif stream_to_sql_server(counted_pages() , started_at=started_at ,
+                                      partial=any(entry.get('partial') for entry in runs[started_at])) is None:
+                logger.error(f"Saving run {started_at} failed; stopping the replay.")
+                for _ , future in pending:
+                    future.cancel()
+                break
+            report['pages'] += counted['pages']
+            report['rows'] += counted['rows']
+            report['runs_replayed'] += 1
+            logger.info(f"Replayed run {started_at:%Y-%m-%d %H:%M:%S}: {counted['rows']} rows from {counted['pages']} pages.")
+
+    increment('archive_runs_replayed' , report['runs_replayed'])
+    return report
+
+
+def archive_stats(directory: str = ARCHIVE_DIR) -> Dict:
+    """ Captures, runs, distinct pages stored and bytes on disk."""
+    entries = read_manifest(directory)
+    stored_bytes = 0
+    for root , _ , files in os.walk(os.path.join(directory , OBJECTS_DIR)):
+        stored_bytes += sum(os.path.getsize(os.path.join(root , name)) for name in files)
+    return {
+        'captures': len(entries),
+        'runs': len({entry['run'] for entry in entries}),
+        'stored_pages': len({entry['sha256'] for entry in entries}),
+        'stored_bytes': stored_bytes,
+    }
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO , format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Inspect or replay the raw page archive.')
+    parser.add_argument('command' , choices=['stats' , 'replay'])
+    parser.add_argument('--dir' , default=ARCHIVE_DIR , help='archive directory')
+    parser.add_argument('--since' , type=datetime.fromisoformat , help='first run start included (ISO date/time)')
+    parser.add_argument('--until' , type=datetime.fromisoformat , help='runs starting at or after this are excluded')
+    parser.add_argument('--processes' , type=int , default=ARCHIVE_REPLAY_PROCESSES , help='parser processes')
+    parser.add_argument('--include-older' , action='store_true' , help='also replay runs older than the newest snapshot')
+    parser.add_argument('--dry-run' , action='store_true' , help='parse and count without saving')
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        print(json.dumps(archive_stats(args.dir) , indent=2))
+    else:
+        result = replay(args.since , args.until , args.processes , args.include_older , args.dry_run , args.dir)
+        print(f"Replayed {result['runs_replayed']} run(s): {result['rows']} rows from {result['pages']} pages "
+              f"({result['runs_skipped']} skipped).")
@@ -0,0 +1,206 @@
+"""
+Asyncio Orchestration of Scraping and Saving
+Fetching, parsing and database writes run as concurrent stages: page downloads (or
+Chrome drivers) on executor threads, parsing in a process pool and inserts on the
+background SnapshotWriter, connected by bounded queues. Wall time approaches that of
+the slowest stage instead of the sum of all of them.
+"""
+
+import asyncio
+import logging
+import threading
+import requests
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor , ProcessPoolExecutor
+from typing import List , Dict , Optional
+
+from config import (
+    COINMARKET_URL,
+    SCRAPER_BACKEND,
+    MAX_CONCURRENT_DRIVERS,
+    ASYNC_FETCH_CONCURRENCY,
+    ASYNC_PARSE_PROCESSES,
+    ASYNC_QUEUE_SIZE
+)
+from http_scraper import fetch_page , parse_listing_html
+from pipeline import SnapshotWriter
+from checkpoint import ScrapeCheckpoint
+from metrics import timed , increment
+import archive
+
+logger = logging.getLogger(__name__)
+
+# requests.Session is not thread safe, so every fetch thread keeps its own
+_thread_sessions = threading.local()
+
+
+def _fetch_html(page: int , base_url: str) -> str:
+    session = getattr(_thread_sessions , 'session' , None)
+    if session is None:
+        session = _thread_sessions.session = requests.Session()
+    return fetch_page(session , page , base_url)
+
+
+async def scrape_and_save_async(max_pages: int = 10 , backend: str = SCRAPER_BACKEND ,
+                                started_at: Optional[datetime] = None ,
+                                checkpoint: Optional[ScrapeCheckpoint] = None ,
+                                base_url: str = COINMARKET_URL) -> Dict:
+    """
+        Scrape listing pages and save them to SQL Server as one snapshot, with every
+        stage running concurrently.
+
+        Args:
+            max_pages: max pages to scrape
+            backend: 'http' (embedded JSON, Selenium fallback) or 'selenium'
+            started_at: when the scrape run started (default: now)
+            checkpoint: checkpoint of the run, already begun (pages in it are skipped
+                        and the snapshot is only finished once every page is in)
+            base_url: site root, override to point at a local fixture server
+        Returns:
+            Run report: pages requested/scraped, rows, failed and fallback pages,
+            and rows_inserted (None if saving failed).
+    """
+    loop = asyncio.get_running_loop()
+    started_at = started_at or datetime.now()
+    archive.begin_run(started_at)
+    failures: Dict[int, str] = {}
+    missing: List[int] = []
+    state = {'end': None, 'pages_scraped': 0, 'rows': 0, 'pool': None}
+
+    resume = {}
+    skip_pages = set()
+    if checkpoint is not None:
+        resume = {
+            'snapshot_id': checkpoint.snapshot_id,
+            'rows_inserted': checkpoint.rows_inserted,
+            'pages_written': checkpoint.written_page_count(),
+            'on_progress': checkpoint.record_progress,
+        }
+        skip_pages = set(checkpoint.scraped_pages())
+    pages = [page for page in range(1 , max_pages + 1) if page not in skip_pages]
+
+    write_queue: asyncio.Queue = asyncio.Queue(maxsize=ASYNC_QUEUE_SIZE)
+    fetch_threads = ThreadPoolExecutor(max_workers=max(ASYNC_FETCH_CONCURRENCY , MAX_CONCURRENT_DRIVERS) ,
+                                       thread_name_prefix='fetch')
+    parse_processes = ProcessPoolExecutor(max_workers=ASYNC_PARSE_PROCESSES)
+    # one thread, so writer.write() may block on the writer's own queue without stalling the loop
+    write_thread = ThreadPoolExecutor(max_workers=1 , thread_name_prefix='write')
+    writer = SnapshotWriter(started_at , **resume).start()
+
+    def browser_pool():
+        if state['pool'] is None:
+            # imported here so the HTTP path never loads Selenium unless it needs to
+            from scraper import ChromeDriverPool
+            state['pool'] = ChromeDriverPool(size=MAX_CONCURRENT_DRIVERS)
+        return state['pool']
+
+    async def scrape_http(page: int) -> Optional[List[Dict[str,str]]]:
+        try:
+            html = await loop.run_in_executor(fetch_threads , _fetch_html , page , base_url)
+        except requests.RequestException as e:
+            logger.warning(f"HTTP request for page {page} failed: {e}")
+            missing.append(page)
+            return None
+
+        # timed here: the worker process keeps its own (discarded) metrics
+        with timed('parse_json'):
+            page_data = await loop.run_in_executor(parse_processes , parse_listing_html , html)
+        if page_data is None:
+            logger.warning(f"No embedded JSON listing on page {page}.")
+            missing.append(page)
+        elif page_data:
+            increment('pages_scraped')
+            increment('rows_scraped' , len(page_data))
+            if archive.ARCHIVE_ENABLED:
+                await loop.run_in_executor(fetch_threads , archive.archive_page , html , page , archive.HTTP)
+        return page_data
+
+    async def scrape_browser(page: int) -> Optional[List[Dict[str,str]]]:
+        try:
+            return await loop.run_in_executor(fetch_threads , browser_pool().scrape_page_with_retries , page)
+        except Exception as e:
+            logger.warning(f"Page {page} failed: {e}")
+            increment('pages_failed')
+            failures[page] = str(e).strip() or type(e).__name__
+            return None
+
+    async def process_page(page: int , scrape , limit: asyncio.Semaphore) -> None:
+        async with limit:
+            if state['end'] is not None and page > state['end']:
+                return
+            page_data = await scrape(page)
+        if page_data is None:
+            return
+
+        if checkpoint is not None:
+            checkpoint.record_page(page , page_data)
+        if not page_data:
+            logger.info(f'No data found on page {page}. Skipping later pages.')
+            state['end'] = page if state['end'] is None else min(state['end'] , page)
+            return
+
+        logger.info(f"{len(page_data)} cryptocurrencies read from page {page}.")
+        state['pages_scraped'] += 1
+        state['rows'] += len(page_data)
+        await write_queue.put((page , page_data))
+
+    async def write_stage() -> None:
+        while True:
+            item = await write_queue.get()
+            if item is None:
+                return
+            page , page_data = item
+            await loop.run_in_executor(write_thread , writer.write , page_data , page)
+
+    async def scrape_pages(page_numbers: List[int] , scrape , concurrency: int) -> None:
+        limit = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(process_page(page , scrape , limit) for page in page_numbers))
+
+    writer_task = asyncio.ensure_future(write_stage())
+    try:
+        if checkpoint is not None:
+            for page , page_data in checkpoint.unwritten_pages():
+                await write_queue.put((page , page_data))
+
+        if backend == 'http':
+            await scrape_pages(pages , scrape_http , ASYNC_FETCH_CONCURRENCY)
+            fallback_pages = sorted(page for page in missing if state['end'] is None or page < state['end'])
+            if fallback_pages:
+                logger.info(f"Falling back to Selenium for pages {fallback_pages}.")
+                increment('http_fallback_pages' , len(fallback_pages))
+                await scrape_pages(fallback_pages , scrape_browser , MAX_CONCURRENT_DRIVERS)
+        else:
+            await scrape_pages(pages , scrape_browser , MAX_CONCURRENT_DRIVERS)
+    except Exception as e:
+        logger.error(f"Scraping stopped early, saving the pages scraped so far: {e}" , exc_info=True)
+    finally:
+        await write_queue.put(None)
+        await writer_task
+
+        complete = checkpoint is None or checkpoint.is_complete()
+        rows_inserted = await loop.run_in_executor(write_thread , writer.close , complete)
+        if checkpoint is not None and rows_inserted is not None and complete:
+            checkpoint.clear()
+
+        if state['pool'] is not None:
+            await loop.run_in_executor(fetch_threads , state['pool'].close)
+        fetch_threads.shutdown(wait=False)
+        parse_processes.shutdown(wait=False)
+        write_thread.shutdown(wait=False)
+
+    report = {
+        'pages_requested': len(pages),
+        'pages_scraped': state['pages_scraped'],
+        'rows': state['rows'],
+        'failed_pages': dict(sorted(failures.items())),
+        'fallback_pages': sorted(missing) if backend == 'http' else [],
+        'rows_inserted': rows_inserted,
+    }
+    if failures:
+        failed = ", ".join(f"{page} ({reason})" for page , reason in sorted(failures.items()))
+        logger.warning(f"{len(failures)} page(s) failed: {failed}")
+    if checkpoint is not None and not complete:
+        logger.warning("Some pages are still missing; run again to resume this snapshot.")
+
+    logger.info(f"Finished Scraping {state['rows']} cryptocurrencies from {state['pages_scraped']} pages.")
+    return report
@@ -0,0 +1,624 @@
+"""
+Performance Benchmarks
+Usage:
+    python benchmark.py suite [--sizes 100 1000 10000] [--repeat 5] [--no-record]
+    python benchmark.py fixtures [--sizes 100 1000 10000]
+    python benchmark.py inserts --rows 10000 [--chunk-size 1000] [--strategies tvp multi_values]
+
+The suite runs offline: generated CoinMarketCap pages (table and __NEXT_DATA__ JSON)
+are served from a local HTTP server and the database is replaced by an in-memory
+fake, so parser, insert and export timings need neither the website nor SQL Server.
+Every run is appended to .benchmarks/history.jsonl together with the git commit,
+and benchmarks that got slower than the previous run are flagged.
+
+Point DB_CONFIG at a local SQL Server instance (Express/LocalDB/Docker) before
+running the insert benchmark; benchmark rows are deleted again afterwards.
+"""
+
+import os
+import re
+import math
+import json
+import time
+import random
+import logging
+import argparse
+import statistics
+import subprocess
+import threading
+import warnings
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+from http.server import ThreadingHTTPServer , SimpleHTTPRequestHandler
+from urllib.parse import urlparse , parse_qs
+from typing import List , Dict , Optional , Tuple , Callable , Any
+
+import database
+import pipeline
+import utils
+import analytics_cache
+import coin_index
+import market_cache
+from config import TABLE_NAME
+from database import (
+    get_sql_connection,
+    create_crypto_table,
+    bulk_insert_rows,
+    insert_crypto_data,
+    reset_schema_cache,
+    invalidate_stats_cache,
+    BULK_INSERT_STRATEGIES,
+    INSERT_COLUMNS
+)
+from normalize import normalize_crypto_data , to_db_rows
+from parsers import parse_page_source , available_backends , CRYPTO_COLUMNS
+from http_scraper import parse_listing_html , scrape_coinmarketcap_http
+
+logger = logging.getLogger(__name__)
+
+# Benchmark rows are written with this timestamp so they can be removed afterwards
+BENCHMARK_SCRAPED_AT = datetime(1900, 1, 1)
+
+# Generated fixtures and the results history (gitignored)
+BENCHMARK_DIR = '.benchmarks'
+FIXTURE_SIZES = (100 , 1000 , 10000)
+# Bumped when the generated pages change, so older saved fixtures are not reused
+FIXTURE_VERSION = 2
+# Coins per listing page on the site (the HTTP scrape benchmark pages through the listing)
+LISTING_PAGE_SIZE = 100
+TO_SUBSCRIPT = str.maketrans('0123456789' , '₀₁₂₃₄₅₆₇₈₉')
+HISTORY_FILE = os.path.join(BENCHMARK_DIR , 'history.jsonl')
+# A benchmark more than this much slower than in the previous run is reported as a regression
+REGRESSION_THRESHOLD = 0.20
+
+# Columns returned by the fake database for any SELECT on the crypto table
+FAKE_SELECT_COLUMNS = [
+    'rank', 'name', 'symbol', 'price', '1h_change', '24h_change', '7d_change',
+    'market_cap', 'volume_24h', 'circulating_supply', 'scraped_at'
+]
+
+
+def synthetic_crypto_data(rows: int , seed: int = 42) -> List[Dict[str,str]]:
+    """
+        Build scraped-looking crypto dicts: the table cells of a generated listing
+        page, read by the bs4 parser exactly as a Selenium scrape reads them.
+
+        Args:
+            rows: number of coins
+            seed: random seed, so every run benchmarks the same data
+        Returns:
+            List of crypto dicts
+    """
+    return parse_page_source(render_listing_page(synthetic_coins(rows , seed)) , 'bs4')
+
+
+def synthetic_coins(rows: int , seed: int = 42) -> List[Dict[str, Any]]:
+    """ Coins in the shape of CoinMarketCap's __NEXT_DATA__ listing."""
+    rng = random.Random(seed)
+    coins = []
+    for rank in range(1 , rows + 1):
+        price = rng.uniform(0.0001 , 70000) / rank
+        if rng.random() < 0.1:
+            # sub-cent coins, so the table renders subscript-zero prices too
+            price /= 10 ** rng.randint(3 , 9)
+        coins.append({
+            'cmcRank': rank,
+            'name': f"Coin {rank}",
+            'symbol': f"C{rank}",
+            'circulatingSupply': rng.randint(10**6 , 10**12),
+            'quotes': [{
+                'name': 'USD',
+                'price': price,
+                'percentChange1h': rng.uniform(-5 , 5),
+                'percentChange24h': rng.uniform(-20 , 20),
+                'percentChange7d': rng.uniform(-50 , 50),
+                'marketCap': rng.randint(10**6 , 10**12) / rank,
+                'volume24h': rng.randint(10**4 , 10**10) / rank,
+            }],
+        })
+    return coins
+
+
+def _table_price(price: float) -> str:
+    """ Price as the table shows it: $0.0₅1234 for prices with five or more leading zeros."""
+    if price >= 1:
+        return f"${price:,.2f}"
+    zeros = -math.floor(math.log10(price)) - 1
+    if zeros < 5:
+        return f"${price:.{zeros + 4}f}"
+    digits = min(9999 , round(price * 10 ** (zeros + 4)))
+    return f"$0.0{str(zeros).translate(TO_SUBSCRIPT)}{digits}"
+
+
+def _abbreviated(amount: float) -> str:
+    """ "$1.32T" style amount shown next to the full market cap."""
+    for suffix , multiplier in (('T' , 1e12) , ('B' , 1e9) , ('M' , 1e6) , ('K' , 1e3)):
+        if amount >= multiplier:
+            return f"${amount / multiplier:.2f}{suffix}"
+    return f"${amount:.2f}"
+
+
+def _change_cell(change: float) -> str:
+    """ The table shows changes unsigned, marking falling ones with a caret-down icon."""
+    caret = 'icon-Caret-down' if change < 0 else 'icon-Caret-up'
+    return f'<span class="sc-97d6d2ca-0"><span class="{caret}"></span>{abs(change):.2f}%</span>'
+
+
+def render_table_row(coin: Dict[str, Any]) -> str:
+    """ One cmc-table row with the site's cell markup (see tests/fixtures/cmc_table.html)."""
+    quote = coin['quotes'][0]
+    symbol = coin['symbol']
+    cells = [
+        '<span class="star"></span>',
+        f'<p class="sc-4984dd93-0">{coin["cmcRank"]}</p>',
+        f'<a href="/currencies/{symbol.lower()}/" class="cmc-link"><p class="sc-4984dd93-0 kKpPOn">{coin["name"]}</p>'
+        f'<div><p class="sc-4984dd93-0 coin-item-symbol">{symbol}</p></div></a>',
+        f'<a href="/currencies/{symbol.lower()}/#markets" class="cmc-link"><span>{_table_price(quote["price"])}</span></a>',
+        _change_cell(quote['percentChange1h']),
+        _change_cell(quote['percentChange24h']),
+        _change_cell(quote['percentChange7d']),
+        f'<p><span class="sc-7bc56c81-0">{_abbreviated(quote["marketCap"])}</span>'
+        f'<span class="sc-7bc56c81-1">${quote["marketCap"]:,.0f}</span></p>',
+        f'<p class="sc-4984dd93-0 font_weight_500">${quote["volume24h"]:,.0f}</p>'
+        f'<div data-nosnippet="true"><p>{quote["volume24h"] / quote["price"]:,.0f} {symbol}</p></div>',
+        f'<p class="sc-4984dd93-0 WfVLk">{coin["circulatingSupply"]:,} {symbol}</p>',
+        f'<img class="sparkline" alt="{symbol.lower()}-7d-price-graph">',
+        '',
+    ]
+    return '<tr style="cursor:pointer">' + ''.join(f'<td>{cell}</td>' for cell in cells) + '</tr>'
+
+
+def render_listing_page(coins: List[Dict[str, Any]]) -> str:
+    """
+        Build a listing page like CoinMarketCap serves it: the cmc-table (for the
+        bs4/lxml parsers) plus the embedded __NEXT_DATA__ JSON (for the HTTP backend).
+        Without coins it is the empty page past the end of the listing.
+    """
+    header = '<tr>' + '<th></th>' * (max(index for _ , index in CRYPTO_COLUMNS) + 3) + '</tr>'
+    rows = ''.join(render_table_row(coin) for coin in coins)
+    # the compact listing format keeps its keysArr header when there are no coins
+    listing = coins or [{'keysArr': ['cmcRank' , 'name' , 'symbol']}]
+    next_data = json.dumps({'props': {'pageProps': {'initialState': {'listing': listing}}}})
+    return (
+        '<html><head><title>Cryptocurrency Prices</title></head><body>'
+        f'<table class="sc-14cb040a-3 cmc-table"><thead>{header}</thead><tbody>{rows}</tbody></table>'
+        f'<script id="__NEXT_DATA__" type="application/json">{next_data}</script>'
+        '</body></html>'
+    )
+
+
+def render_listing(rows: int , seed: int = 42) -> Dict[int, str]:
+    """
+        The listing of `rows` coins split into pages as the site serves them.
+
+        Returns:
+            {page: page HTML}; pages past the last one are the empty end-of-listing page.
+    """
+    coins = synthetic_coins(rows , seed)
+    return {
+        page: render_listing_page(coins[start:start + LISTING_PAGE_SIZE])
+        for page , start in enumerate(range(0 , rows , LISTING_PAGE_SIZE) , start=1)
+    }
+
+
+def fixture_path(rows: int , directory: str = BENCHMARK_DIR) -> str:
+    return os.path.join(directory , 'fixtures' , f"listing-v{FIXTURE_VERSION}-{rows}.html")
+
+
+def generate_fixtures(sizes=FIXTURE_SIZES , directory: str = BENCHMARK_DIR) -> Dict[int, str]:
+    """
+        Write (or reuse) a saved single-page listing per size.
+
+        Returns:
+            {rows: fixture path}
+    """
+    paths = {}
+    for rows in sizes:
+        path = fixture_path(rows , directory)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path) , exist_ok=True)
+            with open(path , 'w' , encoding='utf-8') as f:
+                f.write(render_listing_page(synthetic_coins(rows)))
+            logger.info(f"Wrote fixture {path}")
+        paths[rows] = path
+    return paths
+
+
+def load_fixture(rows: int , directory: str = BENCHMARK_DIR) -> str:
+    with open(generate_fixtures([rows] , directory)[rows] , encoding='utf-8') as f:
+        return f.read()
+
+
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    """ Serves page N of a listing for /?page=N, and the empty end-of-listing page past it."""
+
+    def __init__(self, *args , pages: Dict[int, bytes] , end: bytes , **kwargs):
+        self.pages = pages
+        self.end = end
+        super().__init__(*args , **kwargs)
+
+    def do_GET(self):
+        page = parse_qs(urlparse(self.path).query).get('page' , ['1'])[0]
+        body = self.pages.get(int(page) , self.end) if page.isdigit() else self.end
+        self.send_response(200)
+        self.send_header('Content-Type' , 'text/html; charset=utf-8')
+        self.send_header('Content-Length' , str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format , *args):
+        pass
+
+
+@contextmanager
+def serve_fixture(pages: Dict[int, str]):
+    """
+        Serve listing pages from a local HTTP server.
+
+        Args:
+            pages: {page: page HTML}, e.g. render_listing(); other pages are past the end
+        Yields:
+            Base URL to pass to the HTTP scraper.
+    """
+    handler = partial(
+        _FixtureHandler,
+        pages={page: html.encode('utf-8') for page , html in pages.items()},
+        end=render_listing_page([]).encode('utf-8')
+    )
+    server = ThreadingHTTPServer(('127.0.0.1' , 0) , handler)
+    thread = threading.Thread(target=server.serve_forever , daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class FakeCursor:
+    """ Minimal pyodbc cursor stand-in backed by a FakeDatabase."""
+
+    def __init__(self, database: 'FakeDatabase'):
+        self.database = database
+        self.fast_executemany = False
+        self.rowcount = -1
+        self.description = None
+        self._results: List[Tuple] = []
+
+    def execute(self, query: str , *params):
+        self.database.statements += 1
+        statement = query.lstrip().upper()
+        self.description = None
+        self._results = []
+
+        if statement.startswith(f"INSERT INTO {TABLE_NAME.upper()}"):
+            values = params[0] if len(params) == 1 and isinstance(params[0] , (list , tuple)) else params
+            width = len(INSERT_COLUMNS)
+            self.database.add_rows([tuple(values[i:i + width]) for i in range(0 , len(values) , width)])
+        elif statement.startswith('{CALL'):
+            self.database.add_rows(params[0][0])
+        elif 'OUTPUT INSERTED.ID' in statement:
+            self.database.last_id += 1
+            self._results = [(self.database.last_id,)]
+        elif 'SERVERPROPERTY' in statement:
+            # a server without partitioning, so the plain table layout is used
+            self._results = [(12 , 2)]
+        elif statement.startswith('SELECT') and 'SYS.' in statement:
+            # catalog lookups find nothing: tables are (re)created and none is partitioned
+            self._results = [(0,)]
+        elif statement.startswith('SELECT') and TABLE_NAME.upper() in statement:
+            self.description = [(column , None , None , None , None , None , True) for column in FAKE_SELECT_COLUMNS]
+            self._results = self.database.select_rows(query , params)
+        elif statement.startswith('SELECT COUNT(*)'):
+            # e.g. the rollup check: no snapshot has been rolled up yet
+            self._results = [(0,)]
+        return self
+
+    def executemany(self, query: str , rows):
+        self.database.statements += 1
+        if query.lstrip().upper().startswith(f"INSERT INTO {TABLE_NAME.upper()}"):
+            self.database.add_rows(rows)
+
+    def fetchone(self):
+        return self._results[0] if self._results else None
+
+    def fetchall(self):
+        return list(self._results)
+
+    def fetchmany(self, size: int = 1):
+        batch , self._results = self._results[:size] , self._results[size:]
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """
+        In-memory stand-in for SQL Server: keeps inserted rows in a list and answers
+        SELECTs on the crypto table with them (honouring TOP (n)). DDL and other
+        statements are accepted and ignored, so timings measure this project's
+        Python code rather than a database.
+    """
+
+    def __init__(self):
+        self.rows: List[Tuple] = []
+        self.last_id = 0
+        self.statements = 0
+        self._lock = threading.Lock()
+
+    def add_rows(self, rows) -> None:
+        with self._lock:
+            self.rows.extend(tuple(row) for row in rows)
+
+    def select_rows(self, query: str , params) -> List[Tuple]:
+        # INSERT_COLUMNS starts with the selected columns (snapshot_id and coin_id follow)
+        projected = [row[:len(FAKE_SELECT_COLUMNS)] for row in self.rows]
+        match = re.search(r'TOP\s*\(\s*(\?|\d+)\s*\)' , query , re.IGNORECASE)
+        if match:
+            limit = params[0] if match.group(1) == '?' else int(match.group(1))
+            if isinstance(limit , (list , tuple)):
+                limit = limit[0]
+            projected = projected[:int(limit)]
+        return projected
+
+    # pyodbc.Connection interface
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def fake_database(fake: Optional[FakeDatabase] = None):
+    """
+        Route every get_sql_connection() in the project to an in-memory FakeDatabase.
+        The local analytics cache and the in-memory latest market are switched off,
+        so the utils helpers are timed against the (fake) database.
+
+        Yields:
+            The FakeDatabase in use.
+    """
+    fake = fake or FakeDatabase()
+
+    @contextmanager
+    def fake_connection():
+        yield fake
+
+    modules = [database , utils , pipeline , coin_index]
+    originals = [module.get_sql_connection for module in modules]
+    for module in modules:
+        module.get_sql_connection = fake_connection
+    cache_enabled = analytics_cache.ANALYTICS_CACHE_ENABLED
+    analytics_cache.ANALYTICS_CACHE_ENABLED = False
+    market_enabled = market_cache.LATEST_MARKET_CACHE_ENABLED
+    market_cache.LATEST_MARKET_CACHE_ENABLED = False
+    reset_schema_cache()
+    invalidate_stats_cache()
+    coin_index.reset_coin_index()
+    try:
+        yield fake
+    finally:
+        for module , original in zip(modules , originals):
+            module.get_sql_connection = original
+        analytics_cache.ANALYTICS_CACHE_ENABLED = cache_enabled
+        market_cache.LATEST_MARKET_CACHE_ENABLED = market_enabled
+        market_cache.invalidate()
+        reset_schema_cache()
+        invalidate_stats_cache()
+        coin_index.reset_coin_index()
+
+
+def time_call(function: Callable , repeat: int = 5 , setup: Optional[Callable] = None) -> float:
+    """
+        Median wall time of `repeat` calls (setup, if given, runs untimed before each).
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run_suite(sizes=FIXTURE_SIZES , repeat: int = 5) -> Dict[str, float]:
+    """
+        Run every offline benchmark.
+
+        Returns:
+            {benchmark name: median seconds}
+    """
+    results: Dict[str, float] = {}
+    export_dir = os.path.join(BENCHMARK_DIR , 'exports')
+    os.makedirs(export_dir , exist_ok=True)
+
+    for rows in sizes:
+        html = load_fixture(rows)
+        crypto_data = parse_page_source(html , 'bs4')
+
+        for backend in available_backends():
+            results[f"parse_{backend}[{rows}]"] = time_call(partial(parse_page_source , html , backend) , repeat)
+        results[f"parse_json[{rows}]"] = time_call(partial(parse_listing_html , html) , repeat)
+        results[f"normalize[{rows}]"] = time_call(partial(normalize_crypto_data , crypto_data) , repeat)
+
+        # every page of the listing and the empty page that ends it
+        listing = render_listing(rows)
+        with serve_fixture(listing) as base_url:
+            results[f"http_scrape[{rows}]"] = time_call(
+                partial(scrape_coinmarketcap_http , max_pages=len(listing) + 1 , base_url=base_url , fallback=False) ,
+                repeat
+            )
+
+        for strategy in ('fast_executemany' , 'multi_values'):
+            with fake_database() as fake:
+                results[f"insert_{strategy}[{rows}]"] = time_call(
+                    partial(insert_crypto_data , fake , crypto_data , strategy) , repeat ,
+                    setup=fake.rows.clear
+                )
+
+        with fake_database() as fake , warnings.catch_warnings():
+            # pandas warns about any non-SQLAlchemy DBAPI connection, pyodbc included
+            warnings.simplefilter('ignore' , UserWarning)
+            insert_crypto_data(fake , crypto_data)
+            results[f"latest_dataframe[{rows}]"] = time_call(partial(utils.get_latest_crypto_dataframe , rows) , repeat)
+            results[f"export_csv[{rows}]"] = time_call(
+                partial(utils.export_to_csv , os.path.join(export_dir , 'crypto.csv') , rows) , repeat
+            )
+            try:
+                import openpyxl  # noqa: F401  (optional, only needed for the Excel export)
+                results[f"export_excel[{rows}]"] = time_call(
+                    partial(utils.export_to_excel , os.path.join(export_dir , 'crypto.xlsx') , rows) , repeat
+                )
+            except ImportError:
+                logger.info("openpyxl not installed, skipping the Excel export benchmark.")
+
+    return results
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git' , 'rev-parse' , '--short' , 'HEAD'] , capture_output=True ,
+                              text=True , check=True).stdout.strip()
+    except (OSError , subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: str = HISTORY_FILE) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path , encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_regressions(results: Dict[str, float] , previous: Dict[str, float] ,
+                     threshold: float = REGRESSION_THRESHOLD) -> Dict[str, float]:
+    """
+        Compare against a previous run.
+
+        Returns:
+            {benchmark: relative slowdown} for benchmarks slower than threshold.
+    """
+    regressions = {}
+    for name , seconds in results.items():
+        before = previous.get(name)
+        if before and seconds > before * (1 + threshold):
+            regressions[name] = seconds / before - 1
+    return regressions
+
+
+def record_results(results: Dict[str, float] , path: str = HISTORY_FILE) -> Dict[str, float]:
+    """
+        Append a run to the history file and report regressions against the previous run.
+
+        Returns:
+            {benchmark: relative slowdown} (see find_regressions).
+    """
+    history = load_history(path)
+    regressions = find_regressions(results , history[-1]['results']) if history else {}
+
+    os.makedirs(os.path.dirname(path) , exist_ok=True)
+    with open(path , 'a' , encoding='utf-8') as f:
+        f.write(json.dumps({
+            'commit': current_commit(),
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'results': results,
+            'regressions': sorted(regressions),
+        }) + "\n")
+    return regressions
+
+
+def benchmark_insert_strategies(crypto_data: List[Dict[str,str]] , strategies: Optional[List[str]] = None ,
+                                chunk_size: Optional[int] = None) -> Dict[str, float]:
+    """
+        Time every bulk insert strategy on the same rows.
+
+        Args:
+            crypto_data: rows to insert
+            strategies: strategies to compare (default: all of BULK_INSERT_STRATEGIES)
+            chunk_size: rows per chunk/commit (default: INSERT_CHUNK_SIZE)
+        Returns:
+            {strategy: rows per second}
+    """
+    strategies = strategies or list(BULK_INSERT_STRATEGIES)
+    rows = [row + (BENCHMARK_SCRAPED_AT , None , None) for row in to_db_rows(normalize_crypto_data(crypto_data))]
+    results = {}
+
+    with get_sql_connection() as connection:
+        cursor = connection.cursor()
+        create_crypto_table(cursor)
+        connection.commit()
+
+        for strategy in strategies:
+            start = time.perf_counter()
+            inserted = bulk_insert_rows(connection , rows , strategy , chunk_size)
+            elapsed = time.perf_counter() - start
+
+            results[strategy] = inserted / elapsed if elapsed else float('inf')
+            logger.info(f"{strategy}: {inserted} rows in {elapsed:.3f}s ({results[strategy]:,.0f} rows/s)")
+
+            cursor.execute(f"DELETE FROM {TABLE_NAME} WHERE scraped_at = ?" , BENCHMARK_SCRAPED_AT)
+            connection.commit()
+
+        cursor.close()
+
+    return results
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Performance benchmarks for the scraper pipeline.")
+    subparsers = parser.add_subparsers(dest='benchmark' , required=True)
+
+    suite = subparsers.add_parser('suite' , help="Run the offline benchmarks and record the results.")
+    suite.add_argument('--sizes' , type=int , nargs='+' , default=list(FIXTURE_SIZES))
+    suite.add_argument('--repeat' , type=int , default=5)
+    suite.add_argument('--no-record' , action='store_true' , help="Do not append to the history file.")
+
+    fixtures = subparsers.add_parser('fixtures' , help="Generate the saved listing pages.")
+    fixtures.add_argument('--sizes' , type=int , nargs='+' , default=list(FIXTURE_SIZES))
+
+    inserts = subparsers.add_parser('inserts' , help="Compare bulk insert strategies (rows/second).")
+    inserts.add_argument('--rows' , type=int , default=10000)
+    inserts.add_argument('--chunk-size' , type=int , default=None)
+    inserts.add_argument('--strategies' , nargs='+' , choices=sorted(BULK_INSERT_STRATEGIES) , default=None)
+
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    # Setup Logging for Standalone Execution
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    args = parse_args()
+
+    if args.benchmark == 'fixtures':
+        for rows , path in generate_fixtures(args.sizes).items():
+            print(f"   {rows:>6} rows: {path}")
+
+    if args.benchmark == 'suite':
+        results = run_suite(args.sizes , args.repeat)
+        regressions = {} if args.no_record else record_results(results)
+        print(f"\nOffline benchmarks (median of {args.repeat}):")
+        for name , seconds in results.items():
+            flag = f"  REGRESSION +{regressions[name]:.0%}" if name in regressions else ""
+            print(f"   {name:<36} {seconds * 1000:>10.2f} ms{flag}")
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than the previous run by more than {REGRESSION_THRESHOLD:.0%}.")
+
+    if args.benchmark == 'inserts':
+        results = benchmark_insert_strategies(synthetic_crypto_data(args.rows) , args.strategies , args.chunk_size)
+        print(f"\nInsert strategies ({args.rows} rows):")
+        for strategy , rows_per_second in sorted(results.items() , key=lambda item: -item[1]):
+            print(f"   {strategy:<18} {rows_per_second:>12,.0f} rows/s")
@@ -0,0 +1,238 @@
+"""
+Resumable Scrape Checkpoints
+Records every scraped page (and whether its rows reached the database) in a small
+SQLite file, so an interrupted run continues from the first missing page instead of
+scraping every page again.
+"""
+
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime , timedelta
+from typing import List , Dict , Iterable , Iterator , Optional , Tuple , Callable
+
+from config import CHECKPOINT_FILE , CHECKPOINT_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS run (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    started_at TEXT NOT NULL,
+    max_pages INTEGER NOT NULL,
+    snapshot_id INTEGER,
+    rows_inserted INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS page (
+    page INTEGER PRIMARY KEY,
+    row_count INTEGER NOT NULL,
+    rows TEXT,
+    written INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS abandoned (
+    snapshot_id INTEGER PRIMARY KEY,
+    page_count INTEGER NOT NULL,
+    row_count INTEGER NOT NULL
+);
+"""
+
+
+class ScrapeCheckpoint:
+    """
+        On-disk state of the current scrape run, keyed by page number.
+
+        A page is recorded with its rows as soon as it is scraped and marked as
+        written once the batch holding it is committed; written pages keep only
+        their row count. The run's snapshot id is kept too, so a resumed run keeps
+        adding rows to the same (still unfinished) snapshot. When a run is discarded
+        instead, its unfinished snapshot is remembered until it is closed.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_FILE , max_age: float = CHECKPOINT_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.max_pages: Optional[int] = None
+        self._lock = threading.Lock()
+        # record_page() runs on the scraper thread, record_progress() on the writer thread
+        self._connection = sqlite3.connect(path , check_same_thread=False)
+        self._connection.executescript(CHECKPOINT_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _run_row(self) -> Optional[Tuple]:
+        return self._connection.execute(
+            "SELECT started_at, max_pages, snapshot_id, rows_inserted FROM run WHERE id = 1"
+        ).fetchone()
+
+    def begin(self, max_pages: int , started_at: Optional[datetime] = None ,
+              close_snapshot: Optional[Callable[[int, int, int], bool]] = None) -> datetime:
+        """
+            Resume the run in the checkpoint, or start a new one.
+
+            A checkpoint older than max_age seconds is discarded, since its prices
+            would be mixed with fresh ones in a single snapshot. The unfinished
+            snapshot of a discarded run is handed to close_snapshot.
+
+            Args:
+                max_pages: pages this run should cover
+                started_at: start time of a new run (default: now)
+                close_snapshot: called with (snapshot_id, page_count, row_count) for every
+                                abandoned snapshot, e.g. pipeline.close_abandoned_snapshot;
+                                returns False to keep it for the next run
+            Returns:
+                Start time of the run (the original one when resuming).
+        """
+        self.max_pages = max_pages
+        with self._lock:
+            run = self._run_row()
+            resumed_at = None
+            if run is not None:
+                resumed_at = datetime.fromisoformat(run[0])
+                if datetime.now() - resumed_at <= timedelta(seconds=self.max_age):
+                    self._connection.execute("UPDATE run SET max_pages = ? WHERE id = 1" , (max_pages,))
+                    self._connection.commit()
+                    pages = self._connection.execute("SELECT COUNT(*) FROM page").fetchone()[0]
+                    logger.info(f"Resuming scrape started at {resumed_at} ({pages} pages already scraped).")
+                else:
+                    logger.warning(f"Discarding checkpoint from {resumed_at}, older than {self.max_age}s.")
+                    resumed_at = None
+
+            if resumed_at is None:
+                self._discard()
+                started_at = started_at or datetime.now()
+                self._connection.execute(
+                    "INSERT INTO run (id, started_at, max_pages) VALUES (1, ?, ?)",
+                    (started_at.isoformat() , max_pages)
+                )
+                self._connection.commit()
+
+        if close_snapshot is not None:
+            self._close_abandoned(close_snapshot)
+        return resumed_at or started_at
+
+    @property
+    def snapshot_id(self) -> Optional[int]:
+        run = self._run_row()
+        return run[2] if run else None
+
+    @property
+    def rows_inserted(self) -> int:
+        run = self._run_row()
+        return run[3] if run else 0
+
+    def scraped_pages(self) -> Dict[int, int]:
+        """ {page: row count} of every page scraped in this run (0 marks the end of the listing)."""
+        return dict(self._connection.execute("SELECT page, row_count FROM page").fetchall())
+
+    def written_page_count(self) -> int:
+        """ Non-empty pages already committed to the database."""
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM page WHERE written = 1 AND row_count > 0"
+        ).fetchone()[0]
+
+    def unwritten_pages(self) -> Iterator[Tuple[int, List[Dict[str,str]]]]:
+        """ Pages scraped before a restart whose rows never reached the database."""
+        cursor = self._connection.execute("SELECT page, rows FROM page WHERE written = 0 ORDER BY page")
+        for page , rows in cursor.fetchall():
+            yield page , json.loads(rows)
+
+    def record_page(self, page: int , rows: List[Dict[str,str]]) -> None:
+        """ Store a freshly scraped page (empty pages count as written)."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO page (page, row_count, rows, written) VALUES (?, ?, ?, ?)",
+                (page , len(rows) , json.dumps(rows) if rows else None , 0 if rows else 1)
+            )
+            self._connection.commit()
+
+    def record_progress(self, snapshot_id: int , pages: Iterable[int] , rows_inserted: int) -> None:
+        """ Mark pages as committed to the snapshot and drop their rows from the file."""
+        with self._lock:
+            self._connection.execute(
+                "UPDATE run SET snapshot_id = ?, rows_inserted = ? WHERE id = 1",
+                (snapshot_id , rows_inserted)
+            )
+            self._connection.executemany(
+                "UPDATE page SET written = 1, rows = NULL WHERE page = ?",
+                [(page,) for page in pages]
+            )
+            self._connection.commit()
+
+    def _remaining_pages(self) -> List[int]:
+        scraped = self.scraped_pages()
+        end = min((page for page , row_count in scraped.items() if row_count == 0) , default=None)
+        last_page = self.max_pages if end is None else min(self.max_pages , end - 1)
+        return [page for page in range(1 , last_page + 1) if page not in scraped]
+
+    def is_complete(self) -> bool:
+        """ True when every page up to max_pages (or the end of the listing) is scraped."""
+        return not self._remaining_pages()
+
+    def resume(self, iter_pages: Callable[..., Iterator[Tuple[int, List[Dict[str,str]]]]]) -> Iterator[Tuple[int, List[Dict[str,str]]]]:
+        """
+            Replay unwritten pages from the checkpoint, then scrape the missing ones.
+
+            Args:
+                iter_pages: page iterator taking (max_pages, skip_pages=...), e.g.
+                            scraper.iter_coinmarketcap_pages
+            Yields:
+                (page, rows); every scraped page is recorded before it is yielded.
+        """
+        yield from self.unwritten_pages()
+
+        remaining = self._remaining_pages()
+        if not remaining:
+            return
+        logger.info(f"Scraping {len(remaining)} missing pages, starting at page {remaining[0]}.")
+        skip_pages = set(range(1 , self.max_pages + 1)) - set(remaining)
+        for page , rows in iter_pages(self.max_pages , skip_pages=skip_pages):
+            self.record_page(page , rows)
+            yield page , rows
+
+    def abandoned_snapshots(self) -> List[Tuple[int, int, int]]:
+        """ (snapshot_id, page_count, row_count) of discarded runs whose snapshot is not closed yet."""
+        return self._connection.execute(
+            "SELECT snapshot_id, page_count, row_count FROM abandoned ORDER BY snapshot_id"
+        ).fetchall()
+
+    def _close_abandoned(self, close_snapshot: Callable[[int, int, int], bool]) -> None:
+        for snapshot_id , page_count , row_count in self.abandoned_snapshots():
+            if not close_snapshot(snapshot_id , page_count , row_count):
+                logger.warning(f"Abandoned snapshot {snapshot_id} is still open, retrying on the next run.")
+                continue
+            with self._lock:
+                self._connection.execute("DELETE FROM abandoned WHERE snapshot_id = ?" , (snapshot_id,))
+                self._connection.commit()
+
+    def _clear(self) -> None:
+        self._connection.execute("DELETE FROM page")
+        self._connection.execute("DELETE FROM run")
+        self._connection.commit()
+
+    def _discard(self) -> None:
+        run = self._run_row()
+        if run is not None and run[2] is not None:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO abandoned (snapshot_id, page_count, row_count) VALUES (?, ?, ?)",
+                (run[2] , self.written_page_count() , run[3])
+            )
+        self._clear()
+
+    def clear(self) -> None:
+        """ Forget the run after its snapshot is finished."""
+        with self._lock:
+            self._clear()
+
+    def discard(self) -> None:
+        """ Start over: forget the run, keeping its unfinished snapshot to be closed by begin()."""
+        with self._lock:
+            self._discard()
+
+    def close(self) -> None:
+        self._connection.close()
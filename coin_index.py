@@ -0,0 +1,121 @@
+"""
+In-Memory Coin Search Index
+Finds coins by name or symbol without scanning the history table. Every suffix of
+every normalized coin name is kept in one sorted list (a suffix array, the flat form
+of a suffix trie), so "names containing X" is a binary search for the suffixes that
+start with X. The matching coin ids are then read from CryptoCurrency with an index
+seek on (coin_id, snapshot_id).
+"""
+
+import time
+import bisect
+import logging
+import threading
+from typing import List , Dict , Iterable , Optional , Tuple
+
+from config import COIN_INDEX_REFRESH_INTERVAL
+from database import get_sql_connection , COIN_TABLE
+from normalize import normalize_symbol , normalize_name
+
+logger = logging.getLogger(__name__)
+
+
+class CoinIndex:
+    """
+        Substring index over coin names plus an exact index over symbols.
+
+        Example:
+            index = CoinIndex()
+            index.add([(1, 'BTC', 'Bitcoin'), (2, 'BCH', 'Bitcoin Cash')])
+            index.search('coin')    # [1, 2]
+            index.search('bch')     # [2] (exact symbol match)
+    """
+
+    def __init__(self):
+        self._suffixes: List[Tuple[str, int]] = []
+        self._symbols: Dict[str, List[int]] = {}
+        self.coins: Dict[int, Tuple[str, str]] = {}
+        self.max_id = 0
+
+    def __len__(self) -> int:
+        return len(self.coins)
+
+    def add(self, coins: Iterable[Tuple[int, str, str]]) -> None:
+        """ Index (id, symbol, name) rows of the Coin table."""
+        suffixes = []
+        for coin_id , symbol , name in coins:
+            if coin_id in self.coins:
+                continue
+            self.coins[coin_id] = (symbol , name)
+            self.max_id = max(self.max_id , coin_id)
+            key = normalize_name(name)
+            suffixes.extend((key[start:] , coin_id) for start in range(len(key)))
+            self._symbols.setdefault(normalize_symbol(symbol) , []).append(coin_id)
+        if suffixes:
+            # both parts are sorted runs, which sort() merges in linear time
+            self._suffixes.extend(sorted(suffixes))
+            self._suffixes.sort()
+
+    def search(self, text: str) -> List[int]:
+        """
+            Ids of coins whose name contains `text` or whose symbol equals it
+            (case-insensitive, whitespace-normalized).
+        """
+        key = normalize_name(text)
+        if not key:
+            return []
+        matches = set(self._symbols.get(normalize_symbol(text) , ()))
+        position = bisect.bisect_left(self._suffixes , (key ,))
+        while position < len(self._suffixes) and self._suffixes[position][0].startswith(key):
+            matches.add(self._suffixes[position][1])
+            position += 1
+        return sorted(matches)
+
+    def by_symbol(self, symbol: str) -> List[int]:
+        """ Ids of coins listed under exactly this ticker."""
+        return list(self._symbols.get(normalize_symbol(symbol) , ()))
+
+
+_lock = threading.Lock()
+_state: Dict = {'index': None, 'next_refresh': 0.0}
+
+
+def get_coin_index() -> Optional[CoinIndex]:
+    """
+        The process-wide index, topped up with coins added since the last refresh.
+
+        New coins are picked up at most every COIN_INDEX_REFRESH_INTERVAL seconds
+        (one seek on the Coin primary key).
+
+        Returns:
+            CoinIndex, or None if the Coin table could not be read.
+    """
+    with _lock:
+        index = _state['index']
+        if index is not None and time.monotonic() < _state['next_refresh']:
+            return index
+        try:
+            with get_sql_connection() as connection:
+                cursor = connection.cursor()
+                max_id = index.max_id if index is not None else 0
+                cursor.execute(f"SELECT id, symbol, name FROM {COIN_TABLE} WHERE id > ? ORDER BY id" , max_id)
+                rows = cursor.fetchall()
+                cursor.close()
+        except Exception as e:
+            logger.warning(f"Could not load the coin index: {e}")
+            return index
+
+        if index is None:
+            index = _state['index'] = CoinIndex()
+        index.add((row[0] , row[1] , row[2]) for row in rows)
+        _state['next_refresh'] = time.monotonic() + COIN_INDEX_REFRESH_INTERVAL
+        if rows:
+            logger.info(f"Coin index holds {len(index)} coins ({len(rows)} new).")
+        return index
+
+
+def reset_coin_index() -> None:
+    """ Drop the index; the next lookup reloads every coin."""
+    with _lock:
+        _state['index'] = None
+        _state['next_refresh'] = 0.0
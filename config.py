@@ -3,10 +3,40 @@ Configuration File for CoinMarket Project
 """
 
 COINMARKET_URL = 'https://coinmarketcap.com/'
-SCROLL_PAUSE_TIME = 0.5
-SCROLL_STEP = 300
-MAX_SCROLL_ATTEMPTS = 5
+SCROLL_POLL_INTERVAL = 0.1     # seconds between row-count polls while rows render
+SCROLL_SETTLE_TIMEOUT = 2      # max seconds to wait for rows in view to render after a jump
+MAX_SCROLL_ATTEMPTS = 5        # consecutive jumps without new rows before giving up
+MAX_SCROLL_ROUNDS = 100        # hard cap on viewport jumps per page
 EXPLICIT_TIME_WAITOUT = 10
+PAGE_LOAD_DELAY = 3
+
+
+# Driver Pool (parallel multi-page scraping)
+MAX_CONCURRENT_DRIVERS = 4   # 1 scrapes pages one after another in a single browser
+HEADLESS_POOL_DRIVERS = True
+MAX_PAGE_RETRIES = 1
+POOL_PARSE_PROCESSES = 2     # worker processes parsing page sources (0 parses on the driver threads)
+
+
+# Scraper Backend
+# 'http' reads the page's embedded JSON with plain requests (Selenium only as a fallback),
+# 'selenium' drives Chrome for every page.
+SCRAPER_BACKEND = 'selenium'
+HTTP_TIMEOUT = 10
+HTTP_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-US,en;q=0.9"
+}
+
+
+# Table Parser Backend
+# 'bs4' (BeautifulSoup html.parser), 'lxml' (lxml XPath, needs lxml installed)
+# or 'js' (read the table from the live DOM in one execute_script call)
+PARSER_BACKEND = 'lxml'
 
 
 # SQL Server Configuration
@@ -18,6 +48,88 @@ DB_CONFIG = {
     'driver': '{ODBC Driver 17 for SQL Server}'
 }
 
+# Connection Pool
+DB_POOL_MAX_SIZE = 5                  # max connections checked out at once
+DB_POOL_IDLE_TIMEOUT = 300            # seconds before an idle connection is closed
+DB_POOL_HEALTH_CHECK_INTERVAL = 30    # ping connections idle longer than this before reuse
+DB_POOL_ACQUIRE_TIMEOUT = 30          # seconds to wait for a free connection
+
+# Persistence Mode
+# 'full' stores every coin on every run; 'delta' stores only coins whose values moved
+# by more than the relative tolerance below since their last stored row.
+PERSISTENCE_MODE = 'full'
+DELTA_TOLERANCES = {
+    'price': 0.001,        # 0.1 %
+    'market_cap': 0.001,
+    'volume_24h': 0.01,    # 1 %
+}
+DELTA_KEYFRAME_INTERVAL = 24   # every Nth snapshot stores every coin again
+
+# Statistics
+STATS_CACHE_TTL = 60   # seconds get_crypto_statistics() results are reused in-process
+
+# Bulk Insert
+# 'fast_executemany' (pyodbc parameter arrays), 'multi_values' (multi-row INSERT ... VALUES)
+# or 'tvp' (table-valued parameter through a stored procedure)
+BULK_INSERT_STRATEGY = 'fast_executemany'
+INSERT_CHUNK_SIZE = 1000   # rows per chunk; every chunk is committed on its own
+
+# Streaming Pipeline (scrape and insert overlap; memory stays bounded)
+WRITER_QUEUE_PAGES = 4     # scraped pages waiting for the writer before the scraper blocks
+WRITER_BATCH_ROWS = 500    # rows collected before the writer inserts them
+
+# Asyncio Orchestration (python main.py --async)
+ASYNC_FETCH_CONCURRENCY = 8   # HTTP page requests in flight (Selenium pages use MAX_CONCURRENT_DRIVERS)
+ASYNC_PARSE_PROCESSES = 2     # worker processes parsing downloaded pages
+ASYNC_QUEUE_SIZE = 8          # parsed pages waiting for the database writer
+
+# Daemon Mode (python main.py --daemon)
+# Each tier scrapes listing pages 1..pages every `interval` seconds.
+DAEMON_TIERS = [
+    {'name': 'top', 'pages': 1, 'interval': 60},      # top 100 every minute
+    {'name': 'tail', 'pages': 10, 'interval': 900},   # long tail every 15 minutes
+]
+DAEMON_SLOW_FACTOR = 0.5   # a run longer than this share of its interval counts as slow
+DAEMON_MAX_BACKOFF = 8     # slow runs stretch the interval up to this factor
+
+# Partitioning and Retention (history partitioned on scraped_at, see delete_old_data)
+PARTITIONING_ENABLED = True        # falls back to batched deletes where unsupported
+PARTITION_GRANULARITY = 'month'    # 'day' or 'month'
+PARTITIONS_AHEAD = 3               # empty future partitions kept split (a metadata-only operation)
+RETENTION_BATCH_SIZE = 5000        # rows per transaction when deleting row by row
+
+# Exports (utils.export_*)
+EXPORT_CHUNK_SIZE = 50000   # rows fetched and written per chunk
+
+# Coin Search Index (in-memory, see coin_index.py)
+COIN_INDEX_REFRESH_INTERVAL = 300   # seconds between checks for newly listed coins
+
+# Local Analytics Cache (Parquet copy of finished snapshots, see analytics_cache.py; needs pyarrow)
+ANALYTICS_CACHE_ENABLED = True
+ANALYTICS_CACHE_DIR = 'analytics_cache'
+ANALYTICS_CACHE_SYNC_INTERVAL = 60   # seconds between the daemon's background syncs
+
+# In-Memory Latest Market (current snapshot by rank/symbol/name, see market_cache.py)
+LATEST_MARKET_CACHE_ENABLED = True
+LATEST_MARKET_CHECK_INTERVAL = 5   # seconds between checks for a snapshot saved by another process
+
+# Raw Page Archive (compressed, content-addressed page HTML for replays, see archive.py)
+ARCHIVE_ENABLED = False
+ARCHIVE_DIR = 'page_archive'
+ARCHIVE_COMPRESSION = 'gzip'      # or 'zstd' (needs pip install zstandard)
+ARCHIVE_REPLAY_PROCESSES = 4      # worker processes parsing archived pages on replay
+
+# Metrics (stage timings and counters, see metrics.py)
+METRICS_ENABLED = True
+METRICS_PREFIX = 'coinmarketcap_scraper'
+METRICS_FILE = 'metrics.prom'        # Prometheus textfile, rewritten after every run
+METRICS_SUMMARY_DIR = 'metrics'      # one JSON summary per run
+METRICS_PORT = None                  # e.g. 9108 to serve /metrics while the daemon runs
+
+# Resumable Scrape Checkpoints
+CHECKPOINT_FILE = 'scrape_checkpoint.sqlite'
+CHECKPOINT_MAX_AGE = 3600  # seconds; older unfinished runs start over instead of resuming
+
 # Logging Configurations
 
 LOG_LEVEL = 'INFO'
@@ -43,3 +155,4 @@ CHROME_EXPERIMENTAL_OPTIONS = {
 
 # Table Schema
 TABLE_NAME = 'CryptoCurrency'
+MIGRATION_BATCH_SIZE = 5000
@@ -0,0 +1,181 @@
+"""
+Continuous Scraping Daemon
+Keeps Chrome drivers, the HTTP session and pooled DB connections warm between runs and
+scrapes tiers of listing pages on their own intervals (e.g. the top 100 every minute,
+the long tail every 15 minutes).
+"""
+
+import math
+import time
+import signal
+import logging
+import threading
+import requests
+from datetime import datetime
+from typing import List , Dict , Optional
+
+from config import (
+    SCRAPER_BACKEND,
+    MAX_CONCURRENT_DRIVERS,
+    DAEMON_TIERS,
+    DAEMON_SLOW_FACTOR,
+    DAEMON_MAX_BACKOFF,
+    METRICS_ENABLED,
+    METRICS_PORT
+)
+from pipeline import stream_to_sql_server
+from database import close_connection_pool
+from metrics import RunMetrics , increment , write_prometheus_file , start_metrics_server
+import analytics_cache
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeTier:
+    """
+        One schedule of the daemon: scrape the first `pages` listing pages every
+        `interval` seconds.
+
+        The effective interval is interval * backoff. A run that takes longer than
+        DAEMON_SLOW_FACTOR of the interval, or loses pages, doubles the backoff (up
+        to DAEMON_MAX_BACKOFF); a fast, clean run halves it again.
+    """
+
+    def __init__(self, name: str , pages: int , interval: float):
+        self.name = name
+        self.pages = pages
+        self.interval = interval
+        self.backoff = 1.0
+        self.next_due = time.monotonic()
+        self.runs = 0
+        self.skipped = 0
+
+    @property
+    def effective_interval(self) -> float:
+        return self.interval * self.backoff
+
+    def schedule_next(self, started: float , elapsed: float , failed_pages: int) -> None:
+        """ Adapt the backoff to the last run and move next_due, skipping missed ticks."""
+        if elapsed > self.interval * DAEMON_SLOW_FACTOR or failed_pages:
+            backoff = min(self.backoff * 2 , DAEMON_MAX_BACKOFF)
+            if backoff != self.backoff:
+                logger.warning(f"Tier '{self.name}' is slow ({elapsed:.1f}s, {failed_pages} failed pages); "
+                               f"backing off to every {self.interval * backoff:.0f}s.")
+            self.backoff = backoff
+        elif self.backoff > 1:
+            self.backoff = max(1.0 , self.backoff / 2)
+            logger.info(f"Tier '{self.name}' recovered; running every {self.effective_interval:.0f}s.")
+
+        self.next_due = started + self.effective_interval
+        now = time.monotonic()
+        if self.next_due <= now:
+            # overran: drop the ticks that were missed instead of running them back to back
+            missed = math.ceil((now - self.next_due) / self.effective_interval)
+            self.next_due += missed * self.effective_interval
+            self.skipped += missed
+            logger.warning(f"Tier '{self.name}' overran its interval; skipping {missed} tick(s).")
+
+
+class ScrapeDaemon:
+    """
+        Long-running scheduler that saves one snapshot per tier run.
+
+        Runs of the deepest tier are the market snapshots; shallower tiers (e.g. the
+        top 100 every minute) are saved as partial snapshots, which refresh those
+        coins' history without ever being read as the whole market.
+
+        Runs are executed one at a time, so a slow run delays (and skips ticks of)
+        the others rather than piling up concurrent scrapes.
+
+        Args:
+            tiers: [{'name', 'pages', 'interval'}] (default: DAEMON_TIERS)
+            backend: 'http' or 'selenium'
+    """
+
+    def __init__(self, tiers: Optional[List[Dict]] = None , backend: str = SCRAPER_BACKEND):
+        self.tiers = [ScrapeTier(tier['name'] , tier['pages'] , tier['interval']) for tier in (tiers or DAEMON_TIERS)]
+        # only the deepest tier scrapes the whole listing; the others save partial snapshots
+        self.full_pages = max(tier.pages for tier in self.tiers)
+        self.backend = backend
+        self._stop = threading.Event()
+        self._session: Optional[requests.Session] = None
+        self._pool = None
+
+    def stop(self, *args) -> None:
+        """ Ask the daemon to exit after the current run (also used as a signal handler)."""
+        logger.info("Stopping daemon after the current run...")
+        self._stop.set()
+
+    def _driver_pool(self):
+        if self._pool is None:
+            from scraper import ChromeDriverPool
+            self._pool = ChromeDriverPool(size=MAX_CONCURRENT_DRIVERS)
+        return self._pool
+
+    def _iter_pages(self, pages: int):
+        if self.backend == 'http':
+            import http_scraper
+            self._session = self._session or requests.Session()
+            return http_scraper.iter_coinmarketcap_http(pages , session=self._session , pool=self._driver_pool()) , http_scraper
+        import scraper
+        return scraper.iter_coinmarketcap_pages(pages , pool=self._driver_pool()) , scraper
+
+    def run_tier(self, tier: ScrapeTier) -> None:
+        """ Scrape and save one tier, then schedule its next run."""
+        started = time.monotonic()
+        run_metrics = RunMetrics(f"daemon-{tier.name}")
+        logger.info(f"Running tier '{tier.name}' ({tier.pages} pages).")
+        iter_pages , module = self._iter_pages(tier.pages)
+        rows_inserted = stream_to_sql_server(iter_pages , started_at=datetime.now() ,
+                                             partial=tier.pages < self.full_pages)
+        elapsed = time.monotonic() - started
+
+        failed_pages = len(module.last_scrape_report.get('failed_pages' , {}))
+        skipped_before = tier.skipped
+        tier.runs += 1
+        logger.info(f"Tier '{tier.name}' saved {rows_inserted} rows in {elapsed:.1f}s.")
+        tier.schedule_next(started , elapsed , failed_pages + (rows_inserted is None))
+        increment('ticks_skipped' , tier.skipped - skipped_before)
+        # copy the new snapshots to the analytics cache off the lookup path
+        analytics_cache.sync_if_due()
+
+        if METRICS_ENABLED:
+            run_metrics.write_summary()
+            write_prometheus_file()
+
+    def run(self) -> None:
+        """ Run tiers as they fall due until stop() is called (or SIGINT/SIGTERM)."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT , self.stop)
+            signal.signal(signal.SIGTERM , self.stop)
+
+        metrics_server = start_metrics_server(METRICS_PORT) if METRICS_ENABLED and METRICS_PORT else None
+        logger.info("Daemon started: " + ", ".join(
+            f"{tier.name} ({tier.pages} pages every {tier.interval}s)" for tier in self.tiers))
+        try:
+            while not self._stop.is_set():
+                tier = min(self.tiers , key=lambda candidate: candidate.next_due)
+                wait = tier.next_due - time.monotonic()
+                if wait > 0:
+                    self._stop.wait(wait)
+                    continue
+                try:
+                    self.run_tier(tier)
+                except Exception as e:
+                    logger.error(f"Tier '{tier.name}' failed: {e}" , exc_info=True)
+                    tier.schedule_next(time.monotonic() , 0 , failed_pages=1)
+        finally:
+            if metrics_server is not None:
+                metrics_server.shutdown()
+            self.close()
+
+    def close(self) -> None:
+        """ Quit the warm browsers and close the HTTP session and DB connections."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        close_connection_pool()
+        logger.info("Daemon stopped.")
@@ -4,157 +4,1206 @@ Handles all database connections, table creation, and data operations
 """
 
 import pyodbc
-from datetime import datetime
+import time
+import numpy as np
+import pandas as pd
+import atexit
+import threading
+from datetime import datetime , timedelta
 from contextlib import contextmanager
-from typing import List , Dict , Optional
+from typing import List , Dict , Optional , Tuple , Callable , Union
 import logging
 
 
-from config import DB_CONFIG , TABLE_NAME
+from config import (
+    DB_CONFIG,
+    TABLE_NAME,
+    BULK_INSERT_STRATEGY,
+    INSERT_CHUNK_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_IDLE_TIMEOUT,
+    DB_POOL_HEALTH_CHECK_INTERVAL,
+    DB_POOL_ACQUIRE_TIMEOUT,
+    STATS_CACHE_TTL,
+    PERSISTENCE_MODE,
+    DELTA_TOLERANCES,
+    DELTA_KEYFRAME_INTERVAL,
+    PARTITIONING_ENABLED,
+    PARTITION_GRANULARITY,
+    PARTITIONS_AHEAD,
+    RETENTION_BATCH_SIZE
+)
+from metrics import timed , increment
+from normalize import normalize_crypto_data , to_db_rows , coin_keys , NORMALIZED_COLUMNS
+import market_cache
 
 logger = logging.getLogger(__name__)
 
+INSERT_COLUMNS = NORMALIZED_COLUMNS + ['scraped_at', 'snapshot_id', 'coin_id']
+
+# One row per scrape run; coin rows reference it through snapshot_id
+SNAPSHOT_TABLE = 'Snapshot'
+
+# Latest completed snapshot of the whole listing (primary key seek on Snapshot);
+# partial snapshots (daemon tiers that stop early, e.g. the top 100) never count as the market
+LATEST_SNAPSHOT_SQL = f"SELECT TOP 1 id FROM {SNAPSHOT_TABLE} WHERE finished_at IS NOT NULL AND is_partial = 0 ORDER BY id DESC"
+
+# Coins are identified by (symbol, name) when comparing runs in delta mode
+COIN_KEY_COLUMNS = ['symbol', 'name']
+
+# Coin dimension: one row per normalized (symbol, name), referenced through coin_id
+COIN_TABLE = 'Coin'
+
+# Table-valued parameter objects used by the 'tvp' bulk insert strategy
+TVP_TYPE_NAME = 'CryptoRowType'
+TVP_PROCEDURE = 'usp_InsertCryptoRows'
+
+# Incrementally maintained statistics (see get_crypto_statistics)
+STATS_TABLE = 'CryptoStats'
+# Indexed view of older schemas (unique_cryptos now comes from the Coin table); dropped by migrations
+NAME_COUNTS_VIEW = 'vw_CryptoNameCounts'
+
+# Rollups maintained when a snapshot finishes (see rollup_snapshot)
+HOURLY_ROLLUP_TABLE = 'CoinHourly'
+DAILY_ROLLUP_TABLE = 'CoinDaily'
+SNAPSHOT_TOTALS_TABLE = 'SnapshotTotals'
+# rollup table -> start of the period holding a row's scraped_at
+ROLLUP_PERIODS = {
+    HOURLY_ROLLUP_TABLE: "DATEADD(hour, DATEDIFF(hour, 0, scraped_at), 0)",
+    DAILY_ROLLUP_TABLE: "DATEADD(day, DATEDIFF(day, 0, scraped_at), 0)",
+}
+
+# History partitioned on scraped_at, so retention can truncate whole partitions
+PARTITION_FUNCTION = f'pf_{TABLE_NAME}_scraped_at'
+PARTITION_SCHEME = f'ps_{TABLE_NAME}_scraped_at'
+
+# SQL Server limits for a single multi-row INSERT ... VALUES statement
+MAX_STATEMENT_PARAMETERS = 2100
+MAX_VALUES_ROWS = 1000
+
+def build_connection_string() -> str:
+    """ Build the ODBC connection string from DB_CONFIG."""
+    if DB_CONFIG['username']:
+        # SQL Server Authentication
+        return (
+            f"DRIVER={DB_CONFIG['driver']};"
+            f"SERVER={DB_CONFIG['server']};"
+            f"DATABASE={DB_CONFIG['database']};"
+            f"UID={DB_CONFIG['username']};"
+            f"PWD={DB_CONFIG['password']}"
+        )
+    # Window Authentication
+    return (
+        f"DRIVER={DB_CONFIG['driver']};"
+        f"SERVER={DB_CONFIG['server']};"
+        f"DATABASE={DB_CONFIG['database']};"
+        f"Trusted_Connection=yes"
+    )
+
+
+class ConnectionPool:
+    """
+        Process-wide pool of pyodbc connections.
+
+        At most `max_size` connections are checked out at once. Idle connections
+        older than `idle_timeout` seconds are closed, and a connection that sat idle
+        longer than `health_check_interval` seconds is pinged before it is reused.
+    """
+
+    def __init__(self, max_size: int = DB_POOL_MAX_SIZE , idle_timeout: float = DB_POOL_IDLE_TIMEOUT ,
+                 health_check_interval: float = DB_POOL_HEALTH_CHECK_INTERVAL ,
+                 acquire_timeout: float = DB_POOL_ACQUIRE_TIMEOUT):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle: List[Tuple[pyodbc.Connection, float]] = []   # (connection, last used), newest last
+
+    @staticmethod
+    def _close(connection: pyodbc.Connection) -> None:
+        try:
+            connection.close()
+        except pyodbc.Error as e:
+            logger.debug(f"Error closing connection: {e}")
+
+    @staticmethod
+    def _is_healthy(connection: pyodbc.Connection) -> bool:
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except pyodbc.Error as e:
+            logger.warning(f"Discarding unhealthy pooled connection: {e}")
+            return False
+
+    def _evict_idle(self) -> None:
+        """ Close connections that sat idle longer than idle_timeout."""
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            expired = [connection for connection , last_used in self._idle if last_used < cutoff]
+            self._idle = [(connection , last_used) for connection , last_used in self._idle if last_used >= cutoff]
+        for connection in expired:
+            self._close(connection)
+        if expired:
+            logger.info(f"Closed {len(expired)} idle database connection(s).")
+
+    def acquire(self) -> pyodbc.Connection:
+        """
+            Borrow a connection, opening a new one when no healthy idle connection is left.
+
+            Raises:
+                TimeoutError: if all max_size connections stay checked out for acquire_timeout.
+        """
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(f"No database connection available within {self.acquire_timeout}s")
+
+        try:
+            self._evict_idle()
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    connection , last_used = self._idle.pop()
+                if time.monotonic() - last_used < self.health_check_interval or self._is_healthy(connection):
+                    return connection
+                self._close(connection)
+
+            with timed('db_connect'):
+                connection = pyodbc.connect(build_connection_string())
+            logger.info("Database Connection Established!")
+            return connection
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection: pyodbc.Connection , broken: bool = False) -> None:
+        """
+            Return a connection to the pool.
+
+            Args:
+                connection: connection obtained from acquire()
+                broken: close it instead of keeping it (e.g. after a driver error)
+        """
+        try:
+            if not broken:
+                try:
+                    # never hand an open transaction to the next borrower
+                    connection.rollback()
+                except pyodbc.Error:
+                    broken = True
+
+            if broken:
+                self._close(connection)
+                logger.info("Database Connection Closed!.")
+            else:
+                with self._lock:
+                    self._idle.append((connection , time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close_all(self) -> None:
+        """ Close every idle connection."""
+        with self._lock:
+            idle , self._idle = self._idle , []
+        for connection , _ in idle:
+            self._close(connection)
+        if idle:
+            logger.info(f"Closed {len(idle)} pooled database connection(s).")
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool:
+    """ Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+            atexit.register(_pool.close_all)
+        return _pool
+
+
+def close_connection_pool() -> None:
+    """ Close all pooled connections (the pool is recreated on next use)."""
+    global _pool
+    with _pool_lock:
+        pool , _pool = _pool , None
+    if pool:
+        pool.close_all()
+
+
 @contextmanager
 def get_sql_connection():
     """
-    Context manager for SQL Server connection to ensure proper cleanup.
+    Context manager that borrows a pooled SQL Server connection and returns it afterwards.
     
     Yields:
         pyodbc.Connection: Active database connection
     """
 
+    pool = get_connection_pool()
     connection = None
+    broken = False
     try:
-        # Build Connection String
-        if DB_CONFIG['username']:
-            # SQL Server Authentication
-            conn_str = (
-                f"DRIVER={DB_CONFIG['driver']};"
-                f"SERVER={DB_CONFIG['server']};"
-                f"DATABASE={DB_CONFIG['database']};"
-                f"UID={DB_CONFIG['username']};"
-                f"PWD={DB_CONFIG['password']}"
-            )
-        else:
-            # Window Authentication
-            conn_str = (
-                f"DRIVER={DB_CONFIG['driver']};"
-                f"SERVER={DB_CONFIG['server']};"
-                f"DATABASE={DB_CONFIG['database']};"
-                f"Trusted_Connection=yes"
-            )
-        
-        connection = pyodbc.connect(conn_str)
-        logger.info("Database Connection Established!")
+        connection = pool.acquire()
         yield connection
     
     except pyodbc.Error as e:
-        logger.error("Database Connection Error {e}")
+        broken = True
+        logger.error(f"Database Connection Error {e}")
         raise
     finally:
 
         if connection:
-            connection.close()
-            logger.info("Database Connection Closed!.")
+            pool.release(connection , broken)
+
+
+def period_start(moment: datetime , granularity: str = PARTITION_GRANULARITY) -> datetime:
+    """ Start of the day or month holding `moment`."""
+    if granularity == 'day':
+        return datetime(moment.year , moment.month , moment.day)
+    return datetime(moment.year , moment.month , 1)
+
+
+def next_period(start: datetime , granularity: str = PARTITION_GRANULARITY) -> datetime:
+    """ Start of the day or month after the one starting at `start`."""
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    return datetime(start.year + start.month // 12 , start.month % 12 + 1 , 1)
+
+
+def partition_boundaries(first: datetime , last: datetime , granularity: str = PARTITION_GRANULARITY) -> List[datetime]:
+    """ Period starts from the period holding `first` through the one holding `last`."""
+    boundaries = []
+    boundary = period_start(first , granularity)
+    while boundary <= last:
+        boundaries.append(boundary)
+        boundary = next_period(boundary , granularity)
+    return boundaries
+
+
+def _sql_datetime(moment: datetime) -> str:
+    return f"'{moment:%Y-%m-%dT%H:%M:%S}'"
+
+
+def partitioning_supported(cursor: pyodbc.Cursor) -> bool:
+    """ Every edition partitions since SQL Server 2016 (TRUNCATE ... WITH PARTITIONS needs 2016 too)."""
+    if not PARTITIONING_ENABLED:
+        return False
+    cursor.execute("SELECT CAST(SERVERPROPERTY('ProductMajorVersion') AS INT), CAST(SERVERPROPERTY('EngineEdition') AS INT)")
+    major , edition = cursor.fetchone()
+    # 5 / 8: Azure SQL Database / Managed Instance
+    return (major or 0) >= 13 or edition in (5 , 8)
+
+
+def is_partitioned(cursor: pyodbc.Cursor , table: str = TABLE_NAME) -> bool:
+    """ True when the table (its heap or clustered index) lives on a partition scheme."""
+    cursor.execute("""
+    SELECT COUNT(*) FROM sys.indexes i
+    JOIN sys.partition_schemes ps ON ps.data_space_id = i.data_space_id
+    WHERE i.object_id = OBJECT_ID(?) AND i.index_id IN (0, 1)
+    """ , table)
+    return cursor.fetchone()[0] > 0
+
+
+def _existing_boundaries(cursor: pyodbc.Cursor) -> Optional[List[datetime]]:
+    cursor.execute("SELECT COUNT(*) FROM sys.partition_functions WHERE name = ?" , PARTITION_FUNCTION)
+    if not cursor.fetchone()[0]:
+        return None
+    cursor.execute("""
+    SELECT CAST(v.value AS DATETIME) FROM sys.partition_range_values v
+    JOIN sys.partition_functions f ON f.function_id = v.function_id
+    WHERE f.name = ?
+    ORDER BY v.boundary_id
+    """ , PARTITION_FUNCTION)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def create_partition_objects(cursor: pyodbc.Cursor , first: Optional[datetime] = None) -> bool:
+    """
+        Create the scraped_at partition function and scheme, or split in the
+        boundaries they are missing.
+
+        Boundaries run from the period holding `first` (default: now) to
+        PARTITIONS_AHEAD periods ahead, so new rows always land in an empty,
+        already split partition and splitting never has to move data.
+
+        Args:
+            cursor: Database Cursor Object
+            first: oldest scraped_at that needs its own partition
+        Returns:
+            True if the table can be partitioned, False where partitioning is
+            disabled or unsupported.
+    """
+    if not partitioning_supported(cursor):
+        return False
+
+    now = datetime.now()
+    last = period_start(now)
+    for _ in range(PARTITIONS_AHEAD):
+        last = next_period(last)
+    wanted = partition_boundaries(first or now , last)
+
+    existing = _existing_boundaries(cursor)
+    if existing is None:
+        cursor.execute(f"""
+        CREATE PARTITION FUNCTION {PARTITION_FUNCTION} (DATETIME)
+        AS RANGE RIGHT FOR VALUES ({', '.join(_sql_datetime(boundary) for boundary in wanted)})
+        """)
+        logger.info(f"Partition function '{PARTITION_FUNCTION}' created with {len(wanted)} boundaries.")
+        existing = wanted
+
+    cursor.execute(f"""
+    IF NOT EXISTS (SELECT * FROM sys.partition_schemes WHERE name = '{PARTITION_SCHEME}')
+    CREATE PARTITION SCHEME {PARTITION_SCHEME} AS PARTITION {PARTITION_FUNCTION} ALL TO ([PRIMARY])
+    """)
+
+    missing = sorted(set(wanted) - set(existing))
+    for boundary in missing:
+        cursor.execute(f"ALTER PARTITION SCHEME {PARTITION_SCHEME} NEXT USED [PRIMARY]")
+        cursor.execute(f"ALTER PARTITION FUNCTION {PARTITION_FUNCTION}() SPLIT RANGE ({_sql_datetime(boundary)})")
+    if missing:
+        logger.info(f"Split {len(missing)} new partitions, up to {missing[-1]:%Y-%m-%d}.")
+    return True
+
+
+_partitions_checked_until = {'moment': datetime.min}
+
+
+def maintain_partitions(connection: pyodbc.Connection) -> None:
+    """ Keep future partitions split ahead; runs at most once per period in a process."""
+    now = datetime.now()
+    if now < _partitions_checked_until['moment']:
+        return
+    cursor = connection.cursor()
+    try:
+        if is_partitioned(cursor):
+            create_partition_objects(cursor)
+            connection.commit()
+        _partitions_checked_until['moment'] = next_period(period_start(now))
+    except pyodbc.Error as e:
+        connection.rollback()
+        logger.warning(f"Could not split future partitions: {e}")
+    finally:
+        cursor.close()
 
 
 def create_crypto_table(cursor: pyodbc.Cursor) -> None:
     """
         Create Crypto Currency Table
 
+        Where the server supports it the table and all of its indexes are
+        partitioned on scraped_at (PARTITION_GRANULARITY), so retention can
+        truncate whole partitions. The primary key then includes scraped_at,
+        as every unique index on a partitioned table must.
+
         Args:
             cursor: Database Cursor Object
     """
 
+    cursor.execute("SELECT COUNT(*) FROM sys.tables WHERE name = ?" , TABLE_NAME)
+    if cursor.fetchone()[0]:
+        logger.info(f"Table '{TABLE_NAME}' already exists.")
+        return
+
+    partitioned = create_partition_objects(cursor)
+    primary_key = "id, scraped_at" if partitioned else "id"
+    storage = f"ON {PARTITION_SCHEME} (scraped_at)" if partitioned else ""
+
     create_table_query = f"""
-    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name = '{TABLE_NAME}' and xtype='U')
     CREATE TABLE {TABLE_NAME} (
-    id INT IDENTITY(1,1) PRIMARY KEY,
+        id INT IDENTITY(1,1) NOT NULL,
+        snapshot_id INT,
         rank INT,
         name NVARCHAR(100),
-        price NVARCHAR(50),
-        one_hour_change NVARCHAR(20),
-        twenty_four_hour_change NVARCHAR(20),
-        seven_day_change NVARCHAR(20),
-        market_cap NVARCHAR(50),
-        volume_24h NVARCHAR(50),
-        circulating_supply NVARCHAR(100),
-        scraped_at DATETIME DEFAULT GETDATE(),
+        symbol NVARCHAR(20),
+        price DECIMAL(38,18),
+        one_hour_change DECIMAL(18,4),
+        twenty_four_hour_change DECIMAL(18,4),
+        seven_day_change DECIMAL(18,4),
+        market_cap DECIMAL(38,2),
+        volume_24h DECIMAL(38,2),
+        circulating_supply DECIMAL(38,4),
+        scraped_at DATETIME NOT NULL DEFAULT GETDATE(),
+        coin_id INT NULL,
+        CONSTRAINT PK_{TABLE_NAME} PRIMARY KEY NONCLUSTERED ({primary_key}),
+        INDEX idx_snapshot_rank CLUSTERED (snapshot_id, rank),
+        INDEX idx_coin_snapshot (coin_id, snapshot_id) INCLUDE (scraped_at, price, market_cap, volume_24h),
         INDEX idx_name (name),
+        INDEX idx_symbol (symbol),
         INDEX idx_rank (rank),
-        INDEX idx_scraped_at (scraped_at)
-    )
+        INDEX idx_scraped_at (scraped_at),
+        INDEX idx_scraped_at_market_cap (scraped_at, market_cap DESC)
+    ) {storage}
     """
 
     cursor.execute(create_table_query)
-    logger.info(f"Table '{TABLE_NAME}' created or already exists.")
+    logger.info(f"Table '{TABLE_NAME}' created{' (partitioned on scraped_at)' if partitioned else ''}.")
+
+
+def create_coin_table(cursor: pyodbc.Cursor) -> None:
+    """
+        Create the Coin dimension (one row per coin, keyed by normalized symbol and name).
+
+        Duplicate keys are ignored on insert, so concurrent savers can both add a
+        new coin without failing.
+
+        Args:
+            cursor: Database Cursor Object
+    """
+
+    cursor.execute(f"""
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name = '{COIN_TABLE}' and xtype='U')
+    CREATE TABLE {COIN_TABLE} (
+        id INT IDENTITY(1,1) PRIMARY KEY,
+        symbol NVARCHAR(20) NULL,
+        name NVARCHAR(100) NULL,
+        symbol_key NVARCHAR(20) NOT NULL,
+        name_key NVARCHAR(100) NOT NULL,
+        first_seen DATETIME NOT NULL DEFAULT GETDATE(),
+        INDEX ux_coin_key UNIQUE (symbol_key, name_key) WITH (IGNORE_DUP_KEY = ON),
+        INDEX idx_coin_name_key (name_key)
+    )
+    """)
+    logger.info(f"Table '{COIN_TABLE}' created or already exists.")
+
+
+def create_snapshot_table(cursor: pyodbc.Cursor) -> None:
+    """
+        Create the Snapshot table (one row per scrape run).
+
+        Args:
+            cursor: Database Cursor Object
+    """
+
+    cursor.execute(f"""
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name = '{SNAPSHOT_TABLE}' and xtype='U')
+    CREATE TABLE {SNAPSHOT_TABLE} (
+        id INT IDENTITY(1,1) PRIMARY KEY,
+        started_at DATETIME NOT NULL,
+        finished_at DATETIME NULL,
+        page_count INT NULL,
+        row_count INT NULL,
+        is_keyframe BIT NOT NULL CONSTRAINT DF_{SNAPSHOT_TABLE}_is_keyframe DEFAULT 1,
+        is_partial BIT NOT NULL CONSTRAINT DF_{SNAPSHOT_TABLE}_is_partial DEFAULT 0
+    )
+    """)
+    logger.info(f"Table '{SNAPSHOT_TABLE}' created or already exists.")
+
+
+def snapshot_rows_query(snapshot: str = '?') -> str:
+    """
+        SQL for the full coin list of one snapshot.
+
+        In delta mode a snapshot only stores coins that changed, so the list is rebuilt
+        from the newest stored row of every coin between the last keyframe (a snapshot
+        that stored every coin) and the requested snapshot. For keyframes this is a
+        plain seek on the (snapshot_id, rank) index.
+
+        Args:
+            snapshot: SQL expression for the snapshot id; it appears twice, so a '?'
+                      placeholder needs the id passed twice.
+        Returns:
+            SELECT statement yielding every CryptoCurrency column (plus row_version).
+    """
+    return f"""
+    SELECT versions.*
+    FROM (
+        SELECT c.*, ROW_NUMBER() OVER (PARTITION BY c.symbol, c.name ORDER BY c.snapshot_id DESC) AS row_version
+        FROM {TABLE_NAME} c
+        JOIN {SNAPSHOT_TABLE} s ON s.id = c.snapshot_id
+        WHERE s.finished_at IS NOT NULL
+          AND c.snapshot_id <= {snapshot}
+          AND c.snapshot_id >= (
+              SELECT MAX(k.id) FROM {SNAPSHOT_TABLE} k
+              WHERE k.is_keyframe = 1 AND k.finished_at IS NOT NULL AND k.id <= {snapshot})
+    ) AS versions
+    WHERE versions.row_version = 1
+    """
+
+
+LATEST_SNAPSHOT_ROWS_SQL = snapshot_rows_query(f"({LATEST_SNAPSHOT_SQL})")
 
 
-def insert_crypto_data(connection:pyodbc.Connection , crypto_data: List[Dict[str,str]]) ->int:
+_schema_lock = threading.Lock()
+_schema_ready = set()   # schema parts already bootstrapped in this process
+
+
+def ensure_schema(connection: pyodbc.Connection , tvp: bool = False) -> None:
+    """
+        Create the table (and, for the 'tvp' strategy, the bulk insert objects)
+        once per process instead of on every save.
+
+        Args:
+            connection: Active DB connection
+            tvp: also create the table type and procedure used by the 'tvp' strategy
+    """
+    parts = {
+        'snapshot': create_snapshot_table,
+        'coin': create_coin_table,
+        'table': create_crypto_table,
+        'stats': create_stats_objects,
+        'rollups': create_rollup_tables,
+    }
+    if tvp:
+        parts['tvp'] = create_bulk_insert_objects
+
+    with _schema_lock:
+        missing = [name for name in parts if name not in _schema_ready]
+        if not missing:
+            return
+        cursor = connection.cursor()
+        try:
+            for name in missing:
+                parts[name](cursor)
+            connection.commit()
+            _schema_ready.update(missing)
+        finally:
+            cursor.close()
+
+
+def reset_schema_cache() -> None:
+    """ Forget the bootstrap state, e.g. after a migration changed the schema."""
+    with _schema_lock:
+        _schema_ready.clear()
+    reset_coin_cache()
+
+
+def create_stats_objects(cursor: pyodbc.Cursor) -> None:
+    """
+        Create the single-row statistics table, seeding it from the existing
+        history once.
+
+        Args:
+            cursor: Database Cursor Object
+    """
+
+    cursor.execute(f"""
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name = '{STATS_TABLE}' and xtype='U')
+    CREATE TABLE {STATS_TABLE} (
+        id INT PRIMARY KEY CHECK (id = 1),
+        total_records BIGINT NOT NULL,
+        unique_cryptos INT NOT NULL,
+        first_scrape DATETIME NULL,
+        last_scrape DATETIME NULL,
+        total_scrapes INT NOT NULL,
+        updated_at DATETIME NOT NULL DEFAULT GETDATE()
+    )
+    """)
+
+    # One-time backfill; afterwards the row is updated incrementally
+    cursor.execute(f"""
+    IF NOT EXISTS (SELECT * FROM {STATS_TABLE} WHERE id = 1)
+    INSERT INTO {STATS_TABLE} (id, total_records, unique_cryptos, first_scrape, last_scrape, total_scrapes)
+    SELECT 1, COUNT_BIG(*), (SELECT COUNT(*) FROM {COIN_TABLE}), MIN(scraped_at), MAX(scraped_at), COUNT(DISTINCT scraped_at)
+    FROM {TABLE_NAME}
+    """)
+    logger.info(f"Statistics table '{STATS_TABLE}' created or already exists.")
+
+
+def create_rollup_tables(cursor: pyodbc.Cursor) -> None:
+    """
+        Create the per-coin hourly/daily rollups and the per-snapshot market totals.
+
+        Args:
+            cursor: Database Cursor Object
+    """
+
+    for table in ROLLUP_PERIODS:
+        cursor.execute(f"""
+        IF NOT EXISTS (SELECT * FROM sysobjects WHERE name = '{table}' and xtype='U')
+        CREATE TABLE {table} (
+            coin_id INT NOT NULL,
+            period_start DATETIME NOT NULL,
+            open_price DECIMAL(38,18) NULL,
+            close_price DECIMAL(38,18) NULL,
+            min_price DECIMAL(38,18) NULL,
+            max_price DECIMAL(38,18) NULL,
+            price_sum DECIMAL(38,18) NULL,
+            samples INT NOT NULL,
+            avg_price AS (price_sum / NULLIF(samples, 0)),
+            market_cap DECIMAL(38,2) NULL,
+            volume_24h DECIMAL(38,2) NULL,
+            first_scraped_at DATETIME NOT NULL,
+            last_scraped_at DATETIME NOT NULL,
+            CONSTRAINT PK_{table} PRIMARY KEY (coin_id, period_start)
+        )
+        """)
+
+    cursor.execute(f"""
+    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name = '{SNAPSHOT_TOTALS_TABLE}' and xtype='U')
+    CREATE TABLE {SNAPSHOT_TOTALS_TABLE} (
+        snapshot_id INT PRIMARY KEY,
+        scraped_at DATETIME NOT NULL,
+        coin_count INT NOT NULL,
+        total_market_cap DECIMAL(38,2) NULL,
+        total_volume_24h DECIMAL(38,2) NULL,
+        INDEX idx_snapshot_totals_scraped_at (scraped_at)
+    )
+    """)
+    logger.info(f"Rollup tables {', '.join(ROLLUP_PERIODS)} and '{SNAPSHOT_TOTALS_TABLE}' created or already exist.")
+
+
+def _rollup_merge_sql(table: str , period: str , rebuild: bool = True) -> str:
+    """
+        MERGE folding one snapshot's coins into a rollup, each sampled at the snapshot's start.
+
+        Args:
+            table / period: rollup table and its ROLLUP_PERIODS expression
+            rebuild: read the coins through snapshot_rows_query(), so in delta mode the
+                     unchanged coins count too (parameters: id, id, id); otherwise only
+                     the snapshot's stored rows (parameters: id, id)
+    """
+    coins = f"({snapshot_rows_query()})" if rebuild else f"(SELECT * FROM {TABLE_NAME} WHERE snapshot_id = ?)"
+    return f"""
+    MERGE {table} WITH (HOLDLOCK) AS r
+    USING (
+        SELECT coin_id, {period} AS period_start,
+               MIN(price) AS min_price, MAX(price) AS max_price, SUM(price) AS price_sum,
+               COUNT(price) AS samples, MAX(scraped_at) AS scraped_at,
+               MAX(market_cap) AS market_cap, MAX(volume_24h) AS volume_24h
+        FROM (
+            SELECT c.coin_id, c.price, c.market_cap, c.volume_24h, snap.started_at AS scraped_at
+            FROM {coins} AS c
+            JOIN {SNAPSHOT_TABLE} snap ON snap.id = ?
+            WHERE c.coin_id IS NOT NULL
+        ) AS observed
+        GROUP BY coin_id, {period}
+    ) AS s
+    ON r.coin_id = s.coin_id AND r.period_start = s.period_start
+    WHEN MATCHED THEN UPDATE SET
+        open_price = CASE WHEN s.scraped_at < r.first_scraped_at THEN s.max_price ELSE r.open_price END,
+        close_price = CASE WHEN s.scraped_at >= r.last_scraped_at THEN s.max_price ELSE r.close_price END,
+        market_cap = CASE WHEN s.scraped_at >= r.last_scraped_at THEN s.market_cap ELSE r.market_cap END,
+        volume_24h = CASE WHEN s.scraped_at >= r.last_scraped_at THEN s.volume_24h ELSE r.volume_24h END,
+        min_price = CASE WHEN r.min_price IS NULL OR s.min_price < r.min_price THEN s.min_price ELSE r.min_price END,
+        max_price = CASE WHEN r.max_price IS NULL OR s.max_price > r.max_price THEN s.max_price ELSE r.max_price END,
+        price_sum = ISNULL(r.price_sum, 0) + ISNULL(s.price_sum, 0),
+        samples = r.samples + s.samples,
+        first_scraped_at = CASE WHEN s.scraped_at < r.first_scraped_at THEN s.scraped_at ELSE r.first_scraped_at END,
+        last_scraped_at = CASE WHEN s.scraped_at > r.last_scraped_at THEN s.scraped_at ELSE r.last_scraped_at END
+    WHEN NOT MATCHED THEN INSERT
+        (coin_id, period_start, open_price, close_price, min_price, max_price, price_sum, samples,
+         market_cap, volume_24h, first_scraped_at, last_scraped_at)
+    VALUES
+        (s.coin_id, s.period_start, s.max_price, s.max_price, s.min_price, s.max_price, s.price_sum, s.samples,
+         s.market_cap, s.volume_24h, s.scraped_at, s.scraped_at);
+    """
+
+
+def rollup_snapshot(cursor: pyodbc.Cursor , snapshot_id: int) -> bool:
+    """
+        Fold a finished snapshot into the hourly/daily rollups and store its market totals.
+
+        A snapshot holds one row per coin, so its rows are that coin's open and
+        close within the snapshot. In delta mode the coin list is rebuilt from the
+        keyframe, so unchanged coins are sampled too instead of only the ones that
+        moved; partial snapshots fold in only the coins they scraped. The
+        SnapshotTotals row marks the snapshot as
+        rolled up, so running this twice never counts a snapshot again. Market
+        totals cover the whole market, rebuilt from the keyframe in delta mode.
+        The caller commits.
+
+        Args:
+            cursor: Database Cursor Object
+            snapshot_id: finished snapshot
+        Returns:
+            True if the snapshot was rolled up, False if it already was.
+    """
+    cursor.execute(f"SELECT COUNT(*) FROM {SNAPSHOT_TOTALS_TABLE} WHERE snapshot_id = ?" , snapshot_id)
+    if cursor.fetchone()[0]:
+        return False
+
+    # a partial snapshot's rebuilt list would count the coins it never scraped
+    cursor.execute(f"SELECT is_partial FROM {SNAPSHOT_TABLE} WHERE id = ?" , snapshot_id)
+    row = cursor.fetchone()
+    rebuild = not (row and row[0])
+    params = [snapshot_id] * (3 if rebuild else 2)
+    for table , period in ROLLUP_PERIODS.items():
+        cursor.execute(_rollup_merge_sql(table , period , rebuild) , *params)
+    cursor.execute(f"""
+    INSERT INTO {SNAPSHOT_TOTALS_TABLE} (snapshot_id, scraped_at, coin_count, total_market_cap, total_volume_24h)
+    SELECT s.id, s.started_at, totals.coin_count, totals.total_market_cap, totals.total_volume_24h
+    FROM {SNAPSHOT_TABLE} s
+    CROSS JOIN (
+        SELECT COUNT(*) AS coin_count, SUM(market_cap) AS total_market_cap, SUM(volume_24h) AS total_volume_24h
+        FROM ({snapshot_rows_query()}) AS snapshot
+    ) AS totals
+    WHERE s.id = ?
+    """ , snapshot_id , snapshot_id , snapshot_id)
+    return True
+
+
+def update_crypto_statistics(cursor: pyodbc.Cursor , rows_added: int ,
+                             first_scraped_at: datetime , last_scraped_at: datetime) -> None:
+    """
+        Fold newly inserted rows into the statistics row (same transaction as the insert).
+
+        A scrape is counted once: later chunks carrying the same scraped_at do not add to it.
+        unique_cryptos is the size of the Coin dimension (a primary key count).
+
+        Args:
+            cursor: Database Cursor Object
+            rows_added: rows inserted
+            first_scraped_at / last_scraped_at: scraped_at range of those rows
+    """
+    cursor.execute(f"""
+    UPDATE {STATS_TABLE} SET
+        total_records = total_records + ?,
+        total_scrapes = total_scrapes + CASE WHEN last_scrape IS NULL OR ? > last_scrape THEN 1 ELSE 0 END,
+        first_scrape = CASE WHEN first_scrape IS NULL OR ? < first_scrape THEN ? ELSE first_scrape END,
+        last_scrape = CASE WHEN last_scrape IS NULL OR ? > last_scrape THEN ? ELSE last_scrape END,
+        unique_cryptos = (SELECT COUNT(*) FROM {COIN_TABLE}),
+        updated_at = GETDATE()
+    WHERE id = 1
+    """ , rows_added , last_scraped_at , first_scraped_at , first_scraped_at , last_scraped_at , last_scraped_at)
+
+
+def create_bulk_insert_objects(cursor: pyodbc.Cursor) -> None:
+    """
+        Create the table type and stored procedure used by the 'tvp' strategy.
+
+        Args:
+            cursor: Database Cursor Object
+    """
+
+    cursor.execute(f"""
+    IF TYPE_ID('{TVP_TYPE_NAME}') IS NULL
+    CREATE TYPE {TVP_TYPE_NAME} AS TABLE (
+        rank INT,
+        name NVARCHAR(100),
+        symbol NVARCHAR(20),
+        price DECIMAL(38,18),
+        one_hour_change DECIMAL(18,4),
+        twenty_four_hour_change DECIMAL(18,4),
+        seven_day_change DECIMAL(18,4),
+        market_cap DECIMAL(38,2),
+        volume_24h DECIMAL(38,2),
+        circulating_supply DECIMAL(38,4),
+        scraped_at DATETIME,
+        snapshot_id INT,
+        coin_id INT
+    )
+    """)
+
+    # CREATE PROCEDURE has to be the only statement in its batch
+    cursor.execute(f"""
+    IF OBJECT_ID('{TVP_PROCEDURE}', 'P') IS NULL
+    EXEC('CREATE PROCEDURE {TVP_PROCEDURE} @rows {TVP_TYPE_NAME} READONLY AS
+          INSERT INTO {TABLE_NAME} ({', '.join(INSERT_COLUMNS)})
+          SELECT {', '.join(INSERT_COLUMNS)} FROM @rows')
+    """)
+    logger.info(f"Bulk insert objects '{TVP_TYPE_NAME}' and '{TVP_PROCEDURE}' created or already exist.")
+
+
+def _insert_fast_executemany(cursor: pyodbc.Cursor , rows: List[Tuple]) -> None:
+    """ One parameter array per chunk: pyodbc sends the whole chunk in a single round trip."""
+    cursor.fast_executemany = True
+    cursor.executemany(
+        f"INSERT INTO {TABLE_NAME} ({', '.join(INSERT_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(INSERT_COLUMNS))})",
+        rows
+    )
+
+
+def _insert_multi_values(cursor: pyodbc.Cursor , rows: List[Tuple]) -> None:
+    """ Multi-row INSERT ... VALUES statements, as many rows per statement as SQL Server allows."""
+    placeholders = f"({', '.join('?' * len(INSERT_COLUMNS))})"
+    rows_per_statement = min(MAX_VALUES_ROWS , (MAX_STATEMENT_PARAMETERS - 1) // len(INSERT_COLUMNS))
+
+    for start in range(0 , len(rows) , rows_per_statement):
+        batch = rows[start:start + rows_per_statement]
+        query = (
+            f"INSERT INTO {TABLE_NAME} ({', '.join(INSERT_COLUMNS)}) "
+            f"VALUES {', '.join([placeholders] * len(batch))}"
+        )
+        cursor.execute(query , [value for row in batch for value in row])
+
+
+def _insert_tvp(cursor: pyodbc.Cursor , rows: List[Tuple]) -> None:
+    """ Whole chunk as one table-valued parameter to usp_InsertCryptoRows."""
+    cursor.execute(f"{{CALL {TVP_PROCEDURE} (?)}}" , (rows,))
+
+
+BULK_INSERT_STRATEGIES: Dict[str, Callable[[pyodbc.Cursor, List[Tuple]], None]] = {
+    'fast_executemany': _insert_fast_executemany,
+    'multi_values': _insert_multi_values,
+    'tvp': _insert_tvp,
+}
+
+
+def bulk_insert_rows(connection: pyodbc.Connection , rows: List[Tuple] ,
+                     strategy: Optional[str] = None , chunk_size: Optional[int] = None ,
+                     after_chunk: Optional[Callable[[pyodbc.Cursor, List[Tuple]], None]] = None) -> int:
+    """
+        Insert prepared row tuples (INSERT_COLUMNS order), committing after every chunk.
+
+        Args:
+            connection: Active DB connection
+            rows: row tuples to insert
+            strategy: one of BULK_INSERT_STRATEGIES (default: BULK_INSERT_STRATEGY)
+            chunk_size: rows per chunk/commit (default: INSERT_CHUNK_SIZE)
+            after_chunk: called with (cursor, chunk) before each commit, so its
+                         statements land in the same transaction as the chunk
+        Returns:
+            Number of rows inserted
+        Raises:
+            pyodbc.Error: the failing chunk is rolled back, earlier chunks stay committed.
+    """
+    strategy = strategy or BULK_INSERT_STRATEGY
+    chunk_size = chunk_size or INSERT_CHUNK_SIZE
+    if strategy not in BULK_INSERT_STRATEGIES:
+        raise ValueError(f"Unknown bulk insert strategy '{strategy}'. Use one of {sorted(BULK_INSERT_STRATEGIES)}")
+    insert_chunk = BULK_INSERT_STRATEGIES[strategy]
+
+    if strategy == 'tvp':
+        ensure_schema(connection , tvp=True)
+
+    cursor = connection.cursor()
+    inserted = 0
+    try:
+        for start in range(0 , len(rows) , chunk_size):
+            chunk = rows[start:start + chunk_size]
+            with timed('db_insert'):
+                insert_chunk(cursor , chunk)
+                if after_chunk:
+                    after_chunk(cursor , chunk)
+                connection.commit()
+            inserted += len(chunk)
+            increment('rows_inserted' , len(chunk))
+            logger.debug(f"Committed {inserted}/{len(rows)} rows ({strategy}).")
+
+        return inserted
+    except pyodbc.Error:
+        connection.rollback()
+        logger.error(f"Bulk insert failed after {inserted} committed rows ({strategy}).")
+        raise
+    finally:
+        cursor.close()
+
+
+def start_snapshot(connection: pyodbc.Connection , started_at: Optional[datetime] = None ,
+                   is_partial: bool = False) -> int:
+    """
+        Open a snapshot for a scrape run.
+
+        Args:
+            connection: Active DB connection
+            started_at: when the run started (default: now)
+            is_partial: the run covers only the top of the listing (a shallow daemon
+                        tier); such snapshots are never keyframes nor the latest market
+        Returns:
+            Snapshot id to store with the run's coin rows.
+    """
+    ensure_schema(connection)
+    maintain_partitions(connection)
+    cursor = connection.cursor()
+    try:
+        is_keyframe = not is_partial
+        if PERSISTENCE_MODE == 'delta' and not is_partial:
+            # Store every coin again after DELTA_KEYFRAME_INTERVAL delta snapshots
+            cursor.execute(f"""
+            SELECT MAX(id),
+                   (SELECT COUNT(*) FROM {SNAPSHOT_TABLE} d
+                    WHERE d.finished_at IS NOT NULL AND d.is_partial = 0 AND d.id > MAX(k.id))
+            FROM {SNAPSHOT_TABLE} k
+            WHERE k.is_keyframe = 1 AND k.finished_at IS NOT NULL
+            """)
+            last_keyframe , deltas_since = cursor.fetchone()
+            is_keyframe = last_keyframe is None or deltas_since >= DELTA_KEYFRAME_INTERVAL - 1
+
+        cursor.execute(
+            f"INSERT INTO {SNAPSHOT_TABLE} (started_at, is_keyframe, is_partial) OUTPUT INSERTED.id VALUES (?, ?, ?)",
+            started_at or datetime.now() , is_keyframe , is_partial
+        )
+        snapshot_id = cursor.fetchone()[0]
+        connection.commit()
+        kind = 'partial' if is_partial else 'keyframe' if is_keyframe else 'delta'
+        logger.info(f"Started {kind} snapshot {snapshot_id}.")
+        return snapshot_id
+    finally:
+        cursor.close()
+
+
+def finish_snapshot(connection: pyodbc.Connection , snapshot_id: int ,
+                    page_count: Optional[int] , row_count: int , is_partial: bool = False) -> None:
+    """
+        Close a snapshot; only finished snapshots count as the "latest" market.
+        The snapshot is then folded into the rollup tables (see rollup_snapshot).
+
+        Args:
+            connection: Active DB connection
+            snapshot_id: id returned by start_snapshot
+            page_count: listing pages scraped in the run
+            row_count: coin rows stored for the run
+            is_partial: close it as a partial snapshot (a run abandoned before it
+                        covered the listing), so it never becomes the latest market
+                        nor a keyframe
+    """
+    cursor = connection.cursor()
+    try:
+        scope = ", is_partial = 1, is_keyframe = 0" if is_partial else ""
+        cursor.execute(
+            f"UPDATE {SNAPSHOT_TABLE} SET finished_at = GETDATE(), page_count = ?, row_count = ?{scope} WHERE id = ?",
+            page_count , row_count , snapshot_id
+        )
+        connection.commit()
+        logger.info(f"Finished snapshot {snapshot_id} ({row_count} rows, {page_count} pages).")
+
+        # A failed rollup leaves the snapshot saved; migrations.backfill_rollups catches it up
+        try:
+            with timed('rollup'):
+                rollup_snapshot(cursor , snapshot_id)
+            connection.commit()
+        except pyodbc.Error as e:
+            connection.rollback()
+            logger.warning(f"Could not roll up snapshot {snapshot_id}: {e}")
+    finally:
+        cursor.close()
+
+
+def get_snapshot_info(connection: pyodbc.Connection , snapshot_id: int) -> Tuple[Optional[datetime], bool]:
+    """
+        Start time (used as scraped_at for all of its rows) of a snapshot, and whether it
+        stores every coin it scrapes (keyframes and partial snapshots) rather than a delta.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            f"SELECT started_at, CASE WHEN is_keyframe = 1 OR is_partial = 1 THEN 1 ELSE 0 END FROM {SNAPSHOT_TABLE} WHERE id = ?",
+            snapshot_id
+        )
+        row = cursor.fetchone()
+        return (row[0] , bool(row[1])) if row else (None , True)
+    finally:
+        cursor.close()
+
+
+_coin_lock = threading.Lock()
+_coin_ids: Dict[Tuple[str, str], int] = {}   # normalized (symbol, name) -> Coin.id, shared by the process
+
+
+def reset_coin_cache() -> None:
+    """ Forget the cached coin ids (they are reloaded from the Coin table on next use)."""
+    with _coin_lock:
+        _coin_ids.clear()
+
+
+def _load_coin_ids(cursor: pyodbc.Cursor) -> None:
+    cursor.execute(f"SELECT id, symbol_key, name_key FROM {COIN_TABLE}")
+    _coin_ids.update({(symbol_key , name_key): coin_id for coin_id , symbol_key , name_key in cursor.fetchall()})
+
+
+def resolve_coin_ids(connection: pyodbc.Connection , frame: pd.DataFrame) -> List[Optional[int]]:
+    """
+        Coin id of every row, adding coins seen for the first time to the Coin table.
+
+        Known ids are cached in-process, so after the first run a save only touches
+        the Coin table when a new coin is listed.
+
+        Args:
+            connection: Active DB connection
+            frame: normalized rows (see normalize_crypto_data)
+        Returns:
+            Coin.id per row (None if the coin could not be stored).
+    """
+    keys = coin_keys(frame)
+    with _coin_lock:
+        missing = {key for key in keys if key not in _coin_ids}
+        if missing:
+            cursor = connection.cursor()
+            try:
+                if not _coin_ids:
+                    _load_coin_ids(cursor)
+                    missing = {key for key in missing if key not in _coin_ids}
+                if missing:
+                    display = {}
+                    for symbol , name , key in zip(frame['symbol'] , frame['name'] , keys):
+                        display.setdefault(key , (None if pd.isna(symbol) else symbol , None if pd.isna(name) else name))
+                    cursor.fast_executemany = True
+                    cursor.executemany(
+                        f"INSERT INTO {COIN_TABLE} (symbol, name, symbol_key, name_key) VALUES (?, ?, ?, ?)",
+                        [display[key] + key for key in sorted(missing)]
+                    )
+                    connection.commit()
+                    _load_coin_ids(cursor)
+                    logger.info(f"Added {len(missing)} new coins to {COIN_TABLE}.")
+            finally:
+                cursor.close()
+        return [_coin_ids.get(key) for key in keys]
+
+
+def _coin_key(symbol , name) -> Tuple[str, str]:
+    return (symbol or '' , name or '')
+
+
+def load_latest_values(connection: pyodbc.Connection , before_snapshot: Optional[int] = None) -> Dict[Tuple[str, str], Tuple]:
+    """
+        Load the last stored values of every coin into a hash map (once per run).
+
+        Args:
+            connection: Active DB connection
+            before_snapshot: use the newest finished snapshot older than this one
+                             (default: the newest finished snapshot)
+        Returns:
+            {(symbol, name): values in DELTA_TOLERANCES order}
+    """
+    cursor = connection.cursor()
+    try:
+        if before_snapshot is None:
+            cursor.execute(LATEST_SNAPSHOT_SQL)
+        else:
+            cursor.execute(
+                f"SELECT MAX(id) FROM {SNAPSHOT_TABLE} WHERE finished_at IS NOT NULL AND id < ?",
+                before_snapshot
+            )
+        row = cursor.fetchone()
+        if not row or row[0] is None:
+            return {}
+
+        fields = list(DELTA_TOLERANCES)
+        cursor.execute(
+            f"SELECT {', '.join(COIN_KEY_COLUMNS + fields)} FROM ({snapshot_rows_query()}) AS snapshot",
+            row[0] , row[0]
+        )
+        latest_values = {
+            _coin_key(values[0] , values[1]): tuple(None if value is None else float(value) for value in values[2:])
+            for values in cursor.fetchall()
+        }
+        logger.info(f"Loaded last stored values of {len(latest_values)} coins from snapshot {row[0]}.")
+        return latest_values
+    finally:
+        cursor.close()
+
+
+def changed_rows_mask(frame: pd.DataFrame , latest_values: Dict[Tuple[str, str], Tuple] ,
+                      tolerances: Dict[str, float] = DELTA_TOLERANCES) -> np.ndarray:
+    """
+        Flag rows that are new or moved beyond their tolerance since the last stored values.
+
+        Args:
+            frame: normalized rows (see normalize_crypto_data)
+            latest_values: map returned by load_latest_values
+            tolerances: {column: relative change that counts as a change}
+        Returns:
+            Boolean array, True for rows that must be stored.
+    """
+    fields = list(tolerances)
+    keys = [_coin_key(symbol , name) for symbol , name in zip(frame['symbol'].fillna('') , frame['name'].fillna(''))]
+    previous_rows = [latest_values.get(key) for key in keys]
+    is_new = np.array([previous is None for previous in previous_rows] , dtype=bool)
+
+    empty = (np.nan,) * len(fields)
+    previous = np.array(
+        [[np.nan if value is None else value for value in (row or empty)] for row in previous_rows],
+        dtype=float
+    ).reshape(len(frame) , len(fields))
+    current = frame[fields].to_numpy(dtype=float , na_value=np.nan)
+
+    with np.errstate(divide='ignore' , invalid='ignore'):
+        relative = np.abs(current - previous) / np.abs(previous)
+        moved = relative > np.array([tolerances[field] for field in fields])
+        # a value going from 0, or appearing/disappearing, always counts as a change
+        moved |= (previous == 0) & (current != 0)
+        moved |= np.isnan(current) != np.isnan(previous)
+
+    return is_new | moved.any(axis=1)
+
+
+def insert_crypto_data(connection:pyodbc.Connection , crypto_data: Union[List[Dict[str,str]], pd.DataFrame] ,
+                       strategy: Optional[str] = None , chunk_size: Optional[int] = None ,
+                       scraped_at: Optional[datetime] = None , snapshot_id: Optional[int] = None ,
+                       latest_values: Optional[Dict[Tuple[str, str], Tuple]] = None) ->int:
     """
     Insert Crypto Data into Databse
 
+    In delta mode (PERSISTENCE_MODE = 'delta') only coins that changed beyond
+    DELTA_TOLERANCES since their last stored row are written, except for keyframe
+    and partial snapshots which store every coin they scraped.
+
     Args:
         connection: Active DB connection
-        crypto_data : list of crypto currencies.
+        crypto_data : list of crypto currencies, or the frame normalize_crypto_data() made of them.
+        strategy: bulk insert strategy (default: BULK_INSERT_STRATEGY in config.py)
+        chunk_size: rows committed per chunk (default: INSERT_CHUNK_SIZE)
+        scraped_at: timestamp stored with the rows (default: the snapshot's start, else now)
+        snapshot_id: snapshot the rows belong to (see start_snapshot)
+        latest_values: delta mode hash map from load_latest_values(); loaded here when
+                       omitted and updated in place with the stored rows, so one map
+                       can serve several batches of the same run
     
     Returns: 
         Number of crypto currencies inserted
     """
 
-    cursor = connection.cursor()
     try:
-        # Create Crypto Table if not Exist
-        create_crypto_table(cursor)
-        connection.commit()
+        # Create Crypto Table if not Exist (once per process)
+        ensure_schema(connection)
+    except pyodbc.Error as e:
+        connection.rollback()
+        logger.error(f"Error creating table: {e}")
+        return None
 
-        # Prepare Insert Statement
-        insert_query = f"""
-        INSERT INTO {TABLE_NAME}
-        (rank, name, price, one_hour_change, twenty_four_hour_change, 
-         seven_day_change, market_cap, volume_24h, circulating_supply, scraped_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
+    try:
+        # Normalize display strings into typed columns, then append the scrape time.
+        stores_every_coin = True
+        if snapshot_id is not None:
+            started_at , stores_every_coin = get_snapshot_info(connection , snapshot_id)
+            scraped_at = scraped_at or started_at
+        current_time = scraped_at or datetime.now()
+        if isinstance(crypto_data , pd.DataFrame):
+            frame = crypto_data
+        else:
+            with timed('normalize'):
+                frame = normalize_crypto_data(crypto_data)
 
-        # Prepare data for inserts.
-        current_time = datetime.now()
-        rows_to_insert = []
-
-        for crypto in crypto_data:
-            row = (
-                int(crypto['rank']) if crypto['rank'].isdigit() else None,
-                crypto['name'],
-                crypto['price'],
-                crypto['1h_change'],
-                crypto['24h_change'],
-                crypto['7d_change'],
-                crypto['market_cap'],
-                crypto['24h_volume'],
-                crypto['circulating_supply'],
-                current_time   
-            )
-            rows_to_insert.append(row)
+        if PERSISTENCE_MODE == 'delta' and snapshot_id is not None:
+            if latest_values is None:
+                latest_values = load_latest_values(connection , before_snapshot=snapshot_id)
+            if not stores_every_coin:
+                scraped_rows = len(frame)
+                frame = frame[changed_rows_mask(frame , latest_values)]
+                logger.info(f"Delta mode: {len(frame)} of {scraped_rows} coins changed.")
 
-        # Execute batch insert
-        cursor.executemany(insert_query, rows_to_insert)
-        connection.commit()
+        coin_ids = resolve_coin_ids(connection , frame)
+        rows_to_insert = [row + (current_time , snapshot_id , coin_id) for row , coin_id in zip(to_db_rows(frame) , coin_ids)]
+
+        def record_statistics(cursor: pyodbc.Cursor , chunk: List[Tuple]) -> None:
+            update_crypto_statistics(cursor , len(chunk) , current_time , current_time)
 
-        rows_inserted = len(rows_to_insert)
+        try:
+            rows_inserted = bulk_insert_rows(connection , rows_to_insert , strategy , chunk_size ,
+                                             after_chunk=record_statistics)
+        finally:
+            invalidate_stats_cache()
+
+        if latest_values is not None:
+            fields = list(DELTA_TOLERANCES)
+            for symbol , name , *values in frame[COIN_KEY_COLUMNS + fields].itertuples(index=False , name=None):
+                latest_values[_coin_key(symbol , name)] = tuple(None if pd.isna(value) else float(value) for value in values)
         logger.info(f"Successfully inserted {rows_inserted} records into DB.") 
 
         return rows_inserted    
     except pyodbc.Error as e:
-        connection.rollback()
         logger.error(f"Error inerting data: {e}")
 
-    finally:
-        cursor.close()
-
-def save_to_sql_server(crypto_data: List[Dict[str, str]]) -> bool:
+def save_to_sql_server(crypto_data: List[Dict[str, str]] , started_at: Optional[datetime] = None ,
+                       page_count: Optional[int] = None) -> bool:
         """
             Main function to save data to SQL server DB.
+
+            Writes one Snapshot row for the run and stores the coins under it, then
+            makes it this process's latest market (see market_cache.py).
             Args:
-                list of crypto currencies
+                crypto_data: list of crypto currencies
+                started_at: when the scrape run started (default: now)
+                page_count: listing pages the run scraped
             Returns:
                 True if successfull else False
 
@@ -164,9 +1213,16 @@ def save_to_sql_server(crypto_data: List[Dict[str, str]]) -> bool:
             return False
         
         try:
+            with timed('normalize'):
+                frame = normalize_crypto_data(crypto_data)
             with get_sql_connection() as connection:
-                rows_inserted = insert_crypto_data(connection , crypto_data)
+                snapshot_id = start_snapshot(connection , started_at)
+                rows_inserted = insert_crypto_data(connection , frame , snapshot_id=snapshot_id)
+                if rows_inserted is None:
+                    return False
+                finish_snapshot(connection , snapshot_id , page_count , rows_inserted)
                 logger.info(f"Data Saved Successfully. {rows_inserted} inserted.")
+                market_cache.publish(snapshot_id , frame , started_at or datetime.now())
                 return True
         except Exception as e:
             logger.warning(f"Failed to save data to SQL server {e}" ,exc_info=True)
@@ -177,22 +1233,29 @@ def get_recent_data(limit: int=10) -> Optional[List]:
     """
         Retrieve most recent cryptocurrency data from DB.
 
+        Reads the latest finished snapshot (rebuilt from its keyframe in delta mode),
+        from the in-memory latest market when it is available.
+
         Args:
             limit : Number of records to retrieve
         Retrurns:
-            List of Tuples containing cryptocurrency data.
+            List of Tuples containing cryptocurrency data, in rank order.
     """
 
+    market = market_cache.get_latest_market()
+    if market is not None:
+        return market.top(limit)
+
     try:
         with get_sql_connection() as connection:
             cursor = connection.cursor()
 
             query = f"""
             SELECT TOP (?)
-                rank, name, price, one_hour_change, twenty_four_hour_change,
+                rank, name, symbol, price, one_hour_change, twenty_four_hour_change,
                 seven_day_change, market_cap, volume_24h, circulating_supply, scraped_at
-            FROM {TABLE_NAME}
-            ORDER BY scraped_at DESC
+            FROM ({LATEST_SNAPSHOT_ROWS_SQL}) AS snapshot
+            ORDER BY rank
             """
             cursor.execute(query, limit)
             results = cursor.fetchall()
@@ -203,57 +1266,158 @@ def get_recent_data(limit: int=10) -> Optional[List]:
         logger.error(f"Error Retrieving Data {e}")
         return None
 
-def get_crypto_statistics() -> Dict:
+_stats_cache_lock = threading.Lock()
+_stats_cache: Dict = {'expires_at': 0.0 , 'stats': None}
+
+
+def invalidate_stats_cache() -> None:
+    """ Drop the cached statistics so the next read hits the database."""
+    with _stats_cache_lock:
+        _stats_cache['expires_at'] = 0.0
+        _stats_cache['stats'] = None
+
+
+STATS_FIELDS = ['total_records', 'unique_cryptos', 'first_scrape', 'last_scrape', 'total_scrapes']
+
+
+def get_crypto_statistics(use_cache: bool = True) -> Dict:
     """
         Module for cryptocurrencies stats.
 
+        Reads the incrementally maintained statistics row (one single-row lookup)
+        and caches it in-process for STATS_CACHE_TTL seconds. Databases that do not
+        have the statistics table yet fall back to one combined aggregate query.
+
+        Args:
+            use_cache: serve a cached result when it is younger than STATS_CACHE_TTL
         Returns:
             Dictionary with Stats.
     """
 
+    if use_cache:
+        with _stats_cache_lock:
+            if _stats_cache['stats'] is not None and time.monotonic() < _stats_cache['expires_at']:
+                return dict(_stats_cache['stats'])
+
     stats = {}
     try:
         with get_sql_connection() as connection:
             cursor = connection.cursor()
-            print("Success..")
+            row = None
+            try:
+                cursor.execute(f"""
+                    SELECT total_records, unique_cryptos, first_scrape, last_scrape, total_scrapes
+                    FROM {STATS_TABLE}
+                    WHERE id = 1
+                """)
+                row = cursor.fetchone()
+            except pyodbc.Error as e:
+                logger.debug(f"Statistics table not available: {e}")
+                connection.rollback()
 
-            # Total Records
-            cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}")
-            stats['total_records'] = cursor.fetchone()[0]
-
-            # Unique Currencies
-            cursor.execute(f"SELECT COUNT(DISTINCT(name)) FROM {TABLE_NAME}")
-            stats['unique_cryptos'] = cursor.fetchone()[0]
-
-            # Date Range
-            cursor.execute(f"""
-                SELECT
-                    MIN(scraped_at) AS first_scrape,
-                    MAX(scraped_at) AS last_scrape
+            if row is None:
+                # Single pass over the history instead of four separate scans
+                cursor.execute(f"""
+                    SELECT
+                        COUNT_BIG(*),
+                        COUNT(DISTINCT name),
+                        MIN(scraped_at),
+                        MAX(scraped_at),
+                        COUNT(DISTINCT scraped_at)
                     FROM {TABLE_NAME}
-            """)
-            row = cursor.fetchone()
-            stats['first_scrape'] = row[0]
-            stats['last_scrape'] = row[1]
-
-            # Scrape count
-            cursor.execute(f"""
-                SELECT COUNT(DISTINCT(scraped_at))
-                FROM {TABLE_NAME}
-            """)
-            row = cursor.fetchone()
-            stats['total_scrapes'] = row[0] if row else 0
+                """)
+                row = cursor.fetchone()
 
+            stats = dict(zip(STATS_FIELDS , row))
+            stats['total_scrapes'] = stats['total_scrapes'] or 0
             cursor.close()
     except Exception as e:
         logger.error(f"Error getting statistics: {e}")
-    
+        return stats
+
+    with _stats_cache_lock:
+        _stats_cache['stats'] = dict(stats)
+        _stats_cache['expires_at'] = time.monotonic() + STATS_CACHE_TTL
     return stats
 
+def _truncate_old_partitions(cursor: pyodbc.Cursor , cutoff: datetime) -> int:
+    """
+        Empty every partition that ends before `cutoff` and merge their boundaries.
+
+        Truncating and merging empty partitions are metadata operations, so the
+        cost does not grow with the amount of history removed.
+
+        Returns:
+            Rows removed.
+    """
+    cursor.execute(f"SELECT $PARTITION.{PARTITION_FUNCTION}(?)" , cutoff)
+    cutoff_partition = cursor.fetchone()[0]
+    if cutoff_partition <= 1:
+        return 0
+
+    # row counts come from the partition metadata, not from reading the rows
+    cursor.execute("""
+    SELECT COALESCE(SUM(rows), 0) FROM sys.partitions
+    WHERE object_id = OBJECT_ID(?) AND index_id IN (0, 1) AND partition_number < ?
+    """ , TABLE_NAME , cutoff_partition)
+    rows_removed = cursor.fetchone()[0]
+    if rows_removed:
+        cursor.execute(f"TRUNCATE TABLE {TABLE_NAME} WITH (PARTITIONS (1 TO {cutoff_partition - 1}))")
+
+    # Fold the emptied partitions into the first one; the cutoff partition keeps its lower boundary
+    boundaries = _existing_boundaries(cursor) or []
+    for boundary in boundaries[:cutoff_partition - 2]:
+        cursor.execute(f"ALTER PARTITION FUNCTION {PARTITION_FUNCTION}() MERGE RANGE ({_sql_datetime(boundary)})")
+    return rows_removed
+
+
+def _delete_in_batches(connection: pyodbc.Connection , cursor: pyodbc.Cursor , cutoff: datetime ,
+                       batch_size: int = RETENTION_BATCH_SIZE) -> int:
+    """ Delete rows older than `cutoff` in short transactions, so inserts are never blocked for long."""
+    deleted = 0
+    while True:
+        cursor.execute(f"DELETE TOP (?) FROM {TABLE_NAME} WHERE scraped_at < ?" , batch_size , cutoff)
+        batch = cursor.rowcount
+        connection.commit()
+        if batch <= 0:
+            return deleted
+        deleted += batch
+
+
+def _retention_cutoff(cursor: pyodbc.Cursor , cutoff: datetime) -> datetime:
+    """
+        Move the cutoff back to the keyframe the oldest kept snapshot is rebuilt from.
+
+        In delta mode a snapshot needs every row since its keyframe, so the keyframe
+        (and the deltas after it) stay even when they are older than `cutoff`. With
+        nothing newer than the cutoff the latest keyframe is kept for the next run.
+    """
+    if PERSISTENCE_MODE != 'delta':
+        return cutoff
+    cursor.execute(f"""
+    SELECT TOP 1 k.started_at FROM {SNAPSHOT_TABLE} k
+    WHERE k.is_keyframe = 1 AND k.finished_at IS NOT NULL
+      AND k.id <= COALESCE((SELECT MIN(id) FROM {SNAPSHOT_TABLE} WHERE started_at >= ?),
+                           (SELECT MAX(id) FROM {SNAPSHOT_TABLE}))
+    ORDER BY k.id DESC
+    """ , cutoff)
+    row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] >= cutoff:
+        return cutoff
+    logger.info(f"Keeping rows since keyframe {row[0]} that later delta snapshots are rebuilt from.")
+    return row[0]
+
+
 def delete_old_data(days: int = 30) -> int:
     """
         Delete data older than specified days
 
+        On a partitioned table whole partitions past the cutoff are truncated and
+        merged, and only the rows of the partition holding the cutoff are deleted
+        (in batches). Unpartitioned tables are deleted from in batches of
+        RETENTION_BATCH_SIZE rows, each in its own short transaction. In delta mode
+        the keyframe of the oldest kept snapshot is kept too (see _retention_cutoff).
+
         Args:
             days : Number of days to keep (default: 30)
         
@@ -263,16 +1427,44 @@ def delete_old_data(days: int = 30) -> int:
 
     try:
         with get_sql_connection() as connection:
+            ensure_schema(connection)
             cursor = connection.cursor()
+            cutoff = _retention_cutoff(cursor , datetime.now() - timedelta(days=days))
 
-            delete_query = f"""
-            DELETE FROM {TABLE_NAME}
-            WHERE scraped_at < DATEADD(day , ? , GETDATE())
-            """
-            cursor.execute(delete_query , -days)
-            rows_deleted = cursor.rowcount
+            # Scrapes that disappear, for the statistics row: counted on the small Snapshot
+            # table (a run's rows all carry its started_at) from the oldest scrape still stored;
+            # runs that stored nothing were never counted
+            cursor.execute(f"""
+            SELECT COUNT(*) FROM {SNAPSHOT_TABLE}
+            WHERE started_at < ? AND started_at >= (SELECT first_scrape FROM {STATS_TABLE} WHERE id = 1)
+              AND (row_count IS NULL OR row_count > 0)
+            """ , cutoff)
+            scrapes_deleted = cursor.fetchone()[0]
+
+            rows_deleted = 0
+            if is_partitioned(cursor):
+                try:
+                    rows_deleted = _truncate_old_partitions(cursor , cutoff)
+                    connection.commit()
+                except pyodbc.Error as e:
+                    connection.rollback()
+                    logger.warning(f"Partition truncation failed, deleting in batches instead: {e}")
+            rows_deleted += _delete_in_batches(connection , cursor , cutoff)
+
+            cursor.execute(f"""
+            UPDATE {STATS_TABLE} SET
+                total_records = total_records - ?,
+                total_scrapes = total_scrapes - ?,
+                first_scrape = (SELECT MIN(scraped_at) FROM {TABLE_NAME}),
+                last_scrape = (SELECT MAX(scraped_at) FROM {TABLE_NAME}),
+                unique_cryptos = (SELECT COUNT(*) FROM {COIN_TABLE}),
+                updated_at = GETDATE()
+            WHERE id = 1
+            """ , rows_deleted , scrapes_deleted)
             connection.commit()
             cursor.close()
+            invalidate_stats_cache()
+            maintain_partitions(connection)
 
             logger.info(f"Successfully Deleted {rows_deleted} old records.")
             return rows_deleted
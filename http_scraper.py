@@ -0,0 +1,320 @@
+"""
+Browserless Scraper for CoinMarketCap
+Reads the server-rendered JSON state (__NEXT_DATA__) with plain HTTP requests and
+falls back to Selenium only for pages where that JSON is missing.
+"""
+
+import re
+import json
+import math
+import logging
+import requests
+from typing import List , Dict , Optional , Any , Iterable , Iterator , Tuple
+
+from metrics import timed , increment
+import archive
+from config import (
+    COINMARKET_URL,
+    HTTP_TIMEOUT,
+    HTTP_HEADERS
+)
+
+logger = logging.getLogger(__name__)
+
+NEXT_DATA_PATTERN = re.compile(
+    r'<script[^>]*id=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>', re.DOTALL
+)
+
+# Outcome of the most recent scrape_coinmarketcap_http() run (same shape as
+# scraper.last_scrape_report, plus the pages that needed the Selenium fallback).
+last_scrape_report: Dict = {}
+
+
+def extract_next_data(html: str) -> Optional[Dict]:
+    """
+        Pull the __NEXT_DATA__ JSON blob out of a page.
+
+        Args:
+            html: raw page HTML
+        Returns:
+            Decoded JSON state, or None if the page does not embed it.
+    """
+    match = NEXT_DATA_PATTERN.search(html)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError as e:
+        logger.warning(f"Could not decode __NEXT_DATA__: {e}")
+        return None
+
+
+def _unpack_keys_arr(data: List) -> List[Dict[str, Any]]:
+    """ Expand the compact [{'keysArr': [...]}, [values], ...] listing format into dicts."""
+    keys = data[0]['keysArr']
+    return [dict(zip(keys , values)) for values in data[1:] if isinstance(values , list)]
+
+
+def _find_listing(node: Any) -> Optional[List[Dict[str, Any]]]:
+    """ Depth-first search for the list of coins inside the page state."""
+    if isinstance(node , str) and node[:1] in '{[':
+        # initialState is embedded as a JSON string on some builds
+        try:
+            node = json.loads(node)
+        except ValueError:
+            return None
+
+    if isinstance(node , list) and node:
+        first = node[0]
+        if isinstance(first , dict) and 'keysArr' in first:
+            return _unpack_keys_arr(node)
+        if isinstance(first , dict) and 'cmcRank' in first:
+            return node
+
+    children = node.values() if isinstance(node , dict) else node if isinstance(node , list) else []
+    for child in children:
+        if isinstance(child , (dict , list , str)):
+            listing = _find_listing(child)
+            if listing is not None:
+                return listing
+    return None
+
+
+def _usd_quote(coin: Dict[str, Any] , field: str) -> Optional[float]:
+    """ Read a USD quote field from either the flattened or the nested coin format."""
+    if f'quote.USD.{field}' in coin:
+        return coin[f'quote.USD.{field}']
+    quote = coin.get('quote' , {}).get('USD')
+    if quote is None:
+        quote = next((q for q in coin.get('quotes' , []) if q.get('name') == 'USD') , {})
+    return quote.get(field)
+
+
+def _format_price(value: Optional[float]) -> str:
+    if value is None:
+        return ''
+    if value >= 1 or value == 0:
+        return f"${value:,.2f}"
+    # keep four significant digits for sub-dollar coins, as the table does
+    decimals = max(2 , 3 - math.floor(math.log10(value)))
+    return f"${value:.{decimals}f}"
+
+
+def _format_amount(value: Optional[float] , prefix: str = '' , suffix: str = '') -> str:
+    if value is None:
+        return ''
+    return f"{prefix}{value:,.0f}{suffix}"
+
+
+def _format_change(value: Optional[float]) -> str:
+    if value is None:
+        return ''
+    return f"{value:.2f}%"
+
+
+def coin_to_crypto_info(coin: Dict[str, Any]) -> Dict[str,str]:
+    """
+        Convert one coin from the JSON state into the dict shape produced by parse_crypto_data.
+
+        The name field keeps the name and symbol run together ("BitcoinBTC"), exactly
+        as the table cell text reads, so both backends feed the same downstream code.
+    """
+    symbol = coin.get('symbol' , '')
+    return {
+        'rank': str(coin.get('cmcRank' , '')),
+        'name': f"{coin.get('name' , '')}{symbol}",
+        'price': _format_price(_usd_quote(coin , 'price')),
+        '1h_change': _format_change(_usd_quote(coin , 'percentChange1h')),
+        '24h_change': _format_change(_usd_quote(coin , 'percentChange24h')),
+        '7d_change': _format_change(_usd_quote(coin , 'percentChange7d')),
+        'market_cap': _format_amount(_usd_quote(coin , 'marketCap') , prefix='$'),
+        '24h_volume': _format_amount(_usd_quote(coin , 'volume24h') , prefix='$'),
+        'circulating_supply': _format_amount(coin.get('circulatingSupply') , suffix=f' {symbol}')
+    }
+
+
+def parse_next_data(next_data: Dict) -> Optional[List[Dict[str,str]]]:
+    """
+        Parse the coin listing out of a decoded __NEXT_DATA__ blob.
+
+        Args:
+            next_data: JSON returned by extract_next_data
+        Returns:
+            List of crypto dicts sorted by rank, or None when the listing is not present.
+    """
+    listing = _find_listing(next_data)
+    if listing is None:
+        return None
+
+    crypto_data = []
+    for coin in listing:
+        try:
+            crypto_data.append(coin_to_crypto_info(coin))
+        except (TypeError , ValueError , AttributeError) as e:
+            logger.warning(f"Error parsing coin {coin.get('name')}: {e}")
+
+    crypto_data.sort(key=lambda crypto: int(crypto['rank']) if crypto['rank'].isdigit() else math.inf)
+    return crypto_data
+
+
+def parse_listing_html(html: str) -> Optional[List[Dict[str,str]]]:
+    """
+        Parse a listing page's HTML through its embedded JSON (a top-level function,
+        so it can run in a worker process).
+
+        Returns:
+            List of crypto dicts, or None when the page has no usable JSON.
+    """
+    with timed('parse_json'):
+        next_data = extract_next_data(html)
+        return parse_next_data(next_data) if next_data else None
+
+
+def fetch_page(session: requests.Session , page: int , base_url: str = COINMARKET_URL) -> str:
+    """
+        Download one listing page.
+
+        Args:
+            session: shared requests session (keeps the connection alive between pages)
+            page: listing page number (1 based)
+            base_url: site root, override to point at a local fixture server
+        Returns:
+            Page HTML.
+    """
+    url = f"{base_url}?page={page}"
+    logger.info(f"Fetching {url}")
+    with timed('http_fetch'):
+        response = session.get(url , headers=HTTP_HEADERS , timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    return response.text
+
+
+def iter_coinmarketcap_http(max_pages: int = 10 , base_url: str = COINMARKET_URL , fallback: bool = True ,
+                            skip_pages: Iterable[int] = () , session: Optional[requests.Session] = None ,
+                            pool=None) -> Iterator[Tuple[int, List[Dict[str,str]]]]:
+    """
+        Scrape cryptocurrencies without a browser, yielding each page as soon as it is parsed.
+
+        Args:
+            max_pages: max pages to scrape
+            base_url: site root, override to point at a local fixture server
+            fallback: scrape pages without embedded JSON through Selenium
+            skip_pages: pages that are already scraped (e.g. from a checkpoint)
+            session: keep-alive session to reuse (left open); default: one per run
+            pool: warm ChromeDriverPool for the fallback (left open); default: one per run
+        Yields:
+            (page, rows) in page order, including the Selenium fallback pages. The
+            first empty page (end of the listing) is yielded as (page, []) and ends
+            the run. When the generator is exhausted the run is summarised in
+            `last_scrape_report`.
+    """
+    global last_scrape_report
+    failures: Dict[int, str] = {}
+    missing = []
+    pages_scraped = 0
+    rows = 0
+    skip_pages = set(skip_pages)
+    pages = [page for page in range(1 , max_pages + 1) if page not in skip_pages]
+
+    owns_session = session is None
+    owns_pool = pool is None
+    session = session or requests.Session()
+    try:
+        for page in pages:
+            try:
+                html = fetch_page(session , page , base_url)
+                page_data = parse_listing_html(html)
+                if page_data is None:
+                    logger.warning(f"No embedded JSON listing on page {page}.")
+            except requests.RequestException as e:
+                logger.warning(f"HTTP request for page {page} failed: {e}")
+                page_data = None
+
+            if page_data is None:
+                missing.append(page)
+                if not fallback:
+                    failures[page] = 'no embedded JSON'
+                    continue
+                # the page is scraped right away, so pages keep their order
+                try:
+                    if pool is None:
+                        # imported here so the HTTP path never loads Selenium unless it needs to
+                        from scraper import ChromeDriverPool
+                        pool = ChromeDriverPool(size=1)
+                    logger.info(f"Falling back to Selenium for page {page}.")
+                    increment('http_fallback_pages')
+                    page_data = dict(pool.iter_pages([page] , failures)).get(page)
+                except Exception as e:
+                    logger.error(f"Selenium fallback failed: {e}" , exc_info=True)
+                    failures[page] = str(e)
+                if page_data is None:
+                    continue
+            else:
+                logger.info(f"{len(page_data)} cryptocurrencies read from page {page}.")
+                if page_data:
+                    archive.archive_page(html , page , archive.HTTP)
+                    increment('pages_scraped')
+                    increment('rows_scraped' , len(page_data))
+
+            if not page_data:
+                logger.info('No more data found. Stopping Scraping..')
+                yield page , page_data
+                break
+            pages_scraped += 1
+            rows += len(page_data)
+            yield page , page_data
+    finally:
+        if owns_session:
+            session.close()
+        if owns_pool and pool is not None:
+            pool.close()
+        last_scrape_report = {
+            'pages_requested': len(pages),
+            'pages_scraped': pages_scraped,
+            'rows': rows,
+            'failed_pages': dict(sorted(failures.items())),
+            'fallback_pages': missing,
+        }
+        if failures:
+            failed = ", ".join(f"{page} ({reason})" for page , reason in sorted(failures.items()))
+            logger.warning(f"{len(failures)} page(s) failed: {failed}")
+
+        logger.info(f"Finished Scraping {rows} cryptocurrencies from {pages_scraped} pages.")
+
+
+def scrape_coinmarketcap_http(max_pages: int = 10 , base_url: str = COINMARKET_URL , fallback: bool = True) -> List[Dict[str,str]]:
+    """
+        Scrape cryptocurrencies without a browser.
+
+        Args:
+            max_pages: max pages to scrape
+            base_url: site root, override to point at a local fixture server
+            fallback: scrape pages without embedded JSON through Selenium
+        Returns:
+            List containing dicts of crypto currencies, in rank order.
+    """
+    results = dict(iter_coinmarketcap_http(max_pages , base_url , fallback))
+
+    all_crypto_data = []
+    for page in sorted(results):
+        all_crypto_data.extend(results[page])
+    return all_crypto_data
+
+
+if __name__ == "__main__":
+    # Setup logging for standalone execution
+
+    logging.basicConfig(
+        level = logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    data = scrape_coinmarketcap_http(max_pages=1)
+
+    if data:
+        print(f"Successfully scraped {len(data)} cryptocurrencies")
+        print("\n First 5 Results: ")
+        for crypto in data[:5]:
+            print(f"  {crypto['rank']:>4} | {crypto['name']:<20} | {crypto['price']:<15}")
+    else:
+        print("Failed to scrape data")
@@ -2,11 +2,33 @@
     Main Entry Point for Crypto Market Data Project with SQL server Intergration.
 """
 
+import argparse
+import asyncio
 import logging
-from scraper import scrape_coinmarketcap
-from scraper import scrape_coinmarketcap_all_pages
-from database import save_to_sql_server
-from config import LOG_FILE , LOG_LEVEL , LOG_FORMAT
+from datetime import datetime
+import scraper
+import http_scraper
+from scraper import iter_coinmarketcap_pages
+from http_scraper import iter_coinmarketcap_http
+from pipeline import stream_to_sql_server , close_abandoned_snapshot
+from checkpoint import ScrapeCheckpoint
+from async_pipeline import scrape_and_save_async
+from daemon import ScrapeDaemon
+from metrics import RunMetrics , write_prometheus_file
+from config import LOG_FILE , LOG_LEVEL , LOG_FORMAT , SCRAPER_BACKEND
+
+# Page iterators: each yields (page, rows) as soon as a page is parsed
+SCRAPER_BACKENDS = {
+    'selenium': iter_coinmarketcap_pages,
+    'http': iter_coinmarketcap_http,
+}
+
+
+def last_scrape_report(backend: str) -> dict:
+    """ Report (pages scraped, failed pages) of the backend's most recent run."""
+    module = http_scraper if backend == 'http' else scraper
+    return module.last_scrape_report
+
 
 def setup_logging():
     logging.basicConfig(
@@ -19,30 +41,66 @@ def setup_logging():
     )
 
 
-def main():
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scrape CoinMarketCap and save the data to SQL Server.")
+    parser.add_argument('--pages' , type=int , default=2 , help="Number of listing pages to scrape.")
+    parser.add_argument('--backend' , choices=sorted(SCRAPER_BACKENDS) , default=SCRAPER_BACKEND,
+                        help="'http' reads the embedded JSON (Selenium fallback), 'selenium' drives Chrome.")
+    parser.add_argument('--async' , dest='use_async' , action='store_true',
+                        help="Run fetching, parsing and saving as concurrent asyncio stages.")
+    parser.add_argument('--daemon' , action='store_true',
+                        help="Keep running and scrape the DAEMON_TIERS schedules from config.py.")
+    parser.add_argument('--no-resume' , action='store_true',
+                        help="Discard the checkpoint of an interrupted run and start over.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
 
     """Main Application Function."""
+    args = parse_args(argv)
     setup_logging()
     logger = logging.getLogger(__name__)
 
     try:
+        if args.daemon:
+            ScrapeDaemon(backend=args.backend).run()
+            return
+
         # Scrape Data
-        logger.info("Starting Cryptocurrency Scrapping....")
+        logger.info(f"Starting Cryptocurrency Scrapping ({args.backend} backend)....")
+        run_metrics = RunMetrics('main')
 
-        # Pass the Number of Pages to Scrape from Crypto Market Website
-        crypto_data = scrape_coinmarketcap_all_pages(2)
-        if not crypto_data:
+        # Pass the Number of Pages to Scrape from Crypto Market Website.
+        # Pages are saved by a background writer while the next ones load, and
+        # recorded in a checkpoint so an interrupted run continues where it stopped.
+        iter_pages = SCRAPER_BACKENDS[args.backend]
+        with ScrapeCheckpoint() as checkpoint:
+            if args.no_resume:
+                checkpoint.discard()
+            started_at = checkpoint.begin(args.pages , started_at=datetime.now() ,
+                                          close_snapshot=close_abandoned_snapshot)
+            if args.use_async:
+                report = asyncio.run(scrape_and_save_async(args.pages , args.backend , started_at=started_at ,
+                                                           checkpoint=checkpoint))
+                rows_inserted = report['rows_inserted']
+            else:
+                rows_inserted = stream_to_sql_server(checkpoint.resume(iter_pages) , started_at=started_at ,
+                                                     checkpoint=checkpoint)
+                report = last_scrape_report(args.backend)
+
+        if not report.get('rows') and not rows_inserted:
             logger.error("Failed to Scrape Data")
             return
-        
-        logger.info(f"Successfully Scraped {len(crypto_data)} cryptocurrencies.")
 
-        # Save Data to SQL Server
-        logger.info("Saving Data to SQL Server...")
-        if save_to_sql_server(crypto_data):
-            logger.info("Successfully Saved Data to Database.")
+        logger.info(f"Successfully Scraped {report.get('rows' , 0)} cryptocurrencies from {report.get('pages_scraped' , 0)} pages.")
+        if rows_inserted is not None:
+            logger.info(f"Successfully Saved Data to Database ({rows_inserted} rows).")
         else:
             logger.error("Failed to Save Data to Database.")
+
+        run_metrics.write_summary()
+        write_prometheus_file()
     except KeyboardInterrupt:
         logger.info("Operation Cancelled By User")
     except Exception as e:
@@ -0,0 +1,183 @@
+"""
+In-Memory Latest Market
+Keeps the latest finished snapshot in process memory as column arrays with dict indexes
+by rank, symbol and name, so "current state" lookups are a dict hit instead of a
+database round trip. The scraper publishes each snapshot it saves; other processes load
+the latest snapshot from SQL Server once and reload it only when a newer one lands.
+"""
+
+import time
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import List , Dict , Optional , Tuple
+
+from config import LATEST_MARKET_CACHE_ENABLED , LATEST_MARKET_CHECK_INTERVAL
+from normalize import NORMALIZED_COLUMNS , normalize_symbol , normalize_name
+from metrics import increment
+import database
+
+logger = logging.getLogger(__name__)
+
+# Row layout of get_recent_data()
+MARKET_COLUMNS = NORMALIZED_COLUMNS + ['scraped_at']
+
+
+class LatestMarket:
+    """
+        One snapshot's coins as column arrays in rank order, indexed by rank,
+        ticker and normalized name (positions into the arrays).
+
+        Example:
+            market = LatestMarket(42 , frame , datetime.now())
+            market.by_rank(1)         # (1, 'Bitcoin', 'BTC', 67123.45, ...)
+            market.by_symbol('eth')   # every row listed under ETH
+    """
+
+    def __init__(self, snapshot_id: int , frame: pd.DataFrame , scraped_at: Optional[datetime] = None):
+        frame = frame.sort_values('rank' , kind='stable' , na_position='last' , ignore_index=True)
+        self.snapshot_id = snapshot_id
+        self.columns: Dict[str, np.ndarray] = {
+            column: frame[column].astype(object).where(frame[column].notna() , None).to_numpy()
+            for column in NORMALIZED_COLUMNS
+        }
+        if 'scraped_at' in frame.columns:
+            self.columns['scraped_at'] = frame['scraped_at'].astype(object).to_numpy()
+        else:
+            self.columns['scraped_at'] = np.full(len(frame) , scraped_at , dtype=object)
+        self._rows: List[Tuple] = list(zip(*(self.columns[column] for column in MARKET_COLUMNS)))
+
+        self._by_rank: Dict[int, int] = {}
+        self._by_symbol: Dict[str, List[int]] = {}
+        self._by_name: Dict[str, List[int]] = {}
+        for position , (rank , name , symbol) in enumerate(zip(self.columns['rank'] , self.columns['name'] , self.columns['symbol'])):
+            if rank is not None:
+                self._by_rank.setdefault(int(rank) , position)
+            self._by_symbol.setdefault(normalize_symbol(symbol) , []).append(position)
+            self._by_name.setdefault(normalize_name(name) , []).append(position)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def top(self, limit: Optional[int] = None) -> List[Tuple]:
+        """ The first `limit` rows by rank (all rows when limit is None)."""
+        return self._rows[:limit] if limit else list(self._rows)
+
+    def by_rank(self, rank: int) -> Optional[Tuple]:
+        position = self._by_rank.get(rank)
+        return None if position is None else self._rows[position]
+
+    def by_symbol(self, symbol: str) -> List[Tuple]:
+        """ Rows listed under exactly this ticker (case-insensitive)."""
+        return [self._rows[position] for position in self._by_symbol.get(normalize_symbol(symbol) , ())]
+
+    def by_name(self, name: str) -> List[Tuple]:
+        """ Rows with exactly this name (case-insensitive, whitespace-normalized)."""
+        return [self._rows[position] for position in self._by_name.get(normalize_name(name) , ())]
+
+
+_lock = threading.Lock()
+_state: Dict = {'market': None, 'next_check': 0.0}
+
+
+def publish(snapshot_id: int , frame: pd.DataFrame , scraped_at: Optional[datetime] = None) -> None:
+    """
+        Make a just-finished snapshot the latest market of this process.
+
+        Ignored when a newer snapshot is already held, so a slow writer cannot
+        replace a newer market with an older one.
+
+        Args:
+            snapshot_id: finished snapshot
+            frame: its coins, as returned by normalize.normalize_crypto_data()
+            scraped_at: scrape time of the rows (when the frame has no scraped_at)
+    """
+    if not LATEST_MARKET_CACHE_ENABLED:
+        return
+    market = LatestMarket(snapshot_id , frame , scraped_at)
+    with _lock:
+        current = _state['market']
+        if current is not None and current.snapshot_id > snapshot_id:
+            return
+        _state['market'] = market
+        _state['next_check'] = time.monotonic() + LATEST_MARKET_CHECK_INTERVAL
+    logger.debug(f"Latest market is snapshot {snapshot_id} ({len(market)} coins).")
+
+
+def _load_latest(connection , current: Optional[LatestMarket]) -> Optional[LatestMarket]:
+    """ Reload the latest finished snapshot from SQL Server if it is newer than `current`."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(database.LATEST_SNAPSHOT_SQL)
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        snapshot_id = row[0]
+        if current is not None and current.snapshot_id >= snapshot_id:
+            return current
+
+        columns = ', '.join(MARKET_COLUMNS)
+        cursor.execute(f"SELECT {columns} FROM ({database.snapshot_rows_query()}) AS snapshot" , snapshot_id , snapshot_id)
+        frame = pd.DataFrame.from_records([tuple(row) for row in cursor.fetchall()] , columns=MARKET_COLUMNS)
+    finally:
+        cursor.close()
+    # DECIMAL columns arrive as Decimal; keep the floats the scraper publishes
+    frame[NORMALIZED_COLUMNS[3:]] = frame[NORMALIZED_COLUMNS[3:]].apply(pd.to_numeric , errors='coerce')
+    logger.info(f"Loaded snapshot {snapshot_id} into the latest market cache ({len(frame)} coins).")
+    return LatestMarket(snapshot_id , frame)
+
+
+def get_latest_market() -> Optional[LatestMarket]:
+    """
+        The latest finished snapshot, checked against the Snapshot table at most every
+        LATEST_MARKET_CHECK_INTERVAL seconds (one seek on its primary key).
+
+        Returns:
+            LatestMarket, or None when the cache is off, nothing is saved yet or the
+            database could not be read; callers then query SQL Server.
+    """
+    if not LATEST_MARKET_CACHE_ENABLED:
+        return None
+    market = _state['market']
+    if market is not None and time.monotonic() < _state['next_check']:
+        increment('market_cache_hits')
+        return market
+
+    with _lock:
+        market = _state['market']
+        if market is None or time.monotonic() >= _state['next_check']:
+            try:
+                with database.get_sql_connection() as connection:
+                    market = _load_latest(connection , market)
+            except Exception as e:
+                logger.warning(f"Could not check for a newer snapshot, serving the cached one: {e}")
+            _state['market'] = market
+            _state['next_check'] = time.monotonic() + LATEST_MARKET_CHECK_INTERVAL
+    return market
+
+
+def refresh(connection) -> None:
+    """
+        Load the newest finished snapshot over an open connection, e.g. right after a
+        writer finished it; the writer keeps only one batch in memory, so the market
+        is read back from SQL Server instead of being published from the scraped rows.
+    """
+    if not LATEST_MARKET_CACHE_ENABLED:
+        return
+    with _lock:
+        try:
+            _state['market'] = _load_latest(connection , _state['market'])
+            _state['next_check'] = time.monotonic() + LATEST_MARKET_CHECK_INTERVAL
+        except Exception as e:
+            logger.warning(f"Could not load the new snapshot into the latest market: {e}")
+            _state['market'] = None
+            _state['next_check'] = 0.0
+
+
+def invalidate() -> None:
+    """ Drop the cached market; the next lookup reloads it from SQL Server."""
+    with _lock:
+        _state['market'] = None
+        _state['next_check'] = 0.0
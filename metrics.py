@@ -0,0 +1,193 @@
+"""
+Lightweight Metrics for the Scraping Hot Paths
+Stage timers and counters kept in process memory (one perf_counter call and a locked
+dict update per measurement), exported as Prometheus text (file or HTTP endpoint)
+and as a JSON summary per run.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import ThreadingHTTPServer , BaseHTTPRequestHandler
+from typing import Dict , Optional
+
+from config import METRICS_ENABLED , METRICS_PREFIX , METRICS_FILE , METRICS_SUMMARY_DIR
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# stage -> [count, total seconds, max seconds]
+_timers: Dict[str, list] = {}
+_counters: Dict[str, float] = {}
+
+
+def observe(stage: str , seconds: float) -> None:
+    """ Record one duration for a stage."""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        timer = _timers.get(stage)
+        if timer is None:
+            _timers[stage] = [1 , seconds , seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+            if seconds > timer[2]:
+                timer[2] = seconds
+
+
+def increment(name: str , value: float = 1) -> None:
+    """ Add to a counter (pages_scraped, page_retries, driver_restarts, rows_inserted, ...)."""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name , 0) + value
+
+
+@contextmanager
+def timed(stage: str):
+    """
+        Time the enclosed block as one observation of `stage`.
+
+        Example:
+            with timed('page_load'):
+                driver.get(url)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage , time.perf_counter() - start)
+
+
+def snapshot() -> Dict[str, Dict]:
+    """ Copy of all timers ({stage: {count, seconds, max_seconds}}) and counters."""
+    with _lock:
+        return {
+            'timers': {stage: {'count': count, 'seconds': total, 'max_seconds': longest}
+                       for stage , (count , total , longest) in _timers.items()},
+            'counters': dict(_counters),
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def render_prometheus() -> str:
+    """ All metrics in the Prometheus text exposition format."""
+    current = snapshot()
+    lines = [
+        f"# HELP {METRICS_PREFIX}_stage_seconds Time spent per pipeline stage.",
+        f"# TYPE {METRICS_PREFIX}_stage_seconds summary",
+    ]
+    for stage , timer in sorted(current['timers'].items()):
+        lines.append(f'{METRICS_PREFIX}_stage_seconds_sum{{stage="{stage}"}} {timer["seconds"]:.6f}')
+        lines.append(f'{METRICS_PREFIX}_stage_seconds_count{{stage="{stage}"}} {timer["count"]}')
+    lines.append(f"# HELP {METRICS_PREFIX}_stage_seconds_max Longest single observation per stage.")
+    lines.append(f"# TYPE {METRICS_PREFIX}_stage_seconds_max gauge")
+    for stage , timer in sorted(current['timers'].items()):
+        lines.append(f'{METRICS_PREFIX}_stage_seconds_max{{stage="{stage}"}} {timer["max_seconds"]:.6f}')
+
+    for name , value in sorted(current['counters'].items()):
+        lines.append(f"# TYPE {METRICS_PREFIX}_{name}_total counter")
+        lines.append(f"{METRICS_PREFIX}_{name}_total {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_file(path: str = METRICS_FILE) -> None:
+    """
+        Write the metrics for a node_exporter textfile collector.
+        The file is replaced atomically so the collector never reads half of it.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path , 'w' , encoding='utf-8') as f:
+        f.write(render_prometheus())
+    os.replace(temp_path , path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') not in ('' , '/metrics'):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type' , 'text/plain; version=0.0.4')
+        self.send_header('Content-Length' , str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format , *args):
+        logger.debug(format % args)
+
+
+def start_metrics_server(port: int , host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """ Serve /metrics for Prometheus from a background thread."""
+    server = ThreadingHTTPServer((host , port) , _MetricsHandler)
+    threading.Thread(target=server.serve_forever , name='metrics-server' , daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
+
+
+def _difference(after: Dict , before: Dict) -> Dict:
+    timers = {}
+    for stage , timer in after['timers'].items():
+        previous = before['timers'].get(stage , {'count': 0, 'seconds': 0.0})
+        count = timer['count'] - previous['count']
+        if count:
+            timers[stage] = {'count': count, 'seconds': round(timer['seconds'] - previous['seconds'] , 6)}
+    counters = {name: value - before['counters'].get(name , 0) for name , value in after['counters'].items()}
+    return {'timers': timers, 'counters': {name: value for name , value in counters.items() if value}}
+
+
+class RunMetrics:
+    """
+        Collects the metrics of one run (the difference between its start and end).
+
+        Example:
+            run = RunMetrics('main')
+            ...
+            run.write_summary()   # metrics/main-20250101T120000.json
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._baseline = snapshot()
+
+    def summary(self) -> Dict:
+        """ Stage timings, counters and throughput of the run so far."""
+        elapsed = time.perf_counter() - self._start
+        run = _difference(snapshot() , self._baseline)
+        counters = run['counters']
+        insert_seconds = run['timers'].get('db_insert' , {}).get('seconds' , 0)
+        return {
+            'run': self.name,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'elapsed_seconds': round(elapsed , 3),
+            'stages': run['timers'],
+            'counters': counters,
+            'rows_per_second': {
+                'scrape': round(counters.get('rows_scraped' , 0) / elapsed , 1) if elapsed else None,
+                'insert': round(counters.get('rows_inserted' , 0) / insert_seconds , 1) if insert_seconds else None,
+            },
+        }
+
+    def write_summary(self, directory: str = METRICS_SUMMARY_DIR) -> Optional[str]:
+        """ Write the run summary as JSON; returns the file path (None when metrics are off)."""
+        if not METRICS_ENABLED:
+            return None
+        os.makedirs(directory , exist_ok=True)
+        path = os.path.join(directory , f"{self.name}-{self.started_at:%Y%m%dT%H%M%S}.json")
+        with open(path , 'w' , encoding='utf-8') as f:
+            json.dump(self.summary() , f , indent=2)
+        logger.info(f"Run metrics written to {path}")
+        return path
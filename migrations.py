@@ -0,0 +1,528 @@
+"""
+Schema Migrations for an Existing CryptoCurrency Table
+Run this once after upgrading: python migrations.py
+(also backfills the hourly/daily rollups for snapshots saved before they existed)
+Every step checks the current schema first, so running it again is a no-op.
+"""
+
+import logging
+import pyodbc
+from typing import Optional
+
+from config import TABLE_NAME , MIGRATION_BATCH_SIZE
+from database import (
+    get_sql_connection,
+    reset_schema_cache,
+    create_snapshot_table,
+    create_coin_table,
+    create_partition_objects,
+    create_rollup_tables,
+    rollup_snapshot,
+    is_partitioned,
+    SNAPSHOT_TABLE,
+    SNAPSHOT_TOTALS_TABLE,
+    COIN_TABLE,
+    STATS_TABLE,
+    NAME_COUNTS_VIEW,
+    PARTITION_SCHEME,
+    TVP_TYPE_NAME,
+    TVP_PROCEDURE
+)
+from normalize import normalize_crypto_data , to_db_rows , normalize_symbol , normalize_name , RAW_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# (column, SQL type) for every column that moved from NVARCHAR to a numeric type
+NUMERIC_COLUMNS = [
+    ('price', 'DECIMAL(38,18)'),
+    ('one_hour_change', 'DECIMAL(18,4)'),
+    ('twenty_four_hour_change', 'DECIMAL(18,4)'),
+    ('seven_day_change', 'DECIMAL(18,4)'),
+    ('market_cap', 'DECIMAL(38,2)'),
+    ('volume_24h', 'DECIMAL(38,2)'),
+    ('circulating_supply', 'DECIMAL(38,4)'),
+]
+
+
+def column_type(cursor: pyodbc.Cursor , column: str , table: str = TABLE_NAME) -> Optional[str]:
+    """
+        Look up a column's data type.
+
+        Returns:
+            Lower-case type name (e.g. 'nvarchar'), or None if the column does not exist.
+    """
+    cursor.execute(
+        "SELECT DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ? AND COLUMN_NAME = ?",
+        table , column
+    )
+    row = cursor.fetchone()
+    return row[0].lower() if row else None
+
+
+def migrate_numeric_columns(connection: pyodbc.Connection , batch_size: int = MIGRATION_BATCH_SIZE) -> int:
+    """
+        Move the string columns of an old table to numeric types and split name/symbol.
+
+        The old strings are converted with the same normalize_crypto_data() used on
+        insert, in id-ordered batches committed one at a time.
+
+        Args:
+            connection: Active DB connection
+            batch_size: rows converted per batch
+        Returns:
+            Number of rows converted (0 when the table is already numeric).
+    """
+    cursor = connection.cursor()
+    try:
+        if column_type(cursor , 'price') != 'nvarchar':
+            logger.info("Numeric columns already in place.")
+            return 0
+
+        logger.info(f"Migrating {TABLE_NAME} to numeric columns...")
+        if column_type(cursor , 'symbol') is None:
+            cursor.execute(f"ALTER TABLE {TABLE_NAME} ADD symbol NVARCHAR(20) NULL")
+        for column , sql_type in NUMERIC_COLUMNS:
+            if column_type(cursor , f"{column}_num") is None:
+                cursor.execute(f"ALTER TABLE {TABLE_NAME} ADD {column}_num {sql_type} NULL")
+        connection.commit()
+
+        select_query = f"""
+        SELECT TOP (?) id, rank, name, price, one_hour_change, twenty_four_hour_change,
+               seven_day_change, market_cap, volume_24h, circulating_supply
+        FROM {TABLE_NAME}
+        WHERE id > ?
+        ORDER BY id
+        """
+        update_query = f"""
+        UPDATE {TABLE_NAME}
+        SET name = ?, symbol = ?, {', '.join(f'{column}_num = ?' for column , _ in NUMERIC_COLUMNS)}
+        WHERE id = ?
+        """
+        cursor.fast_executemany = True
+
+        converted = 0
+        last_id = 0
+        while True:
+            cursor.execute(select_query , batch_size , last_id)
+            batch = cursor.fetchall()
+            if not batch:
+                break
+
+            crypto_data = [
+                dict(zip(RAW_FIELDS , ['' if value is None else str(value) for value in row[1:]]))
+                for row in batch
+            ]
+            normalized = to_db_rows(normalize_crypto_data(crypto_data))
+            updates = [values[1:] + (row[0],) for row , values in zip(batch , normalized)]
+
+            cursor.executemany(update_query , updates)
+            connection.commit()
+
+            converted += len(batch)
+            last_id = batch[-1][0]
+            logger.info(f"Converted {converted} rows.")
+
+        for column , _ in NUMERIC_COLUMNS:
+            cursor.execute(f"ALTER TABLE {TABLE_NAME} DROP COLUMN {column}")
+            cursor.execute(f"EXEC sp_rename '{TABLE_NAME}.{column}_num', '{column}', 'COLUMN'")
+        cursor.execute(f"CREATE INDEX idx_symbol ON {TABLE_NAME} (symbol)")
+        cursor.execute(f"CREATE INDEX idx_scraped_at_market_cap ON {TABLE_NAME} (scraped_at, market_cap DESC)")
+        connection.commit()
+
+        logger.info(f"Migrated {converted} rows to numeric columns.")
+        return converted
+    except pyodbc.Error as e:
+        connection.rollback()
+        logger.error(f"Error migrating numeric columns: {e}")
+        raise
+    finally:
+        cursor.close()
+
+
+def migrate_snapshots(connection: pyodbc.Connection , batch_size: int = MIGRATION_BATCH_SIZE) -> int:
+    """
+        Add the Snapshot table and snapshot_id column to an old table.
+
+        Every distinct scraped_at of the history becomes one finished snapshot, and the
+        table is re-clustered on (snapshot_id, rank) so "latest market" reads are seeks.
+        The indexed stats view and the TVP objects are dropped here and recreated by
+        ensure_schema() on next use, since they depend on the table layout.
+
+        Args:
+            connection: Active DB connection
+            batch_size: rows linked to their snapshot per batch
+        Returns:
+            Number of rows linked to a snapshot.
+    """
+    cursor = connection.cursor()
+    try:
+        if column_type(cursor , 'snapshot_id') is not None:
+            logger.info("Snapshot column already in place.")
+            return 0
+
+        logger.info(f"Adding snapshots to {TABLE_NAME}...")
+        create_snapshot_table(cursor)
+        cursor.execute(f"IF OBJECT_ID('{TVP_PROCEDURE}', 'P') IS NOT NULL DROP PROCEDURE {TVP_PROCEDURE}")
+        cursor.execute(f"IF TYPE_ID('{TVP_TYPE_NAME}') IS NOT NULL DROP TYPE {TVP_TYPE_NAME}")
+        cursor.execute(f"IF OBJECT_ID('{NAME_COUNTS_VIEW}', 'V') IS NOT NULL DROP VIEW {NAME_COUNTS_VIEW}")
+        cursor.execute(f"ALTER TABLE {TABLE_NAME} ADD snapshot_id INT NULL")
+        connection.commit()
+
+        # One snapshot per past scrape
+        cursor.execute(f"""
+        INSERT INTO {SNAPSHOT_TABLE} (started_at, finished_at, row_count)
+        SELECT scraped_at, scraped_at, COUNT(*)
+        FROM {TABLE_NAME}
+        GROUP BY scraped_at
+        ORDER BY scraped_at
+        """)
+        connection.commit()
+
+        linked = 0
+        while True:
+            cursor.execute(f"""
+            UPDATE TOP (?) c
+            SET snapshot_id = s.id
+            FROM {TABLE_NAME} c
+            JOIN {SNAPSHOT_TABLE} s ON s.started_at = c.scraped_at
+            WHERE c.snapshot_id IS NULL
+            """ , batch_size)
+            updated = cursor.rowcount
+            connection.commit()
+            if updated <= 0:
+                break
+            linked += updated
+            logger.info(f"Linked {linked} rows to snapshots.")
+
+        # Move the clustered index from id to (snapshot_id, rank)
+        cursor.execute(f"""
+        SELECT name FROM sys.key_constraints
+        WHERE parent_object_id = OBJECT_ID('{TABLE_NAME}') AND type = 'PK'
+        """)
+        primary_key = cursor.fetchone()[0]
+        cursor.execute(f"ALTER TABLE {TABLE_NAME} DROP CONSTRAINT {primary_key}")
+        cursor.execute(f"CREATE CLUSTERED INDEX idx_snapshot_rank ON {TABLE_NAME} (snapshot_id, rank)")
+        cursor.execute(f"ALTER TABLE {TABLE_NAME} ADD CONSTRAINT PK_{TABLE_NAME} PRIMARY KEY NONCLUSTERED (id)")
+        connection.commit()
+
+        logger.info(f"Linked {linked} rows to snapshots.")
+        return linked
+    except pyodbc.Error as e:
+        connection.rollback()
+        logger.error(f"Error migrating snapshots: {e}")
+        raise
+    finally:
+        cursor.close()
+
+
+def migrate_snapshot_keyframes(connection: pyodbc.Connection) -> int:
+    """
+        Add the is_keyframe flag used by delta persistence to an old Snapshot table.
+
+        Every existing snapshot stored all of its coins, so they all become keyframes.
+
+        Returns:
+            1 if the column was added, 0 when it already exists.
+    """
+    cursor = connection.cursor()
+    try:
+        if column_type(cursor , 'is_keyframe' , SNAPSHOT_TABLE) is not None:
+            logger.info("Snapshot keyframe column already in place.")
+            return 0
+
+        cursor.execute(
+            f"ALTER TABLE {SNAPSHOT_TABLE} ADD is_keyframe BIT NOT NULL "
+            f"CONSTRAINT DF_{SNAPSHOT_TABLE}_is_keyframe DEFAULT 1"
+        )
+        connection.commit()
+        logger.info(f"Added is_keyframe to {SNAPSHOT_TABLE}.")
+        return 1
+    except pyodbc.Error as e:
+        connection.rollback()
+        logger.error(f"Error adding snapshot keyframes: {e}")
+        raise
+    finally:
+        cursor.close()
+
+
+def migrate_snapshot_scope(connection: pyodbc.Connection) -> int:
+    """
+        Add the is_partial flag (daemon tiers that scrape only the top of the listing)
+        to an old Snapshot table. Existing snapshots all count as full runs.
+
+        Returns:
+            1 if the column was added, 0 when it already exists.
+    """
+    cursor = connection.cursor()
+    try:
+        if column_type(cursor , 'is_partial' , SNAPSHOT_TABLE) is not None:
+            logger.info("Snapshot scope column already in place.")
+            return 0
+
+        cursor.execute(
+            f"ALTER TABLE {SNAPSHOT_TABLE} ADD is_partial BIT NOT NULL "
+            f"CONSTRAINT DF_{SNAPSHOT_TABLE}_is_partial DEFAULT 0"
+        )
+        connection.commit()
+        logger.info(f"Added is_partial to {SNAPSHOT_TABLE}.")
+        return 1
+    except pyodbc.Error as e:
+        connection.rollback()
+        logger.error(f"Error adding snapshot scope: {e}")
+        raise
+    finally:
+        cursor.close()
+
+
+def migrate_coins(connection: pyodbc.Connection , batch_size: int = MIGRATION_BATCH_SIZE) -> int:
+    """
+        Add the Coin dimension and the coin_id column to an old table.
+
+        Coins are keyed with the same normalize_symbol()/normalize_name() used on
+        insert; rows are linked through a temporary (symbol, name) -> coin_id map in
+        batches. The indexed name-count view is dropped (unique_cryptos now counts
+        the Coin table) together with the TVP objects, which gain a coin_id column
+        when ensure_schema() recreates them.
+
+        Args:
+            connection: Active DB connection
+            batch_size: rows linked to their coin per batch
+        Returns:
+            Number of rows linked to a coin.
+    """
+    cursor = connection.cursor()
+    try:
+        if column_type(cursor , 'coin_id') is not None:
+            logger.info("Coin column already in place.")
+            return 0
+
+        logger.info(f"Adding the {COIN_TABLE} dimension to {TABLE_NAME}...")
+        create_coin_table(cursor)
+        cursor.execute(f"IF OBJECT_ID('{TVP_PROCEDURE}', 'P') IS NOT NULL DROP PROCEDURE {TVP_PROCEDURE}")
+        cursor.execute(f"IF TYPE_ID('{TVP_TYPE_NAME}') IS NOT NULL DROP TYPE {TVP_TYPE_NAME}")
+        cursor.execute(f"IF OBJECT_ID('{NAME_COUNTS_VIEW}', 'V') IS NOT NULL DROP VIEW {NAME_COUNTS_VIEW}")
+        cursor.execute(f"ALTER TABLE {TABLE_NAME} ADD coin_id INT NULL")
+        connection.commit()
+
+        cursor.execute(f"SELECT DISTINCT symbol, name FROM {TABLE_NAME}")
+        pairs = [(symbol , name) for symbol , name in cursor.fetchall()]
+        coins = {}
+        for symbol , name in pairs:
+            coins.setdefault((normalize_symbol(symbol) , normalize_name(name)) , (symbol , name))
+
+        cursor.fast_executemany = True
+        if coins:
+            cursor.executemany(
+                f"INSERT INTO {COIN_TABLE} (symbol, name, symbol_key, name_key) VALUES (?, ?, ?, ?)",
+                [display + key for key , display in coins.items()]
+            )
+        cursor.execute(f"SELECT id, symbol_key, name_key FROM {COIN_TABLE}")
+        coin_ids = {(symbol_key , name_key): coin_id for coin_id , symbol_key , name_key in cursor.fetchall()}
+
+        cursor.execute("CREATE TABLE #coin_map (symbol NVARCHAR(20) NOT NULL, name NVARCHAR(100) NOT NULL, coin_id INT NOT NULL)")
+        if pairs:
+            cursor.executemany(
+                "INSERT INTO #coin_map (symbol, name, coin_id) VALUES (?, ?, ?)",
+                [(symbol or '' , name or '' , coin_ids[(normalize_symbol(symbol) , normalize_name(name))]) for symbol , name in pairs]
+            )
+        cursor.execute("CREATE CLUSTERED INDEX idx_coin_map ON #coin_map (symbol, name)")
+        connection.commit()
+
+        linked = 0
+        while True:
+            cursor.execute(f"""
+            UPDATE TOP (?) c
+            SET coin_id = m.coin_id
+            FROM {TABLE_NAME} c
+            JOIN #coin_map m ON m.symbol = ISNULL(c.symbol, '') AND m.name = ISNULL(c.name, '')
+            WHERE c.coin_id IS NULL
+            """ , batch_size)
+            updated = cursor.rowcount
+            connection.commit()
+            if updated <= 0:
+                break
+            linked += updated
+            logger.info(f"Linked {linked} rows to coins.")
+
+        cursor.execute("DROP TABLE #coin_map")
+        cursor.execute(f"CREATE INDEX idx_coin_snapshot ON {TABLE_NAME} (coin_id, snapshot_id) "
+                       f"INCLUDE (scraped_at, price, market_cap, volume_24h)")
+        cursor.execute(f"""
+        IF OBJECT_ID('{STATS_TABLE}', 'U') IS NOT NULL
+        UPDATE {STATS_TABLE} SET unique_cryptos = (SELECT COUNT(*) FROM {COIN_TABLE}) WHERE id = 1
+        """)
+        connection.commit()
+
+        logger.info(f"Added {len(coins)} coins and linked {linked} rows.")
+        return linked
+    except pyodbc.Error as e:
+        connection.rollback()
+        logger.error(f"Error migrating coins: {e}")
+        raise
+    finally:
+        cursor.close()
+
+
+# Nonclustered indexes rebuilt on the partition scheme: (name, definition)
+PARTITION_ALIGNED_INDEXES = [
+    ('idx_coin_snapshot', '(coin_id, snapshot_id) INCLUDE (scraped_at, price, market_cap, volume_24h)'),
+    ('idx_name', '(name)'),
+    ('idx_symbol', '(symbol)'),
+    ('idx_rank', '(rank)'),
+    ('idx_scraped_at', '(scraped_at)'),
+    ('idx_scraped_at_market_cap', '(scraped_at, market_cap DESC)'),
+]
+
+
+def migrate_partitioning(connection: pyodbc.Connection) -> int:
+    """
+        Move an unpartitioned table onto the scraped_at partition scheme.
+
+        scraped_at becomes NOT NULL (rows without it take their snapshot's start),
+        the primary key becomes (id, scraped_at) and every index is rebuilt aligned
+        with the table, which TRUNCATE ... WITH PARTITIONS requires. The rebuild
+        rewrites the whole table once; run it in a maintenance window.
+
+        Returns:
+            Number of partitions of the table, 0 when nothing was done.
+    """
+    cursor = connection.cursor()
+    try:
+        if is_partitioned(cursor):
+            logger.info("Table already partitioned.")
+            return 0
+
+        cursor.execute(f"SELECT MIN(scraped_at) FROM {TABLE_NAME}")
+        first = cursor.fetchone()[0]
+        if not create_partition_objects(cursor , first):
+            logger.info("Partitioning disabled or not supported by this server; retention deletes in batches.")
+            return 0
+        connection.commit()
+
+        logger.info(f"Partitioning {TABLE_NAME} on scraped_at...")
+        cursor.execute(f"""
+        UPDATE c SET scraped_at = COALESCE(s.started_at, GETDATE())
+        FROM {TABLE_NAME} c
+        LEFT JOIN {SNAPSHOT_TABLE} s ON s.id = c.snapshot_id
+        WHERE c.scraped_at IS NULL
+        """)
+
+        # Indexes holding scraped_at block the NOT NULL change; all of them are rebuilt below
+        cursor.execute(f"""
+        SELECT name FROM sys.key_constraints
+        WHERE parent_object_id = OBJECT_ID('{TABLE_NAME}') AND type = 'PK'
+        """)
+        primary_key = cursor.fetchone()[0]
+        cursor.execute(f"ALTER TABLE {TABLE_NAME} DROP CONSTRAINT {primary_key}")
+        for index , _ in PARTITION_ALIGNED_INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {index} ON {TABLE_NAME}")
+        cursor.execute(f"ALTER TABLE {TABLE_NAME} ALTER COLUMN scraped_at DATETIME NOT NULL")
+        connection.commit()
+
+        storage = f"ON {PARTITION_SCHEME} (scraped_at)"
+        cursor.execute(f"CREATE CLUSTERED INDEX idx_snapshot_rank ON {TABLE_NAME} (snapshot_id, rank) "
+                       f"WITH (DROP_EXISTING = ON) {storage}")
+        cursor.execute(f"ALTER TABLE {TABLE_NAME} ADD CONSTRAINT PK_{TABLE_NAME} "
+                       f"PRIMARY KEY NONCLUSTERED (id, scraped_at) {storage}")
+        for index , definition in PARTITION_ALIGNED_INDEXES:
+            cursor.execute(f"CREATE INDEX {index} ON {TABLE_NAME} {definition} {storage}")
+        connection.commit()
+
+        cursor.execute(f"""
+        SELECT COUNT(*) FROM sys.partitions
+        WHERE object_id = OBJECT_ID('{TABLE_NAME}') AND index_id = 1
+        """)
+        partitions = cursor.fetchone()[0]
+        logger.info(f"{TABLE_NAME} now spans {partitions} partitions.")
+        return partitions
+    except pyodbc.Error as e:
+        connection.rollback()
+        logger.error(f"Error partitioning {TABLE_NAME}: {e}")
+        raise
+    finally:
+        cursor.close()
+
+
+def backfill_rollups(connection: pyodbc.Connection) -> int:
+    """
+        Fold every finished snapshot that is not rolled up yet into the rollup tables.
+
+        Also catches up snapshots whose rollup failed when they finished. Each
+        snapshot is committed on its own, so an interrupted backfill resumes.
+
+        Returns:
+            Number of snapshots rolled up.
+    """
+    cursor = connection.cursor()
+    try:
+        create_rollup_tables(cursor)
+        connection.commit()
+        cursor.execute(f"""
+        SELECT s.id FROM {SNAPSHOT_TABLE} s
+        WHERE s.finished_at IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM {SNAPSHOT_TOTALS_TABLE} t WHERE t.snapshot_id = s.id)
+        ORDER BY s.id
+        """)
+        snapshot_ids = [row[0] for row in cursor.fetchall()]
+        if not snapshot_ids:
+            logger.info("Rollups already up to date.")
+            return 0
+
+        logger.info(f"Rolling up {len(snapshot_ids)} snapshot(s)...")
+        for done , snapshot_id in enumerate(snapshot_ids , start=1):
+            rollup_snapshot(cursor , snapshot_id)
+            connection.commit()
+            if done % 100 == 0:
+                logger.info(f"Rolled up {done}/{len(snapshot_ids)} snapshots")
+        logger.info(f"Rolled up {len(snapshot_ids)} snapshot(s).")
+        return len(snapshot_ids)
+    except pyodbc.Error as e:
+        connection.rollback()
+        logger.error(f"Error backfilling rollups: {e}")
+        raise
+    finally:
+        cursor.close()
+
+
+# Applied in order by run_migrations()
+MIGRATIONS = [
+    migrate_numeric_columns,
+    migrate_snapshots,
+    migrate_snapshot_keyframes,
+    migrate_snapshot_scope,
+    migrate_coins,
+    migrate_partitioning,
+    backfill_rollups,
+]
+
+
+def run_migrations() -> bool:
+    """
+        Apply every migration in order.
+
+        Returns:
+            True if all migrations succeeded, False otherwise
+    """
+    try:
+        with get_sql_connection() as connection:
+            for migration in MIGRATIONS:
+                logger.info(f"Running migration {migration.__name__}")
+                migration(connection)
+        reset_schema_cache()
+        return True
+    except Exception as e:
+        logger.error(f"Migration failed: {e}" , exc_info=True)
+        return False
+
+
+if __name__ == '__main__':
+    # Setup Logging for Standalone Execution.
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    if run_migrations():
+        print("✅ Database schema is up to date.")
+    else:
+        print("❌ Migration failed, see log for details.")
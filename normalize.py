@@ -0,0 +1,140 @@
+"""
+Normalization of Scraped Values
+Turns the display strings produced by the parsers ("$67,123.45", "$1.34T$1,343,...",
+"19,600,000 BTC") into typed columns in one vectorized pass over a DataFrame.
+"""
+
+import logging
+import pandas as pd
+from typing import List , Dict , Tuple
+
+logger = logging.getLogger(__name__)
+
+RAW_FIELDS = [
+    'rank', 'name', 'price', '1h_change', '24h_change', '7d_change',
+    'market_cap', '24h_volume', 'circulating_supply'
+]
+
+# Column order of the normalized frame; matches the CryptoCurrency table columns.
+NORMALIZED_COLUMNS = [
+    'rank', 'name', 'symbol', 'price', 'one_hour_change', 'twenty_four_hour_change',
+    'seven_day_change', 'market_cap', 'volume_24h', 'circulating_supply'
+]
+FLOAT_COLUMNS = NORMALIZED_COLUMNS[3:]
+
+# A comma-grouped dollar amount. Grouping stops the match where the table runs
+# two numbers together ("$6,225,516,708683,245 BTC" -> 6,225,516,708).
+DOLLAR_AMOUNT = r'\$(\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?)'
+ABBREVIATED_AMOUNT = r'\$(\d+(?:\.\d+)?)\s*([KMBT])'
+# Supply reads "19,712,345 BTC" or abbreviated "53.7B XRP"; a suffix letter counts only
+# when another token (the ticker) follows it, so a coin listed as "B" keeps its symbol.
+SUPPLY_AMOUNT = r'^\s*([\d,]+(?:\.\d+)?)\s*(?:([KMBT])(?=\s+\S))?'
+TRAILING_SYMBOL = r'\s(\S+)\s*$'
+SUFFIX_MULTIPLIERS = {'K': 1e3, 'M': 1e6, 'B': 1e9, 'T': 1e12}
+SUBSCRIPT_DIGITS = str.maketrans('₀₁₂₃₄₅₆₇₈₉', '0123456789')
+
+
+def _expand_subscript_zeros(match) -> str:
+    """ CoinMarketCap writes $0.00000123 as $0.0₅123 (five zeros); put the zeros back."""
+    zeros = int(match.group(1).translate(SUBSCRIPT_DIGITS))
+    return '0.' + '0' * zeros
+
+
+def _to_number(values: pd.Series) -> pd.Series:
+    """ Strip currency/percent decoration and convert to float (NaN when unparseable)."""
+    cleaned = values.str.replace(r'0\.0([₀-₉]+)' , _expand_subscript_zeros , regex=True)
+    cleaned = cleaned.str.replace(r'[$,%\s]' , '' , regex=True)
+    return pd.to_numeric(cleaned , errors='coerce')
+
+
+def _to_dollar_amount(values: pd.Series , anchor: str) -> pd.Series:
+    """
+        Read a full dollar amount, falling back to the abbreviated ("$1.34T") form.
+
+        Args:
+            values: raw cell texts
+            anchor: '^' for the first amount in the cell, '$' for the last one
+    """
+    pattern = '^' + DOLLAR_AMOUNT if anchor == '^' else DOLLAR_AMOUNT + r'\s*$'
+    full = values.str.extract(pattern , expand=False).str.replace(',' , '' , regex=False)
+    amount = pd.to_numeric(full , errors='coerce')
+
+    abbreviated = values.str.extract(ABBREVIATED_AMOUNT)
+    multiplier = abbreviated[1].map(SUFFIX_MULTIPLIERS)
+    return amount.fillna(pd.to_numeric(abbreviated[0] , errors='coerce') * multiplier)
+
+
+def _split_name_symbol(names: pd.Series , symbols: pd.Series) -> pd.Series:
+    """ The name cell reads "BitcoinBTC"; drop the trailing ticker when it is known."""
+    return pd.Series(
+        [
+            name[:-len(symbol)].strip() if isinstance(symbol , str) and symbol and name.endswith(symbol) and name != symbol else name
+            for name , symbol in zip(names , symbols)
+        ],
+        index=names.index,
+        dtype='object'
+    )
+
+
+def normalize_crypto_data(crypto_data: List[Dict[str,str]]) -> pd.DataFrame:
+    """
+        Convert scraped crypto dicts into a typed, columnar frame.
+
+        Args:
+            crypto_data: list of dicts as returned by the scrapers
+        Returns:
+            DataFrame with NORMALIZED_COLUMNS: rank (Int64), name/symbol (str) and
+            float columns for price, changes (%), market cap, volume and supply.
+    """
+    raw = pd.DataFrame.from_records(crypto_data , columns=RAW_FIELDS).fillna('').astype(str)
+    if raw.empty:
+        return pd.DataFrame(columns=NORMALIZED_COLUMNS)
+
+    supply = raw['circulating_supply'].str.extract(SUPPLY_AMOUNT)
+    supply_amount = pd.to_numeric(supply[0].str.replace(',' , '' , regex=False) , errors='coerce')
+    supply_amount = supply_amount * supply[1].map(SUFFIX_MULTIPLIERS).fillna(1)
+    supply_symbol = raw['circulating_supply'].str.extract(TRAILING_SYMBOL , expand=False)
+    volume_symbol = raw['24h_volume'].str.extract(TRAILING_SYMBOL , expand=False)
+    symbol = supply_symbol.fillna(volume_symbol)
+
+    frame = pd.DataFrame({
+        'rank': pd.to_numeric(raw['rank'].str.strip() , errors='coerce').astype('Int64'),
+        'name': _split_name_symbol(raw['name'] , symbol),
+        'symbol': symbol,
+        'price': _to_number(raw['price']),
+        'one_hour_change': _to_number(raw['1h_change']),
+        'twenty_four_hour_change': _to_number(raw['24h_change']),
+        'seven_day_change': _to_number(raw['7d_change']),
+        'market_cap': _to_dollar_amount(raw['market_cap'] , anchor='$'),
+        'volume_24h': _to_dollar_amount(raw['24h_volume'] , anchor='^'),
+        'circulating_supply': supply_amount,
+    } , columns=NORMALIZED_COLUMNS)
+    frame[FLOAT_COLUMNS] = frame[FLOAT_COLUMNS].astype('float64')
+
+    unparsed = frame['price'].isna().sum()
+    if unparsed:
+        logger.warning(f"{unparsed} rows have a price that could not be parsed.")
+    return frame
+
+
+def to_db_rows(frame: pd.DataFrame) -> List[Tuple]:
+    """
+        Convert a normalized frame into row tuples for pyodbc (NaN/NA become None).
+    """
+    values = frame.astype(object).where(frame.notna() , None)
+    return list(values.itertuples(index=False , name=None))
+
+
+def normalize_symbol(symbol) -> str:
+    """ Ticker key of the Coin table: trimmed and upper-case ("btc " -> "BTC")."""
+    return symbol.strip().upper() if isinstance(symbol , str) else ''
+
+
+def normalize_name(name) -> str:
+    """ Name key of the Coin table: case-folded with single spaces ("Bitcoin  Cash" -> "bitcoin cash")."""
+    return ' '.join(name.split()).casefold() if isinstance(name , str) else ''
+
+
+def coin_keys(frame: pd.DataFrame) -> List[Tuple[str, str]]:
+    """ Normalized (symbol, name) key of every row of a normalized frame."""
+    return [(normalize_symbol(symbol) , normalize_name(name)) for symbol , name in zip(frame['symbol'] , frame['name'])]
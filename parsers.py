@@ -0,0 +1,197 @@
+"""
+Parser Backends for the CoinMarketCap Table
+Every backend returns the same List[Dict[str,str]] as the original BeautifulSoup parser.
+"""
+
+import re
+import logging
+from typing import List , Dict , Optional , Callable , Tuple
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import html as lxml_html
+except ImportError:  # lxml is optional, the bs4 backend always works
+    lxml_html = None
+
+from config import PARSER_BACKEND
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# (dict key, td index) for every field taken from a table row
+CRYPTO_COLUMNS = (
+    ('rank', 1),
+    ('name', 2),
+    ('price', 3),
+    ('1h_change', 4),
+    ('24h_change', 5),
+    ('7d_change', 6),
+    ('market_cap', 7),
+    ('24h_volume', 8),
+    ('circulating_supply', 9),
+)
+MIN_COLUMNS = 10
+
+# The change cells show no minus sign: a falling coin is marked by a caret-down icon
+# (<span class="icon-Caret-down">), so the sign is read from that class.
+CHANGE_KEYS = ('1h_change', '24h_change', '7d_change')
+CARET_DOWN = re.compile(r'caret-down' , re.IGNORECASE)
+CARET_DOWN_XPATH = ".//*[contains(translate(@class, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'caret-down')]"
+
+CMC_TABLE_XPATH = "//table[contains(concat(' ', normalize-space(@class), ' '), ' cmc-table ')]"
+
+# Collects [text, has caret-down] of every cell of every row in one round trip to the browser.
+TABLE_CELLS_SCRIPT = """
+const table = document.querySelector('table.cmc-table');
+if (!table) { return null; }
+return Array.from(table.querySelectorAll('tr'), row =>
+    Array.from(row.querySelectorAll('td'), cell =>
+        [cell.textContent, cell.querySelector('[class*="caret-down" i]') !== null]));
+"""
+
+
+def _cell_value(key: str , text: str , falling: bool) -> str:
+    """ Cell text as stored, with a minus sign on changes marked by a caret-down icon."""
+    text = text.strip()
+    if falling and key in CHANGE_KEYS and text and not text.startswith('-'):
+        return '-' + text
+    return text
+
+
+def _bs4_is_falling(cell) -> bool:
+    return cell.find(class_=CARET_DOWN) is not None
+
+
+def _rows_to_crypto_data(rows_cells: List[List[Tuple[str, bool]]]) -> List[Dict[str,str]]:
+    """ Build crypto dicts from the (text, falling) cells of each data row (header already removed)."""
+    crypto_data = []
+    for cells in rows_cells:
+        if len(cells) >= MIN_COLUMNS:
+            crypto_data.append({key: _cell_value(key , *cells[index]) for key , index in CRYPTO_COLUMNS})
+        else:
+            logger.debug('Skipping rows with insufficient columns')
+    return crypto_data
+
+
+def parse_crypto_data(soup:BeautifulSoup) -> List[Dict[str,str]]:
+    """
+        Parse the cmc-table out of a BeautifulSoup document.
+
+        Args:
+            soup: parsed page
+        Returns:
+            List of dictionaries containing crypto currency information
+    """
+
+    crypto_data = []
+
+    table = soup.find('table', {'class':'cmc-table'})
+    if not table:
+        logger.error('Could not Find cryptocurrency table')
+        return crypto_data
+
+    rows = table.find_all('tr')
+    logger.info(f"Found {len(rows) - 1} rows (excluding header.)")
+
+    for row in rows[1:]: #skip header row
+        cols = row.find_all('td')
+        if len(cols) >=MIN_COLUMNS:
+            try:
+                crypto_info = {key: _cell_value(key , cols[index].text , _bs4_is_falling(cols[index]))
+                               for key , index in CRYPTO_COLUMNS}
+                crypto_data.append(crypto_info)
+            except (IndexError , AttributeError) as e:
+                logger.warning(f'Error parsing now: {e}')
+                continue
+        else:
+            logger.debug('Skipping rows with insufficient columns')
+            continue
+
+    return crypto_data
+
+
+def parse_crypto_data_bs4(page_source: str) -> List[Dict[str,str]]:
+    """ BeautifulSoup backend (html.parser), the reference implementation."""
+    return parse_crypto_data(BeautifulSoup(page_source , 'html.parser'))
+
+
+def parse_crypto_data_lxml(page_source: str) -> List[Dict[str,str]]:
+    """ lxml backend: one C-level parse and XPath lookups instead of a bs4 tree."""
+    document = lxml_html.fromstring(page_source)
+    tables = document.xpath(CMC_TABLE_XPATH)
+    if not tables:
+        logger.error('Could not Find cryptocurrency table')
+        return []
+
+    rows = tables[0].xpath('.//tr')
+    logger.info(f"Found {len(rows) - 1} rows (excluding header.)")
+    rows_cells = [[(cell.text_content() , bool(cell.xpath(CARET_DOWN_XPATH))) for cell in row.xpath('.//td')]
+                  for row in rows[1:]]
+    return _rows_to_crypto_data(rows_cells)
+
+
+def parse_crypto_data_js(driver) -> List[Dict[str,str]]:
+    """
+        Browser backend: read the table straight from the live DOM with a single
+        execute_script call, skipping page_source serialisation and re-parsing.
+
+        Args:
+            driver: Selenium Web Driver Instance with the listing page loaded
+    """
+    with timed('parse_js'):
+        rows_cells = driver.execute_script(TABLE_CELLS_SCRIPT)
+    if rows_cells is None:
+        logger.error('Could not Find cryptocurrency table')
+        return []
+
+    logger.info(f"Found {len(rows_cells) - 1} rows (excluding header.)")
+    return _rows_to_crypto_data(rows_cells[1:])
+
+
+PAGE_SOURCE_PARSERS: Dict[str, Callable[[str], List[Dict[str,str]]]] = {
+    'bs4': parse_crypto_data_bs4,
+    'lxml': parse_crypto_data_lxml,
+}
+
+
+def available_backends() -> List[str]:
+    """ Page-source backends usable in this environment."""
+    return [name for name in PAGE_SOURCE_PARSERS if name != 'lxml' or lxml_html is not None]
+
+
+def parse_page_source(page_source: str , backend: Optional[str] = None) -> List[Dict[str,str]]:
+    """
+        Parse a page's HTML with the configured backend.
+
+        Args:
+            page_source: raw page HTML
+            backend: 'bs4' or 'lxml' (default: PARSER_BACKEND; 'js' needs a driver
+                     so it parses page sources with bs4)
+        Returns:
+            List of dictionaries containing crypto currency information
+    """
+    backend = backend or PARSER_BACKEND
+    if backend not in available_backends():
+        if backend != 'js':
+            logger.warning(f"Parser backend '{backend}' is not available, using bs4.")
+        backend = 'bs4'
+    with timed(f'parse_{backend}'):
+        return PAGE_SOURCE_PARSERS[backend](page_source)
+
+
+def compare_parser_backends(page_source: str) -> Dict[str, bool]:
+    """
+        Check that every available backend reproduces the bs4 output for a saved page.
+
+        Args:
+            page_source: raw page HTML (e.g. a saved snapshot)
+        Returns:
+            {backend: True if its output is identical to the bs4 backend}
+    """
+    reference = parse_crypto_data_bs4(page_source)
+    parity = {}
+    for backend in available_backends():
+        parity[backend] = PAGE_SOURCE_PARSERS[backend](page_source) == reference
+        if not parity[backend]:
+            logger.warning(f"Parser backend '{backend}' does not match bs4 output.")
+    return parity
@@ -0,0 +1,227 @@
+"""
+Streaming Scrape-to-Database Pipeline
+Pages are handed to a background writer as soon as they are parsed, so inserts overlap
+with loading the next page and only a bounded number of pages is held in memory.
+"""
+
+import queue
+import logging
+import threading
+from datetime import datetime
+from typing import List , Dict , Iterable , Optional , Tuple , Callable
+
+from config import PERSISTENCE_MODE , WRITER_QUEUE_PAGES , WRITER_BATCH_ROWS
+from database import (
+    get_sql_connection,
+    start_snapshot,
+    finish_snapshot,
+    insert_crypto_data,
+    load_latest_values
+)
+from checkpoint import ScrapeCheckpoint
+import market_cache
+import archive
+
+logger = logging.getLogger(__name__)
+
+# Put on the queue by close() to tell the writer thread no more pages are coming
+_END_OF_PAGES = None
+
+
+class SnapshotWriter:
+    """
+        Background thread that stores scraped pages under one snapshot.
+
+        write() hands a page to the thread through a queue of WRITER_QUEUE_PAGES pages;
+        when the queue is full it blocks, which slows the scraper down to the speed
+        of the database instead of buffering every page. Rows are inserted in
+        batches of WRITER_BATCH_ROWS. The snapshot is started with the first row and
+        finished by close(), so readers only ever see complete runs. A finished
+        snapshot of the whole listing becomes this process's latest market (see
+        market_cache.py).
+
+        Use as a context manager (or call start()/close()).
+
+        Args:
+            started_at: start time of the run (stored as scraped_at)
+            snapshot_id: unfinished snapshot to keep adding to (resumed runs)
+            rows_inserted / pages_written: what the resumed snapshot already holds
+            on_progress: called with (snapshot_id, pages, rows_inserted) after every
+                         committed batch, e.g. ScrapeCheckpoint.record_progress
+            partial: the run covers only the top of the listing (see start_snapshot)
+    """
+
+    def __init__(self, started_at: Optional[datetime] = None , batch_rows: int = WRITER_BATCH_ROWS ,
+                 queue_size: int = WRITER_QUEUE_PAGES , snapshot_id: Optional[int] = None ,
+                 rows_inserted: int = 0 , pages_written: int = 0 ,
+                 on_progress: Optional[Callable[[int, List[int], int], None]] = None ,
+                 partial: bool = False):
+        self.started_at = started_at or datetime.now()
+        self.partial = partial
+        self.batch_rows = max(1 , batch_rows)
+        self.snapshot_id = snapshot_id
+        self.rows_inserted = rows_inserted
+        self.pages_written = pages_written
+        self.on_progress = on_progress
+        self.finish = True
+        self.error: Optional[Exception] = None
+        # delta mode: the previous values are loaded once per snapshot, even when empty
+        self._latest_loaded = False
+        self._queue = queue.Queue(maxsize=max(1 , queue_size))
+        self._thread = threading.Thread(target=self._run , name='snapshot-writer' , daemon=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def start(self) -> 'SnapshotWriter':
+        self._thread.start()
+        return self
+
+    def write(self, page_data: List[Dict[str,str]] , page: Optional[int] = None) -> None:
+        """ Queue one page of scraped rows (blocks while the writer is behind)."""
+        if page_data:
+            self._queue.put((page , page_data))
+
+    def close(self, finish: bool = True) -> Optional[int]:
+        """
+            Flush the remaining rows, finish the snapshot and stop the thread.
+
+            Args:
+                finish: False leaves the snapshot unfinished so a later run can resume it
+            Returns:
+                Rows inserted, or None if the writer failed.
+        """
+        if self._thread.is_alive():
+            self.finish = finish
+            self._queue.put(_END_OF_PAGES)
+            self._thread.join()
+        return None if self.error else self.rows_inserted
+
+    def _flush(self, connection , batch: List[Dict[str,str]] , pages: List[int] , latest_values: Optional[Dict]) -> None:
+        if self.snapshot_id is None:
+            self.snapshot_id = start_snapshot(connection , self.started_at , self.partial)
+        if PERSISTENCE_MODE == 'delta' and not self._latest_loaded:
+            latest_values.update(load_latest_values(connection , before_snapshot=self.snapshot_id))
+            self._latest_loaded = True
+
+        inserted = insert_crypto_data(connection , batch , snapshot_id=self.snapshot_id ,
+                                      latest_values=latest_values)
+        if inserted is None:
+            raise RuntimeError(f"Insert into snapshot {self.snapshot_id} failed.")
+        self.rows_inserted += inserted
+        if self.on_progress:
+            self.on_progress(self.snapshot_id , pages , self.rows_inserted)
+
+    def _run(self) -> None:
+        batch: List[Dict[str,str]] = []
+        batch_pages: List[int] = []
+        latest_values = {} if PERSISTENCE_MODE == 'delta' else None
+        end_of_pages = False
+        try:
+            with get_sql_connection() as connection:
+                while True:
+                    item = self._queue.get()
+                    if item is _END_OF_PAGES:
+                        end_of_pages = True
+                        break
+                    page , page_data = item
+                    batch.extend(page_data)
+                    batch_pages.append(page)
+                    self.pages_written += 1
+                    if len(batch) >= self.batch_rows:
+                        self._flush(connection , batch , batch_pages , latest_values)
+                        batch , batch_pages = [] , []
+
+                if batch:
+                    self._flush(connection , batch , batch_pages , latest_values)
+                if self.snapshot_id is not None and self.finish:
+                    finish_snapshot(connection , self.snapshot_id , self.pages_written , self.rows_inserted)
+                    logger.info(f"Snapshot {self.snapshot_id} saved: {self.rows_inserted} rows from {self.pages_written} pages.")
+                    if not self.partial:
+                        market_cache.refresh(connection)
+                elif self.snapshot_id is not None:
+                    logger.info(f"Snapshot {self.snapshot_id} left open for resuming ({self.rows_inserted} rows so far).")
+        except Exception as e:
+            self.error = e
+            logger.error(f"Snapshot writer failed: {e}" , exc_info=True)
+            # keep draining so the scraper never blocks on a dead writer
+            while not end_of_pages:
+                end_of_pages = self._queue.get() is _END_OF_PAGES
+
+
+def close_abandoned_snapshot(snapshot_id: int , page_count: int , row_count: int) -> bool:
+    """
+        Close the unfinished snapshot of a discarded checkpoint run as a partial snapshot,
+        so its rows are rolled up and counted but never served as the latest market.
+
+        Args:
+            snapshot_id: snapshot left open by the run
+            page_count / row_count: pages and rows the run committed to it
+        Returns:
+            True once the snapshot is closed, False if the database could not be reached.
+    """
+    try:
+        with get_sql_connection() as connection:
+            finish_snapshot(connection , snapshot_id , page_count , row_count , is_partial=True)
+        logger.info(f"Closed abandoned snapshot {snapshot_id} as partial ({row_count} rows from {page_count} pages).")
+        return True
+    except Exception as e:
+        logger.error(f"Could not close abandoned snapshot {snapshot_id}: {e}")
+        return False
+
+
+def stream_to_sql_server(pages: Iterable[Tuple[int, List[Dict[str,str]]]] ,
+                         started_at: Optional[datetime] = None ,
+                         checkpoint: Optional[ScrapeCheckpoint] = None ,
+                         partial: bool = False) -> Optional[int]:
+    """
+        Store pages under one snapshot while they are being scraped.
+
+        Without a checkpoint, a scraper that raises part way still saves the pages
+        already scraped as a (shorter) finished snapshot. With a checkpoint the
+        snapshot is only finished once every page is in; otherwise it stays open and
+        the next run resumes it (see checkpoint.ScrapeCheckpoint).
+
+        Args:
+            pages: (page, rows) iterator, e.g. scraper.iter_coinmarketcap_pages()
+                   or checkpoint.resume(scraper.iter_coinmarketcap_pages)
+            started_at: when the scrape run started (default: now)
+            checkpoint: checkpoint of the run, already begun
+            partial: the run scrapes only the top of the listing, so its snapshot
+                     is kept out of the "latest market" (see start_snapshot)
+        Returns:
+            Rows inserted (0 when nothing was scraped), or None if saving failed.
+    """
+    resume = {}
+    if checkpoint is not None:
+        resume = {
+            'snapshot_id': checkpoint.snapshot_id,
+            'rows_inserted': checkpoint.rows_inserted,
+            'pages_written': checkpoint.written_page_count(),
+            'on_progress': checkpoint.record_progress,
+        }
+
+    # pages archived while `pages` is consumed belong to this run (see archive.py)
+    started_at = started_at or datetime.now()
+    archive.begin_run(started_at , partial)
+    writer = SnapshotWriter(started_at , partial=partial , **resume).start()
+    try:
+        for page , page_data in pages:
+            logger.info(f"Queueing {len(page_data)} rows of page {page} for the database.")
+            writer.write(page_data , page)
+    except Exception as e:
+        logger.error(f"Scraping stopped early, saving the pages scraped so far: {e}" , exc_info=True)
+    finally:
+        complete = checkpoint is None or checkpoint.is_complete()
+        rows_inserted = writer.close(finish=complete)
+
+    if checkpoint is not None and rows_inserted is not None:
+        if complete:
+            checkpoint.clear()
+        else:
+            logger.warning("Some pages are still missing; run again to resume this snapshot.")
+    return rows_inserted
@@ -4,44 +4,80 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 import time
 import logging 
-from typing import List , Dict
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor , ProcessPoolExecutor
+from typing import List , Dict , Iterable , Iterator , Tuple , Optional
 from contextlib import contextmanager
 import json
 
 
 from config import (
     COINMARKET_URL,
-    SCROLL_PAUSE_TIME,
-    SCROLL_STEP,
+    SCROLL_POLL_INTERVAL,
+    SCROLL_SETTLE_TIMEOUT,
     MAX_SCROLL_ATTEMPTS,
+    MAX_SCROLL_ROUNDS,
     EXPLICIT_TIME_WAITOUT,
+    PAGE_LOAD_DELAY,
+    MAX_CONCURRENT_DRIVERS,
+    HEADLESS_POOL_DRIVERS,
+    MAX_PAGE_RETRIES,
+    POOL_PARSE_PROCESSES,
+    PARSER_BACKEND,
     CHROME_EXPERIMENTAL_OPTIONS,
     CHROME_OPTIONS
 )
+from parsers import parse_crypto_data , parse_crypto_data_js , parse_page_source
+from metrics import timed , increment
+import archive
 
 logger = logging.getLogger(__name__)
 
-@contextmanager
-def get_chrome_driver():
-    """ Context manager for Chrome WebDriver to ensure proper cleanup."""
+# Outcome of the most recent scrape_coinmarketcap_all_pages() run:
+# pages requested/scraped, rows collected and {page: reason} for failed pages.
+last_scrape_report: Dict = {}
+
+
+def create_chrome_driver(headless: bool = False) -> webdriver.Chrome:
+    """
+        Start a new Chrome WebDriver with the configured options.
+
+        Args:
+            headless: run Chrome without a visible window.
+        Returns:
+            Chrome WebDriver instance (caller is responsible for quit()).
+    """
 
     options = Options()
     # Add command line options
     for option in CHROME_OPTIONS:
         options.add_argument(option)
 
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+
     # Add Experimental Options
 
     for key, value in CHROME_EXPERIMENTAL_OPTIONS.items():
         options.add_experimental_option(key,value)
 
+    driver = webdriver.Chrome(options=options)
+    driver.implicitly_wait(5)
+    return driver
+
+
+@contextmanager
+def get_chrome_driver(headless: bool = False):
+    """ Context manager for Chrome WebDriver to ensure proper cleanup."""
+
     driver = None
     try:
-        driver = webdriver.Chrome(options=options)
-        driver.implicitly_wait(5)
+        driver = create_chrome_driver(headless)
         logger.info("Chrome WebDriver Initalized Successfully.")
         yield driver
     except Exception as e:
@@ -52,80 +88,100 @@ def get_chrome_driver():
             logger.info("Browser Closed Successfully.")
 
 
-def scroll_to_load_content(driver:webdriver.Chrome,max_scrolls: int = MAX_SCROLL_ATTEMPTS) -> None:
+# Returns [rows in table, rows with real cells, placeholder rows in the viewport, at page bottom].
+# Lazy rows are rendered as short placeholder rows until they are scrolled into view.
+TABLE_PROGRESS_SCRIPT = """
+const rows = document.querySelectorAll('table.cmc-table tbody tr');
+let loaded = 0;
+let pendingInView = 0;
+for (const row of rows) {
+    if (row.querySelectorAll('td').length >= 10) {
+        loaded++;
+        continue;
+    }
+    const rect = row.getBoundingClientRect();
+    if (rect.bottom > 0 && rect.top < window.innerHeight) {
+        pendingInView++;
+    }
+}
+const atBottom = Math.ceil(window.scrollY + window.innerHeight) >= document.body.scrollHeight;
+return [rows.length, loaded, pendingInView, atBottom];
+"""
+
+
+def _table_progress(driver: webdriver.Chrome) -> Tuple[int, int, int, bool]:
+    total , loaded , pending_in_view , at_bottom = driver.execute_script(TABLE_PROGRESS_SCRIPT)
+    return int(total) , int(loaded) , int(pending_in_view) , bool(at_bottom)
+
+
+def scroll_to_load_content(driver:webdriver.Chrome,max_scrolls: int = MAX_SCROLL_ATTEMPTS,
+                           expected_rows: Optional[int] = None) -> Dict[str, float]:
     """ 
-        Scroll the page to load dynamic content.
+        Scroll the page until every row of the cmc-table has rendered.
+
+        Jumps one viewport at a time and, after each jump, polls the row count
+        only until the rows in view have real cells (no fixed sleeps).
+
         Args: 
             Selenium Web Driver Instance
-            max_scrolls: max number of scroll attempts  to prevent infinite loops.
+            max_scrolls: consecutive jumps without new rows before giving up.
+            expected_rows: stop as soon as this many rows are loaded
+                           (default: every row present in the table).
+        Returns:
+            Scroll stats: elapsed seconds, rounds (viewport jumps), rows and loaded_rows.
     """
-    scroll_attempts = 0
-    last_height = driver.execute_script("return document.body.scrollHeight")
+    start = time.perf_counter()
+    rounds = 0
+    stalled = 0
 
     logger.info("Starting page scrolling to load dynamic content")
+    total , loaded , pending_in_view , at_bottom = _table_progress(driver)
 
-    while scroll_attempts < max_scrolls:
-        for i in range(0 , last_height , SCROLL_STEP):
-            driver.execute_script(f"window.scroll(0 , {i});")
-            time.sleep(SCROLL_PAUSE_TIME)
-        
-        # wait for next content to load
-        time.sleep(1)
-
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
+    while rounds < MAX_SCROLL_ROUNDS:
+        target = expected_rows or total
+        if target and loaded >= target and (expected_rows or at_bottom):
+            logger.info("All rows loaded.")
+            break
+        if at_bottom and stalled >= max_scrolls:
             logger.info("Reached to end.")
             break
 
-        last_height = new_height
-        scroll_attempts +=1
-        logger.info(f"Scroll attempt {scroll_attempts}/{max_scrolls}")
-
-    logger.info("Finished Scrolling")
-
-def parse_crypto_data(soup:BeautifulSoup) -> List[Dict[str,str]]:
+        driver.execute_script("window.scrollBy(0, window.innerHeight);")
+        rounds += 1
+
+        # wait only while rows in view are still placeholders
+        previous_loaded = loaded
+        deadline = time.perf_counter() + SCROLL_SETTLE_TIMEOUT
+        while True:
+            total , loaded , pending_in_view , at_bottom = _table_progress(driver)
+            if not pending_in_view or time.perf_counter() >= deadline:
+                break
+            time.sleep(SCROLL_POLL_INTERVAL)
+
+        stalled = stalled + 1 if loaded == previous_loaded else 0
+        logger.debug(f"Scroll round {rounds}: {loaded}/{total} rows loaded")
+
+    stats = {
+        'elapsed': round(time.perf_counter() - start , 3),
+        'rounds': rounds,
+        'rows': total,
+        'loaded_rows': loaded,
+    }
+    logger.info(f"Finished Scrolling: {loaded}/{total} rows in {stats['elapsed']}s over {rounds} rounds")
+    return stats
+
+def parse_loaded_page(driver: webdriver.Chrome , page: int = 1) -> List[Dict[str,str]]:
     """
-    
-    :param soup: Description
-    :type soup: BeautifulSoup
-    :return: Description
-    :rtype: List[Dict[str, str]]
+        Parse the listing table of the page currently loaded in the driver
+        with the configured PARSER_BACKEND (archiving its page source when
+        ARCHIVE_ENABLED; the 'js' backend never reads the page source).
     """
-
-    crypto_data = []
-
-    table = soup.find('table', {'class':'cmc-table'})
-    if not table:
-        logger.error('Could not Find cryptocurrency table')
-        return crypto_data
-    
-    rows = table.find_all('tr')
-    logger.info(f"Found {len(rows) - 1} rows (excluding header.)")
-
-    for row in rows[1:]: #skip header row
-        cols = row.find_all('td')
-        if len(cols) >=10:
-            try:
-                crypto_info = {
-                    'rank': cols[1].text.strip(),
-                    'name': cols[2].text.strip(),
-                    'price': cols[3].text.strip(),
-                    '1h_change': cols[4].text.strip(),
-                    '24h_change': cols[5].text.strip(),
-                    '7d_change': cols[6].text.strip(),
-                    'market_cap': cols[7].text.strip(),
-                    '24h_volume': cols[8].text.strip(),
-                    'circulating_supply': cols[9].text.strip()
-                }
-                crypto_data.append(crypto_info)
-            except (IndexError , AttributeError) as e:
-                logger.warning(f'Error parsing now: {e}')
-                continue
-        else:
-            logger.debug('Skipping rows with insufficient columns')
-            continue
-            
-    return crypto_data 
+    if PARSER_BACKEND == 'js':
+        return parse_crypto_data_js(driver)
+    with timed('page_source'):
+        page_source = driver.page_source
+    archive.archive_page(page_source , page)
+    return parse_page_source(page_source)
 
 
 
@@ -153,12 +209,9 @@ def scrape_coinmarketcap() -> List[Dict[str,str]]:
             # Scroll to laod content
             scroll_to_load_content(driver)
 
-            
-            soup = BeautifulSoup(driver.page_source ,'html.parser')
-            
+            # Parse crypto data
+            crypto_data = parse_loaded_page(driver)
 
-        # Parse crypto data
-        crypto_data = parse_crypto_data(soup)
         logger.info(f"Successfully scraped {len(crypto_data)} cryptocurrencies")
 
         return crypto_data
@@ -169,52 +222,346 @@ def scrape_coinmarketcap() -> List[Dict[str,str]]:
 
 
 
-def scrape_coinmarketcap_all_pages(max_pages: int = 10) -> List[Dict[str,str]]:
+def load_page(driver: webdriver.Chrome , page: int) -> None:
+    """
+        Load one listing page in an already running driver and scroll until its
+        table is filled.
+
+        Args:
+            driver: Selenium Web Driver Instance
+            page: listing page number (1 based)
+        Raises:
+            TimeoutException: if the table does not appear within EXPLICIT_TIME_WAITOUT.
+    """
+    url=f"{COINMARKET_URL}?page={page}"
+    logger.info(f"Navigation to {url}")
+    with timed('page_load'):
+        driver.get(url)
+    with timed('page_load_delay'):
+        time.sleep(PAGE_LOAD_DELAY)
+
+    with timed('table_wait'):
+        WebDriverWait(driver , EXPLICIT_TIME_WAITOUT).until(
+            EC.presence_of_element_located((By.CLASS_NAME , 'cmc-table'))
+        )
+    logger.info(f"Page {page} Loaded Successfully.")
+
+    # scroll to load to content.
+    with timed('scroll'):
+        scroll_to_load_content(driver)
+
+
+def _count_scraped(page: int , page_data: List[Dict[str,str]]) -> None:
+    increment('pages_scraped')
+    increment('rows_scraped' , len(page_data))
+    logger.info(f"{len(page_data)} cryptocurrencies scraped from page {page}.")
+
+
+def scrape_page(driver: webdriver.Chrome , page: int) -> List[Dict[str,str]]:
+    """
+        Load one listing page in an already running driver and parse it.
+
+        Args:
+            driver: Selenium Web Driver Instance
+            page: listing page number (1 based)
+        Returns:
+            List containing dicts of crypto currencies on that page.
+        Raises:
+            TimeoutException: if the table does not appear within EXPLICIT_TIME_WAITOUT.
+    """
+    load_page(driver , page)
+
+    # Parse the Page
+    page_data = parse_loaded_page(driver , page)
+    _count_scraped(page , page_data)
+    return page_data
+
+
+class ChromeDriverPool:
+    """
+        Pool of reusable Chrome drivers that scrape listing pages in parallel.
+
+        Each worker thread borrows an idle driver, scrapes one page and hands the
+        driver back, so at most `size` browsers are running at any time. A driver
+        that raises anything other than a page timeout is quit and replaced.
+        Use as a context manager (or call close()) to quit every browser.
+
+        With parse_processes > 0 (and a page-source PARSER_BACKEND) a driver is
+        handed back as soon as its page source is read; the HTML is parsed in a
+        process pool while the browser already loads the next page.
+    """
+
+    def __init__(self, size: int = MAX_CONCURRENT_DRIVERS , headless: bool = HEADLESS_POOL_DRIVERS ,
+                 parse_processes: int = POOL_PARSE_PROCESSES):
+        self.size = max(1, size)
+        self.headless = headless
+        self.parse_processes = max(0 , parse_processes) if PARSER_BACKEND != 'js' else 0
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self._parse_futures = set()
+
+    @property
+    def workers(self) -> int:
+        """ Pages in flight: one per driver plus one per page being parsed off the driver."""
+        return self.size + self.parse_processes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _acquire(self) -> webdriver.Chrome:
+        while True:
+            with self._lock:
+                can_create = self._idle.empty() and self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                break
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                # a broken driver may have been discarded meanwhile, freeing a slot
+                continue
+        try:
+            with timed('driver_start'):
+                driver = create_chrome_driver(self.headless)
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        logger.info(f"Chrome WebDriver {self._created}/{self.size} Initalized Successfully.")
+        return driver
+
+    def _release(self, driver: webdriver.Chrome) -> None:
+        self._idle.put(driver)
+
+    def _discard(self, driver: webdriver.Chrome) -> None:
+        increment('driver_restarts')
+        with self._lock:
+            self._created -= 1
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.debug(f"Error quitting broken driver: {e}")
+
+    def _parse_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._parse_pool is None:
+                self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_processes)
+            return self._parse_pool
+
+    def _load_page_source(self, driver: webdriver.Chrome , page: int) -> str:
+        load_page(driver , page)
+        with timed('page_source'):
+            return driver.page_source
+
+    def scrape_page_with_retries(self, page: int) -> List[Dict[str,str]]:
+        """ Scrape one page on a pooled driver, retrying up to MAX_PAGE_RETRIES times."""
+        attempt = 0
+        while True:
+            driver = self._acquire()
+            try:
+                if not self.parse_processes:
+                    page_data = scrape_page(driver , page)
+                    self._release(driver)
+                    return page_data
+                page_source = self._load_page_source(driver , page)
+                self._release(driver)
+                break
+            except TimeoutException:
+                # the browser is fine, only this page was slow
+                self._release(driver)
+                error = TimeoutException(f"Timeout waiting for table on page {page}")
+            except Exception as e:
+                self._discard(driver)
+                error = e
+
+            if attempt >= MAX_PAGE_RETRIES:
+                raise error
+            attempt += 1
+            increment('page_retries')
+            logger.warning(f"Retrying page {page} ({attempt}/{MAX_PAGE_RETRIES}) after: {error}")
+
+        archive.archive_page(page_source , page)
+        # timed here: the worker process keeps its own (discarded) metrics
+        with timed(f'parse_{PARSER_BACKEND}'):
+            future = self._parse_executor().submit(parse_page_source , page_source)
+            with self._lock:
+                self._parse_futures.add(future)
+            try:
+                page_data = future.result()
+            finally:
+                with self._lock:
+                    self._parse_futures.discard(future)
+        _count_scraped(page , page_data)
+        return page_data
+
+    def iter_pages(self, pages: Iterable[int] , failures: Optional[Dict[int, str]] = None) -> Iterator[Tuple[int, List[Dict[str,str]]]]:
+        """
+            Scrape listing pages across the pool, yielding each page as soon as it
+            and every page before it are done.
+
+            At most `workers` pages are in flight (loading in a browser or being
+            parsed), so memory stays bounded by the pool size no matter how many
+            pages are requested. Scraping stops at the first
+            empty page (end of the listing).
+
+            Args:
+                pages: page numbers to scrape.
+                failures: dict filled with {page: reason} for failed pages.
+            Yields:
+                (page, rows) in page order; failed pages are skipped.
+        """
+        pages = iter(sorted(set(pages)))
+        failures = {} if failures is None else failures
+        pending = deque()
+
+        # threads beyond `size` wait for a driver, taking over the one a parsing thread handed back
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            def submit_next() -> None:
+                page = next(pages , None)
+                if page is not None:
+                    pending.append((page , executor.submit(self.scrape_page_with_retries , page)))
+
+            for _ in range(self.workers):
+                submit_next()
+
+            try:
+                while pending:
+                    page , future = pending.popleft()
+                    try:
+                        page_data = future.result()
+                    except Exception as e:
+                        logger.warning(f"Page {page} failed: {e}")
+                        increment('pages_failed')
+                        failures[page] = str(e).strip() or type(e).__name__
+                        submit_next()
+                        continue
+
+                    if not page_data:
+                        logger.info(f'No data found on page {page}. Skipping later pages.')
+                        yield page , page_data
+                        break
+
+                    # keep the browsers busy while the caller handles this page
+                    submit_next()
+                    yield page , page_data
+            finally:
+                for _ , future in pending:
+                    future.cancel()
+
+    def scrape_pages(self, pages: Iterable[int]) -> Tuple[Dict[int, List[Dict[str,str]]], Dict[int, str]]:
+        """
+            Scrape listing pages across the pool.
+
+            Pages past the first empty page (end of the listing) are skipped.
+
+            Args:
+                pages: page numbers to scrape.
+            Returns:
+                ({page: rows} for scraped pages, {page: reason} for failed pages)
+        """
+        failures: Dict[int, str] = {}
+        results = dict(self.iter_pages(pages , failures))
+        return results , failures
+
+    def close(self) -> None:
+        """Quit every browser owned by the pool and stop its parse processes."""
+        while not self._idle.empty():
+            driver = self._idle.get_nowait()
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.debug(f"Error quitting driver: {e}")
+        with self._lock:
+            self._created = 0
+            parse_pool , self._parse_pool = self._parse_pool , None
+            parse_futures , self._parse_futures = self._parse_futures , set()
+        if parse_pool is not None:
+            # cancelled by hand: shutdown(cancel_futures=True) needs Python 3.9
+            for future in parse_futures:
+                future.cancel()
+            parse_pool.shutdown(wait=False)
+        logger.info("Browser Pool Closed Successfully.")
+
+
+def iter_coinmarketcap_pages(max_pages: int = 10 , concurrency: int = MAX_CONCURRENT_DRIVERS ,
+                             skip_pages: Iterable[int] = () ,
+                             pool: Optional['ChromeDriverPool'] = None) -> Iterator[Tuple[int, List[Dict[str,str]]]]:
+    """
+        Scrape cryptocurrency pages and yield each one as soon as it is parsed.
+
+        args:
+            max_pages: max pages to scrape (to avoid infinite scarping)
+            concurrency: number of Chrome drivers scraping pages in parallel
+            skip_pages: pages that are already scraped (e.g. from a checkpoint)
+            pool: warm driver pool to reuse (left open); by default a pool of
+                  `concurrency` drivers is started and closed for this run
+        yields:
+            (page, rows) in page order. When the generator is exhausted the run is
+            summarised in `last_scrape_report`.
+    """
+    global last_scrape_report
+    failures: Dict[int, str] = {}
+    pages_scraped = 0
+    rows = 0
+    skip_pages = set(skip_pages)
+    pages = [page for page in range(1, max_pages + 1) if page not in skip_pages]
+
+    owns_pool = pool is None
+    try:
+        pool = pool or ChromeDriverPool(size=concurrency)
+        for page , page_data in pool.iter_pages(pages , failures):
+            if page_data:
+                pages_scraped += 1
+                rows += len(page_data)
+            yield page , page_data
+    finally:
+        if owns_pool and pool is not None:
+            pool.close()
+
+        last_scrape_report = {
+            'pages_requested': len(pages),
+            'pages_scraped': pages_scraped,
+            'rows': rows,
+            'failed_pages': dict(sorted(failures.items())),
+        }
+
+        if failures:
+            failed = ", ".join(f"{page} ({reason})" for page , reason in sorted(failures.items()))
+            logger.warning(f"{len(failures)} page(s) failed: {failed}")
+
+        logger.info(f"Finished Scraping {rows} cryptocurrencies from {pages_scraped} pages.")
+
+
+def scrape_coinmarketcap_all_pages(max_pages: int = 10 , concurrency: int = MAX_CONCURRENT_DRIVERS) -> List[Dict[str,str]]:
     """
         Scrape All Cryptocurrencies data.
         args: 
             max_pages: max pages to scrape (to avoid infinite scarping)
+            concurrency: number of Chrome drivers scraping pages in parallel
+                         (1 scrapes the pages one after another).
         returns:
-            List containing dicts of crypto crurrencies.
+            List containing dicts of crypto crurrencies, in rank order.
+            Pages that failed are listed in `last_scrape_report['failed_pages']`;
+            if scraping stops on an error, the pages scraped until then are returned.
     """
     all_crypto_data = []
-   
+
     try:
-        with get_chrome_driver() as driver:
-            for page in range(1, max_pages + 1):
-                url=f"{COINMARKET_URL}?page={page}"
-                logger.info(f"Navigation to {url}")
-                driver.get(url)
-                time.sleep(3)
-            
-                try:
-                    WebDriverWait(driver , EXPLICIT_TIME_WAITOUT).until(
-                        EC.presence_of_element_located((By.CLASS_NAME , 'cmc-table'))
-                    )
-                    logger.info(f"Page {page} Loaded Successfully.")
-                except TimeoutException:
-                    logger.warning(f"Timeout waiting for to load on page {page}.")
-                    break
-
-                # scroll to load to content.
-                scroll_to_load_content(driver)
-
-                # Parse the Page
-                soup = BeautifulSoup(driver.page_source ,'html.parser')
-                page_data = parse_crypto_data(soup)
-                logger.info(f"{len(page_data)} cryptocurrencies scraped from page {page}.")
-                if not page_data:
-                    logger.info('No more data found. Stopping Scraping..')
-                    break
-                all_crypto_data.extend(page_data)
-            
-            logger.info(f"Finished Scraping {len(all_crypto_data)} cryptocurrencies from {page} pages.")
+        for _ , page_data in iter_coinmarketcap_pages(max_pages , concurrency):
+            all_crypto_data.extend(page_data)
 
         return all_crypto_data 
 
     except Exception as e:
-        logger.error("Error during scraping {e}" ,exc_info=True)
-        return []
+        logger.error(f"Error during scraping, keeping {len(all_crypto_data)} rows scraped so far: {e}" ,exc_info=True)
+        return all_crypto_data
 
 
 if __name__ == "__main__":
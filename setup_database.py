@@ -23,25 +23,90 @@ GO
 """
 
 CREATE_TABLE_SQL = """
+-- Create Snapshot table (one row per scrape run)
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='Snapshot' AND xtype='U')
+BEGIN
+    CREATE TABLE Snapshot (
+        id INT IDENTITY(1,1) PRIMARY KEY,
+        started_at DATETIME NOT NULL,
+        finished_at DATETIME NULL,
+        page_count INT NULL,
+        row_count INT NULL,
+        is_keyframe BIT NOT NULL CONSTRAINT DF_Snapshot_is_keyframe DEFAULT 1,
+        is_partial BIT NOT NULL CONSTRAINT DF_Snapshot_is_partial DEFAULT 0
+    );
+
+    PRINT 'Table Snapshot created successfully';
+END
+GO
+
+-- Create Coin dimension (one row per coin, keyed by normalized symbol and name)
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='Coin' AND xtype='U')
+BEGIN
+    CREATE TABLE Coin (
+        id INT IDENTITY(1,1) PRIMARY KEY,
+        symbol NVARCHAR(20) NULL,
+        name NVARCHAR(100) NULL,
+        symbol_key NVARCHAR(20) NOT NULL,
+        name_key NVARCHAR(100) NOT NULL,
+        first_seen DATETIME NOT NULL DEFAULT GETDATE(),
+        INDEX ux_coin_key UNIQUE (symbol_key, name_key) WITH (IGNORE_DUP_KEY = ON),
+        INDEX idx_coin_name_key (name_key)
+    );
+
+    PRINT 'Table Coin created successfully';
+END
+GO
+
+-- Monthly partitions on scraped_at: this month plus 3 ahead (SQL Server 2016 SP1 or later).
+-- The scraper splits further months ahead as time passes; retention truncates old ones.
+IF NOT EXISTS (SELECT * FROM sys.partition_functions WHERE name='pf_CryptoCurrency_scraped_at')
+BEGIN
+    DECLARE @boundary DATETIME = DATEADD(month, DATEDIFF(month, 0, GETDATE()), 0);
+    DECLARE @ahead INT = 0;
+    CREATE PARTITION FUNCTION pf_CryptoCurrency_scraped_at (DATETIME) AS RANGE RIGHT FOR VALUES (@boundary);
+    CREATE PARTITION SCHEME ps_CryptoCurrency_scraped_at AS PARTITION pf_CryptoCurrency_scraped_at ALL TO ([PRIMARY]);
+
+    WHILE @ahead < 3
+    BEGIN
+        SET @boundary = DATEADD(month, 1, @boundary);
+        ALTER PARTITION SCHEME ps_CryptoCurrency_scraped_at NEXT USED [PRIMARY];
+        ALTER PARTITION FUNCTION pf_CryptoCurrency_scraped_at() SPLIT RANGE (@boundary);
+        SET @ahead = @ahead + 1;
+    END
+
+    PRINT 'Partition function and scheme created successfully';
+END
+GO
+
 -- Create CryptoCurrency table
+-- (on servers without partitioning: drop the ON clause and make the primary key (id) only)
 IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='CryptoCurrency' AND xtype='U')
 BEGIN
     CREATE TABLE CryptoCurrency (
-        id INT IDENTITY(1,1) PRIMARY KEY,
+        id INT IDENTITY(1,1) NOT NULL,
+        snapshot_id INT,
         rank INT,
         name NVARCHAR(100),
-        price NVARCHAR(50),
-        one_hour_change NVARCHAR(20),
-        twenty_four_hour_change NVARCHAR(20),
-        seven_day_change NVARCHAR(20),
-        market_cap NVARCHAR(50),
-        volume_24h NVARCHAR(50),
-        circulating_supply NVARCHAR(100),
-        scraped_at DATETIME DEFAULT GETDATE(),
+        symbol NVARCHAR(20),
+        price DECIMAL(38,18),
+        one_hour_change DECIMAL(18,4),
+        twenty_four_hour_change DECIMAL(18,4),
+        seven_day_change DECIMAL(18,4),
+        market_cap DECIMAL(38,2),
+        volume_24h DECIMAL(38,2),
+        circulating_supply DECIMAL(38,4),
+        scraped_at DATETIME NOT NULL DEFAULT GETDATE(),
+        coin_id INT NULL,
+        CONSTRAINT PK_CryptoCurrency PRIMARY KEY NONCLUSTERED (id, scraped_at),
+        INDEX idx_snapshot_rank CLUSTERED (snapshot_id, rank),
+        INDEX idx_coin_snapshot (coin_id, snapshot_id) INCLUDE (scraped_at, price, market_cap, volume_24h),
         INDEX idx_name (name),
+        INDEX idx_symbol (symbol),
         INDEX idx_rank (rank),
-        INDEX idx_scraped_at (scraped_at)
-    );
+        INDEX idx_scraped_at (scraped_at),
+        INDEX idx_scraped_at_market_cap (scraped_at, market_cap DESC)
+    ) ON ps_CryptoCurrency_scraped_at (scraped_at);
     
     PRINT 'Table CryptoCurrency created successfully';
 END
@@ -52,6 +117,95 @@ END
 GO
 """
 
+CREATE_STATS_SQL = """
+-- Single-row statistics table, updated by the scraper on every insert/delete
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='CryptoStats' AND xtype='U')
+BEGIN
+    CREATE TABLE CryptoStats (
+        id INT PRIMARY KEY CHECK (id = 1),
+        total_records BIGINT NOT NULL,
+        unique_cryptos INT NOT NULL,
+        first_scrape DATETIME NULL,
+        last_scrape DATETIME NULL,
+        total_scrapes INT NOT NULL,
+        updated_at DATETIME NOT NULL DEFAULT GETDATE()
+    );
+
+    INSERT INTO CryptoStats (id, total_records, unique_cryptos, first_scrape, last_scrape, total_scrapes)
+    SELECT 1, COUNT_BIG(*), (SELECT COUNT(*) FROM Coin), MIN(scraped_at), MAX(scraped_at), COUNT(DISTINCT scraped_at)
+    FROM CryptoCurrency;
+
+    PRINT 'Table CryptoStats created successfully';
+END
+GO
+"""
+
+CREATE_ROLLUPS_SQL = """
+-- Per-coin hourly and daily rollups, folded in by the scraper when a snapshot finishes
+-- (python migrations.py backfills them from existing history)
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='CoinHourly' AND xtype='U')
+BEGIN
+    CREATE TABLE CoinHourly (
+        coin_id INT NOT NULL,
+        period_start DATETIME NOT NULL,
+        open_price DECIMAL(38,18) NULL,
+        close_price DECIMAL(38,18) NULL,
+        min_price DECIMAL(38,18) NULL,
+        max_price DECIMAL(38,18) NULL,
+        price_sum DECIMAL(38,18) NULL,
+        samples INT NOT NULL,
+        avg_price AS (price_sum / NULLIF(samples, 0)),
+        market_cap DECIMAL(38,2) NULL,
+        volume_24h DECIMAL(38,2) NULL,
+        first_scraped_at DATETIME NOT NULL,
+        last_scraped_at DATETIME NOT NULL,
+        CONSTRAINT PK_CoinHourly PRIMARY KEY (coin_id, period_start)
+    );
+
+    PRINT 'Table CoinHourly created successfully';
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='CoinDaily' AND xtype='U')
+BEGIN
+    CREATE TABLE CoinDaily (
+        coin_id INT NOT NULL,
+        period_start DATETIME NOT NULL,
+        open_price DECIMAL(38,18) NULL,
+        close_price DECIMAL(38,18) NULL,
+        min_price DECIMAL(38,18) NULL,
+        max_price DECIMAL(38,18) NULL,
+        price_sum DECIMAL(38,18) NULL,
+        samples INT NOT NULL,
+        avg_price AS (price_sum / NULLIF(samples, 0)),
+        market_cap DECIMAL(38,2) NULL,
+        volume_24h DECIMAL(38,2) NULL,
+        first_scraped_at DATETIME NOT NULL,
+        last_scraped_at DATETIME NOT NULL,
+        CONSTRAINT PK_CoinDaily PRIMARY KEY (coin_id, period_start)
+    );
+
+    PRINT 'Table CoinDaily created successfully';
+END
+GO
+
+-- Whole-market totals of every finished snapshot
+IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='SnapshotTotals' AND xtype='U')
+BEGIN
+    CREATE TABLE SnapshotTotals (
+        snapshot_id INT PRIMARY KEY,
+        scraped_at DATETIME NOT NULL,
+        coin_count INT NOT NULL,
+        total_market_cap DECIMAL(38,2) NULL,
+        total_volume_24h DECIMAL(38,2) NULL,
+        INDEX idx_snapshot_totals_scraped_at (scraped_at)
+    );
+
+    PRINT 'Table SnapshotTotals created successfully';
+END
+GO
+"""
+
 USEFUL_QUERIES = """
 -- ========================================
 -- USEFUL SQL QUERIES FOR DATA ANALYSIS
@@ -62,48 +216,105 @@ USEFUL_QUERIES = """
 SELECT * FROM CryptoCurrency
 ORDER BY scraped_at DESC,rank;
 
--- 2. Latest 10 records by date
+-- 2. Top 10 of the latest snapshot
+--    (full mode; in delta mode use query 8, which fills in unchanged coins)
 SELECT TOP 10
-    rank, name, price, one_hour_change, twenty_four_hour_change,
+    rank, name, symbol, price, one_hour_change, twenty_four_hour_change,
     seven_day_change, market_cap, volume_24h, scraped_at
 FROM CryptoCurrency
-ORDER BY scraped_at DESC , rank;
+WHERE snapshot_id = (SELECT TOP 1 id FROM Snapshot WHERE finished_at IS NOT NULL AND is_partial = 0 ORDER BY id DESC)
+ORDER BY rank;
 
--- 3. Count Records by Scrape Date
-SELECT CAST(scraped_at AS DATE) AS scrape_date,
-       COUNT(*) AS total_records
-FROM CryptoCurrency
-GROUP BY CAST(scraped_at AS DATE)
+-- 3. Count Records by Scrape Date (from the small Snapshot table)
+SELECT CAST(started_at AS DATE) AS scrape_date,
+       SUM(row_count) AS total_records,
+       COUNT(*) AS snapshots
+FROM Snapshot
+WHERE finished_at IS NOT NULL
+GROUP BY CAST(started_at AS DATE)
 ORDER BY scrape_date DESC;
 
 -- 4. Top 10 cryptocurrencies by market cap (latest scrape)
 SELECT TOP 10 
-    rank, name, price, one_hour_change, twenty_four_hour_change,
+    rank, name, symbol, price, one_hour_change, twenty_four_hour_change,
     seven_day_change, market_cap, volume_24h, scraped_at
 FROM CryptoCurrency
-WHERE scraped_at = (SELECT MAX(scraped_at) FROM CryptoCurrency)
-ORDER BY market_cap;
+WHERE snapshot_id = (SELECT TOP 1 id FROM Snapshot WHERE finished_at IS NOT NULL AND is_partial = 0 ORDER BY id DESC)
+ORDER BY market_cap DESC;
 
 --5. Search Specific Crypto Currency
+--   (resolve the coin in the small Coin table, then seek its rows on idx_coin_snapshot)
 
-SELECT * FROM CryptoCurrency
-WHERE name LIKE '%Bitcoin%'
-ORDER BY scraped_at DESC, rank;
+SELECT c.* FROM CryptoCurrency c
+JOIN Coin k ON k.id = c.coin_id
+WHERE k.name_key LIKE 'bitcoin%' OR k.symbol_key = 'BTC'
+ORDER BY c.scraped_at DESC, c.rank;
 
--- 6. DB stats
+-- 6. DB stats (maintained on every insert, no table scan)
 
-SELECT 
-    COUNT(*) AS total_records,
-    COUNT(DISTINCT name) as total_cryptos,
-    COUNT(DISTINCT CAST(scraped_at AS DATE)) as total_scraped_days,
-    MIN(scraped_at) AS first_scrape,
-    MAX(scraped_at) AS last_scrape
-FROM CryptoCurrency
+SELECT total_records, unique_cryptos, total_scrapes, first_scrape, last_scrape
+FROM CryptoStats
+WHERE id = 1;
+
+-- 7. Top 10 movers of the last day (daily rollup: open to latest close)
+
+SELECT TOP 10 k.name, k.symbol, d.open_price, d.close_price, d.min_price, d.max_price,
+       (d.close_price - d.open_price) * 100 / NULLIF(d.open_price, 0) AS change_percent
+FROM CoinDaily d
+JOIN Coin k ON k.id = d.coin_id
+WHERE d.period_start = (SELECT MAX(period_start) FROM CoinDaily)
+ORDER BY change_percent DESC;
+
+-- 8. Latest market in delta mode: newest stored row of every coin since the last keyframe
+
+WITH latest AS (SELECT TOP 1 id FROM Snapshot WHERE finished_at IS NOT NULL AND is_partial = 0 ORDER BY id DESC),
+versions AS (
+    SELECT c.*, ROW_NUMBER() OVER (PARTITION BY c.symbol, c.name ORDER BY c.snapshot_id DESC) AS row_version
+    FROM CryptoCurrency c
+    JOIN Snapshot s ON s.id = c.snapshot_id
+    WHERE s.finished_at IS NOT NULL
+      AND c.snapshot_id <= (SELECT id FROM latest)
+      AND c.snapshot_id >= (SELECT MAX(k.id) FROM Snapshot k
+                            WHERE k.is_keyframe = 1 AND k.finished_at IS NOT NULL)
+)
+SELECT TOP 10 rank, name, symbol, price, market_cap, volume_24h, scraped_at
+FROM versions
+WHERE row_version = 1
+ORDER BY rank;
+
+-- 9. Rows per partition (metadata only; old partitions are truncated by delete_old_data)
+
+SELECT p.partition_number, CAST(v.value AS DATETIME) AS starts_at, p.rows
+FROM sys.partitions p
+JOIN sys.indexes i ON i.object_id = p.object_id AND i.index_id = p.index_id
+JOIN sys.partition_schemes ps ON ps.data_space_id = i.data_space_id
+LEFT JOIN sys.partition_range_values v ON v.function_id = ps.function_id AND v.boundary_id = p.partition_number - 1
+WHERE p.object_id = OBJECT_ID('CryptoCurrency') AND p.index_id = 1
+ORDER BY p.partition_number;
+
+-- 10. Total market cap and volume over the last week (one row per snapshot)
+
+SELECT scraped_at, coin_count, total_market_cap, total_volume_24h
+FROM SnapshotTotals
+WHERE scraped_at >= DATEADD(day, -7, GETDATE())
+ORDER BY scraped_at;
+
+-- 11. Daily price range of a coin (a seek on the CoinDaily primary key)
+
+SELECT d.period_start AS day, d.open_price, d.max_price, d.min_price, d.close_price,
+       d.avg_price, d.market_cap, d.volume_24h, d.samples
+FROM CoinDaily d
+JOIN Coin k ON k.id = d.coin_id
+WHERE k.symbol_key = 'BTC'
+ORDER BY d.period_start DESC;
 
--- 7. Top 10 Coins by twenty_four_hour_change.
+-- 12. Hourly average price of a coin over the last day
 
-SELECT TOP 10 *  
-FROM CryptoCurrency ORDER BY  twenty_four_hour_change DESC;
+SELECT h.period_start AS hour, h.avg_price, h.min_price, h.max_price
+FROM CoinHourly h
+JOIN Coin k ON k.id = h.coin_id
+WHERE k.symbol_key = 'BTC' AND h.period_start >= DATEADD(day, -1, GETDATE())
+ORDER BY h.period_start;
 
 """
 
@@ -0,0 +1,24 @@
+"""
+Shared test setup: the modules live at the repository root, and page snapshots used
+as fixtures are committed under tests/fixtures.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT , 'tests' , 'fixtures')
+sys.path.insert(0 , ROOT)
+
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR , name) , encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture
+def fixture_html():
+    """ Read a committed page snapshot by file name."""
+    return read_fixture
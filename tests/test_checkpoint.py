@@ -0,0 +1,150 @@
+"""
+Resumable scrape checkpoints: resuming, expiry and completeness, on a temporary SQLite file.
+"""
+
+from datetime import datetime , timedelta
+
+import pytest
+
+from checkpoint import ScrapeCheckpoint
+
+
+def _rows(page: int , count: int = 2):
+    return [{'rank': str((page - 1) * count + i + 1), 'name': f'Coin{page}{i}'} for i in range(count)]
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    with ScrapeCheckpoint(str(tmp_path / 'checkpoint.sqlite') , max_age=3600) as checkpoint:
+        yield checkpoint
+
+
+def _reopen(checkpoint , max_age: float = 3600) -> ScrapeCheckpoint:
+    checkpoint.close()
+    return ScrapeCheckpoint(checkpoint.path , max_age=max_age)
+
+
+class FakeScraper:
+    """ Page iterator recording the skip_pages it was asked to honour."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.skip_pages = None
+
+    def __call__(self, max_pages , skip_pages=()):
+        self.skip_pages = set(skip_pages)
+        for page in range(1 , max_pages + 1):
+            if page in self.skip_pages:
+                continue
+            rows = self.pages.get(page , [])
+            yield page , rows
+            if not rows:
+                return
+
+
+def test_new_run(checkpoint):
+    started_at = datetime(2026 , 1 , 1 , 12)
+
+    assert checkpoint.begin(3 , started_at=started_at) == started_at
+    assert checkpoint.snapshot_id is None
+    assert checkpoint.scraped_pages() == {}
+    assert not checkpoint.is_complete()
+
+
+def test_resume_replays_unwritten_pages_and_scrapes_missing_ones(checkpoint):
+    started_at = checkpoint.begin(4)
+    checkpoint.record_page(1 , _rows(1))
+    checkpoint.record_page(2 , _rows(2))
+    checkpoint.record_progress(7 , [1] , 2)
+
+    checkpoint = _reopen(checkpoint)
+    assert checkpoint.begin(4) == started_at
+    assert (checkpoint.snapshot_id , checkpoint.rows_inserted , checkpoint.written_page_count()) == (7 , 2 , 1)
+
+    scraper = FakeScraper({3: _rows(3) , 4: _rows(4)})
+    pages = list(checkpoint.resume(scraper))
+
+    # page 2 was scraped but never committed, so it is replayed from the file
+    assert [page for page , rows in pages] == [2 , 3 , 4]
+    assert pages[0][1] == _rows(2)
+    assert scraper.skip_pages == {1 , 2}
+    assert checkpoint.is_complete()
+    checkpoint.close()
+
+
+def test_end_of_listing_completes_the_run(checkpoint):
+    checkpoint.begin(10)
+    checkpoint.record_page(1 , _rows(1))
+    assert not checkpoint.is_complete()
+
+    checkpoint.record_page(2 , [])
+    assert checkpoint.is_complete()
+    assert list(checkpoint.unwritten_pages()) == [(1 , _rows(1))]
+
+
+def test_written_pages_drop_their_rows(checkpoint):
+    checkpoint.begin(2)
+    checkpoint.record_page(1 , _rows(1))
+    checkpoint.record_progress(3 , [1] , 2)
+
+    assert list(checkpoint.unwritten_pages()) == []
+    assert checkpoint.scraped_pages() == {1: 2}
+
+
+def test_expired_run_hands_its_snapshot_to_close_snapshot(checkpoint):
+    old_start = datetime.now() - timedelta(hours=2)
+    checkpoint.begin(3 , started_at=old_start)
+    checkpoint.record_page(1 , _rows(1))
+    checkpoint.record_page(2 , _rows(2))
+    checkpoint.record_progress(42 , [1 , 2] , 4)
+
+    closed = []
+    checkpoint = _reopen(checkpoint , max_age=60)
+    started_at = checkpoint.begin(3 , close_snapshot=lambda *snapshot: closed.append(snapshot) or True)
+
+    assert started_at > old_start
+    assert closed == [(42 , 2 , 4)]
+    assert checkpoint.snapshot_id is None
+    assert checkpoint.scraped_pages() == {}
+    assert checkpoint.abandoned_snapshots() == []
+    checkpoint.close()
+
+
+def test_abandoned_snapshot_is_kept_until_it_is_closed(checkpoint):
+    checkpoint.begin(3 , started_at=datetime.now() - timedelta(hours=2))
+    checkpoint.record_page(1 , _rows(1))
+    checkpoint.record_progress(42 , [1] , 2)
+
+    checkpoint = _reopen(checkpoint , max_age=60)
+    checkpoint.begin(3 , close_snapshot=lambda *snapshot: False)
+    assert checkpoint.abandoned_snapshots() == [(42 , 1 , 2)]
+
+    # the next run retries, even though its own checkpoint is fresh
+    checkpoint = _reopen(checkpoint , max_age=60)
+    closed = []
+    checkpoint.begin(3 , close_snapshot=lambda *snapshot: closed.append(snapshot) or True)
+    assert closed == [(42 , 1 , 2)]
+    assert checkpoint.abandoned_snapshots() == []
+    checkpoint.close()
+
+
+def test_discard_keeps_the_open_snapshot(checkpoint):
+    checkpoint.begin(3)
+    checkpoint.record_page(1 , _rows(1))
+    checkpoint.record_progress(5 , [1] , 2)
+
+    checkpoint.discard()
+
+    assert checkpoint.abandoned_snapshots() == [(5 , 1 , 2)]
+    assert checkpoint.scraped_pages() == {}
+
+
+def test_run_without_snapshot_leaves_nothing_to_close(checkpoint):
+    checkpoint.begin(3 , started_at=datetime.now() - timedelta(hours=2))
+    checkpoint.record_page(1 , _rows(1))
+
+    checkpoint = _reopen(checkpoint , max_age=60)
+    closed = []
+    checkpoint.begin(3 , close_snapshot=lambda *snapshot: closed.append(snapshot) or True)
+    assert closed == []
+    checkpoint.close()
@@ -0,0 +1,55 @@
+"""
+Coin search index: substring matches on names, exact matches on symbols.
+"""
+
+import pytest
+
+# coin_index.py reads the Coin table through database.py, which needs the pyodbc module
+pytest.importorskip('pyodbc' , exc_type=ImportError)
+
+from coin_index import CoinIndex
+
+COINS = [
+    (1 , 'BTC' , 'Bitcoin'),
+    (2 , 'ETH' , 'Ethereum'),
+    (3 , 'BCH' , 'Bitcoin  Cash'),
+    (4 , 'USDT' , 'Tether USDt'),
+    (5 , 'WBTC' , 'Wrapped Bitcoin'),
+]
+
+
+@pytest.fixture
+def index():
+    index = CoinIndex()
+    index.add(COINS)
+    return index
+
+
+@pytest.mark.parametrize('text , expected' , [
+    ('bitcoin' , [1 , 3 , 5]),
+    ('coin' , [1 , 3 , 5]),
+    ('BITCOIN CASH' , [3]),
+    ('  bitcoin   cash ' , [3]),
+    ('ereum' , [2]),
+    ('usdt' , [4]),
+    ('dogecoin' , []),
+    ('' , []),
+])
+def test_name_substring(index , text , expected):
+    assert index.search(text) == expected
+
+
+def test_symbol_matches_exactly(index):
+    # 'btc' is in no name: only the exact ticker matches, not WBTC
+    assert index.search('btc') == [1]
+    assert index.by_symbol('wbtc') == [5]
+
+
+def test_add_is_incremental(index):
+    index.add([(6 , 'DOGE' , 'Dogecoin') , (1 , 'BTC' , 'Bitcoin')])
+
+    assert len(index) == 6
+    assert index.max_id == 6
+    assert index.search('coin') == [1 , 3 , 5 , 6]
+    # re-adding a known id does not index it twice
+    assert index.search('bitcoin') == [1 , 3 , 5]
@@ -0,0 +1,117 @@
+"""
+Delta persistence: which rows count as changed, the previous values they are compared
+with, and the snapshot writer loading those values once per snapshot.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# database.py needs the pyodbc driver module, though none of these tests connects
+pytest.importorskip('pyodbc' , exc_type=ImportError)
+
+import pipeline
+from database import changed_rows_mask , load_latest_values
+
+TOLERANCES = {'price': 0.001, 'market_cap': 0.001, 'volume_24h': 0.01}
+
+
+def _frame(rows) -> pd.DataFrame:
+    return pd.DataFrame.from_records(rows , columns=['symbol' , 'name' , 'price' , 'market_cap' , 'volume_24h'])
+
+
+def test_unchanged_rows_are_skipped():
+    latest = {('BTC' , 'Bitcoin'): (67000.0 , 1.3e12 , 3.5e10)}
+    frame = _frame([('BTC' , 'Bitcoin' , 67010.0 , 1.3001e12 , 3.52e10)])
+
+    assert changed_rows_mask(frame , latest , TOLERANCES).tolist() == [False]
+
+
+@pytest.mark.parametrize('row' , [
+    ('BTC' , 'Bitcoin' , 67100.0 , 1.3e12 , 3.5e10),     # price moved 0.15 %
+    ('BTC' , 'Bitcoin' , 67000.0 , 1.3e12 , 3.6e10),     # volume moved 2.9 %
+    ('BTC' , 'Bitcoin' , 67000.0 , None , 3.5e10),       # market cap disappeared
+    ('ETH' , 'Ethereum' , 3500.0 , 4.2e11 , 1.8e10),     # never stored
+])
+def test_changed_and_new_rows_are_stored(row):
+    latest = {('BTC' , 'Bitcoin'): (67000.0 , 1.3e12 , 3.5e10)}
+
+    assert changed_rows_mask(_frame([row]) , latest , TOLERANCES).tolist() == [True]
+
+
+def test_values_leaving_zero_and_appearing_count_as_changes():
+    latest = {('A' , 'Alpha'): (0.0 , None , 10.0) , ('B' , 'Beta'): (0.0 , 5.0 , 10.0)}
+    frame = _frame([
+        ('A' , 'Alpha' , 0.5 , 7.0 , 10.0),
+        ('B' , 'Beta' , 0.0 , 5.0 , 10.0),
+    ])
+
+    assert changed_rows_mask(frame , latest , TOLERANCES).tolist() == [True , False]
+
+
+def test_mask_on_empty_frame():
+    mask = changed_rows_mask(_frame([]) , {} , TOLERANCES)
+    assert isinstance(mask , np.ndarray) and mask.size == 0
+
+
+class FakeCursor:
+    """ Answers the snapshot lookup with `snapshot_id` and the row query with `rows`."""
+
+    def __init__(self, snapshot_id , rows):
+        self.results = [[(snapshot_id,)] , rows]
+        self.queries = []
+
+    def execute(self, query , *params):
+        self.queries.append((query , params))
+        self.result = self.results.pop(0)
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+def test_load_latest_values_reads_the_previous_finished_snapshot():
+    cursor = FakeCursor(41 , [('BTC' , 'Bitcoin' , 67000 , 1.3e12 , None)])
+
+    latest = load_latest_values(FakeConnection(cursor) , before_snapshot=42)
+
+    assert latest == {('BTC' , 'Bitcoin'): (67000.0 , 1.3e12 , None)}
+    assert cursor.queries[0][1] == (42 ,)
+    # the snapshot is rebuilt from its keyframe: its id fills both placeholders
+    assert cursor.queries[1][1] == (41 , 41)
+
+
+def test_load_latest_values_without_a_finished_snapshot():
+    assert load_latest_values(FakeConnection(FakeCursor(None , [])) , before_snapshot=1) == {}
+
+
+def test_writer_loads_latest_values_once_per_snapshot(monkeypatch):
+    loads = []
+    monkeypatch.setattr(pipeline , 'PERSISTENCE_MODE' , 'delta')
+    monkeypatch.setattr(pipeline , 'start_snapshot' , lambda connection , started_at , partial: 7)
+    monkeypatch.setattr(pipeline , 'load_latest_values' ,
+                        lambda connection , before_snapshot: loads.append(before_snapshot) or {})
+    monkeypatch.setattr(pipeline , 'insert_crypto_data' ,
+                        lambda connection , batch , snapshot_id , latest_values: len(batch))
+
+    writer = pipeline.SnapshotWriter()
+    latest_values = {}
+    # a first run against an empty table: nothing to load, and nothing to load again
+    for page in (1 , 2 , 3):
+        writer._flush(None , [{'rank': str(page)}] , [page] , latest_values)
+
+    assert loads == [7]
+    assert writer.rows_inserted == 3
@@ -0,0 +1,142 @@
+"""
+HTTP scraper: the embedded JSON listing parser on saved pages, and paging against a
+local server that serves those pages, so no test reaches CoinMarketCap.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler , ThreadingHTTPServer
+from urllib.parse import urlparse , parse_qs
+
+import pytest
+
+import http_scraper
+from conftest import read_fixture
+
+# Listing page -> saved page; pages past the listing answer with next_data_end.html
+LISTING_PAGES = {1: 'next_data_page_1.html', 2: 'next_data_page_2.html'}
+
+
+@pytest.fixture
+def fixture_server():
+    """
+        Serve saved pages on localhost as ?page=N.
+
+        Yields a function taking a {page: fixture name} mapping (default LISTING_PAGES)
+        and returning (base_url, requested pages).
+    """
+    servers = []
+
+    def serve(pages=None):
+        pages = LISTING_PAGES if pages is None else pages
+        requested = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                page = int(parse_qs(urlparse(self.path).query)['page'][0])
+                requested.append(page)
+                body = read_fixture(pages.get(page , 'next_data_end.html')).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type' , 'text/html; charset=utf-8')
+                self.send_header('Content-Length' , str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1' , 0) , Handler)
+        threading.Thread(target=server.serve_forever , daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/" , requested
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class StubPool:
+    """ Stand-in for ChromeDriverPool: every fallback page yields one marker row."""
+
+    def __init__(self):
+        self.pages = []
+        self.closed = False
+
+    def iter_pages(self, pages , failures):
+        for page in pages:
+            self.pages.append(page)
+            yield page , [{'rank': str(page * 100), 'name': f'Fallback{page}'}]
+
+    def close(self):
+        self.closed = True
+
+
+def test_parse_listing_html_reads_json_string_state(fixture_html):
+    rows = http_scraper.parse_listing_html(fixture_html('next_data_page_1.html'))
+
+    assert [row['rank'] for row in rows] == ['1' , '2' , '3']
+    bitcoin = rows[0]
+    assert bitcoin['name'] == 'BitcoinBTC'
+    assert bitcoin['price'] == '$67,123.45'
+    assert bitcoin['24h_change'] == '-1.20%'
+    assert bitcoin['market_cap'] == '$1,323,456,789,012'
+    assert bitcoin['circulating_supply'] == '19,712,345 BTC'
+    shiba = rows[2]
+    assert shiba['price'] == '$0.00002346'
+    assert shiba['7d_change'] == ''
+
+
+def test_parse_listing_html_reads_keys_arr_listing(fixture_html):
+    rows = http_scraper.parse_listing_html(fixture_html('next_data_page_2.html'))
+
+    assert [(row['rank'] , row['name'] , row['price']) for row in rows] == [
+        ('101' , 'ArweaveAR' , '$25.12'),
+        ('102' , 'HeliumHNT' , '$4.50'),
+    ]
+
+
+def test_parse_listing_html_end_of_listing_and_missing_json(fixture_html):
+    assert http_scraper.parse_listing_html(fixture_html('next_data_end.html')) == []
+    assert http_scraper.parse_listing_html(fixture_html('no_next_data.html')) is None
+
+
+def test_http_pages_in_order_until_end_of_listing(fixture_server):
+    base_url , requested = fixture_server()
+
+    pages = list(http_scraper.iter_coinmarketcap_http(5 , base_url , fallback=False))
+
+    assert [(page , len(rows)) for page , rows in pages] == [(1 , 3) , (2 , 2) , (3 , 0)]
+    assert requested == [1 , 2 , 3]
+    assert http_scraper.last_scrape_report['failed_pages'] == {}
+
+
+def test_http_skips_checkpointed_pages(fixture_server):
+    base_url , requested = fixture_server()
+
+    pages = list(http_scraper.iter_coinmarketcap_http(5 , base_url , fallback=False , skip_pages={1}))
+
+    assert [page for page , rows in pages] == [2 , 3]
+    assert requested == [2 , 3]
+
+
+def test_http_fallback_pages_keep_page_order(fixture_server):
+    base_url , requested = fixture_server({1: 'next_data_page_1.html', 2: 'no_next_data.html',
+                                           3: 'next_data_page_2.html'})
+    pool = StubPool()
+
+    pages = list(http_scraper.iter_coinmarketcap_http(5 , base_url , pool=pool))
+
+    assert [(page , len(rows)) for page , rows in pages] == [(1 , 3) , (2 , 1) , (3 , 2) , (4 , 0)]
+    assert pages[1][1][0]['name'] == 'Fallback2'
+    assert pool.pages == [2]
+    # a pool passed in by the caller is left open
+    assert not pool.closed
+
+
+def test_http_without_fallback_reports_failed_pages(fixture_server):
+    base_url , requested = fixture_server({1: 'no_next_data.html', 2: 'next_data_page_2.html'})
+
+    pages = list(http_scraper.iter_coinmarketcap_http(5 , base_url , fallback=False))
+
+    assert [page for page , rows in pages] == [2 , 3]
+    assert 1 in http_scraper.last_scrape_report['failed_pages']
@@ -0,0 +1,107 @@
+"""
+Normalization of the display strings the parsers produce into typed columns.
+"""
+
+import math
+
+import pytest
+
+from normalize import normalize_crypto_data , to_db_rows , coin_keys , NORMALIZED_COLUMNS
+
+
+def _row(**fields) -> dict:
+    row = {'rank': '1', 'name': 'BitcoinBTC', 'price': '$67,123.45', '1h_change': '0.46%',
+           '24h_change': '-1.20%', '7d_change': '5.00%', 'market_cap': '$1.32T$1,323,456,789,012',
+           '24h_volume': '$35,123,456,790523,327 BTC', 'circulating_supply': '19,712,345 BTC'}
+    row.update(fields)
+    return row
+
+
+def _normalize_one(**fields) -> dict:
+    return normalize_crypto_data([_row(**fields)]).iloc[0].to_dict()
+
+
+def test_table_row():
+    row = _normalize_one()
+
+    assert row['rank'] == 1
+    assert (row['name'] , row['symbol']) == ('Bitcoin' , 'BTC')
+    assert row['price'] == 67123.45
+    assert (row['one_hour_change'] , row['twenty_four_hour_change'] , row['seven_day_change']) == (0.46 , -1.2 , 5.0)
+    # the market cap cell runs the abbreviated and the full amount together
+    assert row['market_cap'] == 1323456789012
+    # the volume cell runs the dollar volume and the coin volume together
+    assert row['volume_24h'] == 35123456790
+    assert row['circulating_supply'] == 19712345
+
+
+@pytest.mark.parametrize('price , expected' , [
+    ('$0.0₅123' , 0.00000123),
+    ('$0.0₁₂4567' , 0.0000000000004567),
+    ('$0.00002346' , 0.00002346),
+    ('$1.00' , 1.0),
+])
+def test_subscript_zero_prices(price , expected):
+    assert math.isclose(_normalize_one(price=price)['price'] , expected)
+
+
+@pytest.mark.parametrize('market_cap , expected' , [
+    ('$1.32T' , 1.32e12),
+    ('$422.23B' , 422.23e9),
+    ('$13.5M' , 13.5e6),
+    ('$950.1K' , 950.1e3),
+    ('$1,644,391,234' , 1644391234),
+])
+def test_abbreviated_amounts(market_cap , expected):
+    assert math.isclose(_normalize_one(market_cap=market_cap)['market_cap'] , expected)
+
+
+def test_abbreviated_supply_keeps_ticker():
+    row = _normalize_one(name='XRPXRP' , circulating_supply='53.7B XRP' , **{'24h_volume': '$1,234,567,8902.3B XRP'})
+
+    assert (row['name'] , row['symbol']) == ('XRP' , 'XRP')
+    assert math.isclose(row['circulating_supply'] , 53.7e9)
+
+
+def test_one_letter_ticker_is_not_a_suffix():
+    row = _normalize_one(name='Coin BB' , circulating_supply='1,000 B')
+
+    assert (row['name'] , row['symbol']) == ('Coin B' , 'B')
+    assert row['circulating_supply'] == 1000
+
+
+@pytest.mark.parametrize('name , supply , expected' , [
+    ('Tether\xa0USDtUSDT' , '110,412,345,678 USDT' , ('Tether USDt' , 'USDT')),
+    # a coin named after its ticker keeps its name
+    ('BNBBNB' , '145,887,575 BNB' , ('BNB' , 'BNB')),
+    ('BNB' , '145,887,575 BNB' , ('BNB' , 'BNB')),
+])
+def test_name_symbol_split(name , supply , expected):
+    row = _normalize_one(name=name , circulating_supply=supply)
+    assert (' '.join(row['name'].split()) , row['symbol']) == expected
+
+
+def test_symbol_falls_back_to_volume_cell():
+    row = _normalize_one(name='ShibaSHIB' , circulating_supply='' , **{'24h_volume': '$512,345,67821.84T SHIB'})
+
+    assert (row['name'] , row['symbol']) == ('Shiba' , 'SHIB')
+    assert math.isnan(row['circulating_supply'])
+
+
+def test_unparseable_values_become_null():
+    frame = normalize_crypto_data([_row(price='--' , **{'7d_change': ''})])
+
+    assert list(frame.columns) == NORMALIZED_COLUMNS
+    rows = to_db_rows(frame)
+    assert rows[0][NORMALIZED_COLUMNS.index('price')] is None
+    assert rows[0][NORMALIZED_COLUMNS.index('seven_day_change')] is None
+
+
+def test_empty_input():
+    frame = normalize_crypto_data([])
+    assert frame.empty and list(frame.columns) == NORMALIZED_COLUMNS
+
+
+def test_coin_keys_are_normalized():
+    frame = normalize_crypto_data([_row(name='Bitcoin  CashBCH' , circulating_supply='19,700,000 BCH')])
+    assert coin_keys(frame) == [('BCH' , 'bitcoin cash')]
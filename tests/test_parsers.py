@@ -0,0 +1,110 @@
+"""
+Parser parity: every backend must turn the same saved CoinMarketCap page into exactly
+the rows of the bs4 reference parser.
+"""
+
+import pytest
+
+import http_scraper
+import parsers
+from normalize import normalize_crypto_data
+
+# Rows of tests/fixtures/cmc_table.html (placeholder rows below the fold are skipped);
+# changes marked by a caret-down icon are negative
+EXPECTED_ROWS = [
+    {'rank': '1', 'name': 'BitcoinBTC', 'price': '$67,123.45', '1h_change': '0.46%', '24h_change': '-1.20%',
+     '7d_change': '5.00%', 'market_cap': '$1.32T$1,323,456,789,012', '24h_volume': '$35,123,456,790523,327 BTC',
+     'circulating_supply': '19,712,345 BTC'},
+    {'rank': '2', 'name': 'EthereumETH', 'price': '$3,512.87', '1h_change': '-0.12%', '24h_change': '2.50%',
+     '7d_change': '-7.89%', 'market_cap': '$422.23B$422,227,412,346', '24h_volume': '$18,234,567,8905,190,813 ETH',
+     'circulating_supply': '120,194,851 ETH'},
+    {'rank': '3', 'name': 'Tether\xa0USDtUSDT', 'price': '$1.00', '1h_change': '0.01%', '24h_change': '-0.02%',
+     '7d_change': '0.03%', 'market_cap': '$110.45B$110,453,123,456', '24h_volume': '$54,321,987,65454,310,123,456 USDT',
+     'circulating_supply': '110,412,345,678 USDT'},
+    {'rank': '4', 'name': 'Shiba InuSHIB', 'price': '$0.00002346', '1h_change': '0.00%', '24h_change': '12.35%',
+     '7d_change': '', 'market_cap': '$13.82B$13,822,345,678', '24h_volume': '$512,345,67821.84T SHIB',
+     'circulating_supply': '589,264,883,090,567 SHIB'},
+]
+
+
+class DomDriver:
+    """
+        Stand-in for a Selenium driver with the page loaded: execute_script answers
+        TABLE_CELLS_SCRIPT with [textContent, has caret-down] of every cell, as the browser would.
+    """
+
+    def __init__(self, page_source: str):
+        lxml_html = pytest.importorskip('lxml.html')
+        self.document = lxml_html.fromstring(page_source)
+
+    def execute_script(self, script: str):
+        assert script == parsers.TABLE_CELLS_SCRIPT
+        # document.querySelector('table.cmc-table')
+        tables = self.document.xpath(parsers.CMC_TABLE_XPATH)
+        if not tables:
+            return None
+        return [[[''.join(cell.itertext()) , self._has_caret_down(cell)] for cell in row.iter('td')]
+                for row in tables[0].iter('tr')]
+
+    @staticmethod
+    def _has_caret_down(cell) -> bool:
+        # cell.querySelector('[class*="caret-down" i]')
+        return any('caret-down' in element.get('class' , '').lower() for element in cell.iterdescendants())
+
+
+def test_bs4_parses_fixture(fixture_html):
+    assert parsers.parse_crypto_data_bs4(fixture_html('cmc_table.html')) == EXPECTED_ROWS
+
+
+def test_lxml_matches_bs4(fixture_html):
+    if 'lxml' not in parsers.available_backends():
+        pytest.skip('lxml is not installed')
+    page_source = fixture_html('cmc_table.html')
+    assert parsers.parse_crypto_data_lxml(page_source) == parsers.parse_crypto_data_bs4(page_source)
+
+
+def test_js_matches_bs4(fixture_html):
+    page_source = fixture_html('cmc_table.html')
+    assert parsers.parse_crypto_data_js(DomDriver(page_source)) == parsers.parse_crypto_data_bs4(page_source)
+
+
+@pytest.mark.parametrize('backend' , ['bs4' , 'lxml' , 'js'])
+def test_falling_changes_match_http_backend(fixture_html , backend):
+    # the same coins scraped through the embedded JSON carry signed changes
+    page_source = fixture_html('cmc_table.html')
+    if backend == 'js':
+        rows = parsers.parse_crypto_data_js(DomDriver(page_source))
+    elif backend in parsers.available_backends():
+        rows = parsers.PAGE_SOURCE_PARSERS[backend](page_source)
+    else:
+        pytest.skip(f'{backend} is not installed')
+    http_rows = http_scraper.parse_listing_html(fixture_html('next_data_page_1.html'))
+
+    changes = ['one_hour_change' , 'twenty_four_hour_change' , 'seven_day_change']
+    table = normalize_crypto_data(rows).set_index('symbol')[changes]
+    embedded = normalize_crypto_data(http_rows).set_index('symbol')[changes]
+    assert table.loc['ETH'].tolist() == [-0.12 , 2.5 , -7.89]
+    assert table.loc[['BTC' , 'ETH']].equals(embedded.loc[['BTC' , 'ETH']])
+
+
+@pytest.mark.parametrize('backend' , ['bs4' , 'lxml' , 'js'])
+def test_parse_page_source_backends_agree(fixture_html , backend):
+    # 'js' needs a driver, so page sources fall back to bs4
+    assert parsers.parse_page_source(fixture_html('cmc_table.html') , backend) == EXPECTED_ROWS
+
+
+def test_compare_parser_backends(fixture_html):
+    parity = parsers.compare_parser_backends(fixture_html('cmc_table.html'))
+    assert parity and all(parity.values())
+
+
+NO_TABLE_PAGE = '<html><head><title>Just a moment...</title></head><body><p>Checking your browser</p></body></html>'
+
+
+@pytest.mark.parametrize('parse' , [parsers.parse_crypto_data_bs4 , parsers.parse_page_source])
+def test_page_without_table(parse):
+    assert parse(NO_TABLE_PAGE) == []
+
+
+def test_js_page_without_table():
+    assert parsers.parse_crypto_data_js(DomDriver(NO_TABLE_PAGE)) == []
@@ -2,27 +2,72 @@
 Utility Functions for Data Analysis and Export
 """
 
+import gzip
 import pandas as pd
 import logging 
-from typing import List , Dict ,Optional
+from datetime import datetime , timedelta
+from typing import List , Dict ,Optional , Iterator , Union
 from tabulate import tabulate
-from database import get_sql_connection , TABLE_NAME
+from database import (
+    get_sql_connection,
+    TABLE_NAME,
+    LATEST_SNAPSHOT_ROWS_SQL,
+    snapshot_rows_query,
+    MAX_STATEMENT_PARAMETERS,
+    SNAPSHOT_TABLE,
+    SNAPSHOT_TOTALS_TABLE,
+    HOURLY_ROLLUP_TABLE,
+    DAILY_ROLLUP_TABLE
+)
+from config import EXPORT_CHUNK_SIZE
+import analytics_cache
+import market_cache
+from coin_index import get_coin_index
+from normalize import normalize_name , normalize_symbol
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, only the Parquet export needs it
+    pa = None
 
 
 logger = logging.getLogger(__name__)
 
-def query_to_dataframe(query: str) -> pd.DataFrame:
+# Columns of every export, in order
+EXPORT_COLUMNS_SQL = """
+    rank, name, symbol, price, one_hour_change as '1h_change',
+    twenty_four_hour_change as '24h_change', seven_day_change as '7d_change',
+    market_cap, volume_24h, circulating_supply, scraped_at
+"""
+EXPORT_FLOAT_COLUMNS = ['price', '1h_change', '24h_change', '7d_change', 'market_cap', 'volume_24h', 'circulating_supply']
+
+# Column names of the lookup frames (as aliased in EXPORT_COLUMNS_SQL), in market_cache.MARKET_COLUMNS order
+LOOKUP_COLUMNS = ['rank', 'name', 'symbol', 'price', '1h_change', '24h_change', '7d_change',
+                  'market_cap', 'volume_24h', 'circulating_supply', 'scraped_at']
+
+# Excel sheets hold 1,048,576 rows including the header
+EXCEL_MAX_ROWS = 1048575
+
+# Price history buckets are aligned to this instant (bucket = origin + n * interval)
+PRICE_HISTORY_ORIGIN = datetime(2000, 1, 1)
+PRICE_HISTORY_COLUMNS = ['open', 'high', 'low', 'close', 'market_cap', 'volume_24h']
+# interval in seconds -> rollup table already holding those buckets
+PRICE_HISTORY_ROLLUPS = {3600: HOURLY_ROLLUP_TABLE, 86400: DAILY_ROLLUP_TABLE}
+
+def query_to_dataframe(query: str , params: Optional[list] = None) -> pd.DataFrame:
     """
         Execute SQL queries and return results as a Dataframe.
         Args: 
             query: SQL query strings.
+            params: values bound to the query's '?' placeholders
         Returns:
             pandas Dataframe with query results
     """
 
     try:
         with get_sql_connection() as connection:
-            df = pd.read_sql(query , connection)
+            df = pd.read_sql(query , connection , params=params)
             logger.info(f"Query Executed Successfully. Returned {len(df)} rows.")
             return df
     except Exception as e:
@@ -30,126 +75,533 @@ def query_to_dataframe(query: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def _market_frame(rows: List[tuple]) -> pd.DataFrame:
+    """ Rows of the in-memory latest market as a lookup frame."""
+    return pd.DataFrame.from_records(rows , columns=LOOKUP_COLUMNS)
+
+
 def get_latest_crypto_dataframe(limit : int = 5) -> pd.DataFrame:
     """
         Get Latest cryptocurrency data as a Dataframe.
 
+        Served from the in-memory latest market, or the local analytics cache,
+        when they are available.
+
         Args:
             limit : Number of records to retrieve
         
         Returns:
-            pandas dataframe with latest crypto data
+            pandas dataframe with the latest snapshot, in rank order
     """
 
+    market = market_cache.get_latest_market()
+    if market is not None:
+        return _market_frame(market.top(limit))
+
+    cached = analytics_cache.latest_market(limit)
+    if cached is not None:
+        return cached
+
     query = f"""
-    SELECT TOP({limit})
-        rank, name, price, one_hour_change as '1h_change',
+    SELECT TOP({int(limit)})
+        rank, name, symbol, price, one_hour_change as '1h_change',
         twenty_four_hour_change as '24h_change', seven_day_change as '7d_change',
         market_cap, volume_24h, circulating_supply, scraped_at
-    FROM {TABLE_NAME}
-    ORDER BY scraped_at DESC , rank
+    FROM ({LATEST_SNAPSHOT_ROWS_SQL}) AS snapshot
+    ORDER BY rank
     """
     return query_to_dataframe(query)
 
-def export_to_csv(filename: str='crypto_data.csv' , limit : Optional[int] = None) -> bool:
+
+def get_snapshot_dataframe(snapshot_id: int) -> pd.DataFrame:
+    """
+        Get the full coin list of one snapshot as a Dataframe.
+
+        Delta snapshots only store changed coins; the unchanged ones are filled in
+        from earlier snapshots back to the last keyframe.
+
+        Args:
+            snapshot_id : Snapshot to read (see the Snapshot table)
+
+        Returns:
+            pandas dataframe with every coin of the snapshot, in rank order
     """
-    Export cryptocurrency data to CSV file.
+
+    query = f"""
+    SELECT
+        rank, name, symbol, price, one_hour_change as '1h_change',
+        twenty_four_hour_change as '24h_change', seven_day_change as '7d_change',
+        market_cap, volume_24h, circulating_supply, scraped_at
+    FROM ({snapshot_rows_query()}) AS snapshot
+    ORDER BY rank
+    """
+    return query_to_dataframe(query , params=[snapshot_id , snapshot_id])
+
+def export_query(limit: Optional[int] = None , history: bool = False) -> str:
+    """
+        SQL behind the exports.
+
+        Args:
+            limit: Number of records to export (None for all)
+            history: export every stored row (in clustered index order) instead of
+                     the latest snapshot; in delta mode that is every stored change
+    """
+    top = f"TOP({int(limit)})" if limit else ""
+    if history:
+        return f"SELECT {top} {EXPORT_COLUMNS_SQL} FROM {TABLE_NAME} ORDER BY snapshot_id, rank"
+    return f"SELECT {top} {EXPORT_COLUMNS_SQL} FROM ({LATEST_SNAPSHOT_ROWS_SQL}) AS snapshot ORDER BY rank"
+
+
+def _typed_frame(rows: List , columns: List[str]) -> pd.DataFrame:
+    """ Build a chunk with fixed dtypes, so every chunk of an export has the same schema."""
+    df = pd.DataFrame.from_records([tuple(row) for row in rows] , columns=columns)
+    if 'rank' in df:
+        df['rank'] = pd.to_numeric(df['rank']).astype('Int64')
+    for column in EXPORT_FLOAT_COLUMNS:
+        if column in df:
+            # pyodbc returns DECIMAL columns as Decimal objects
+            df[column] = pd.to_numeric(df[column] , errors='coerce').astype('float64')
+    if 'scraped_at' in df:
+        df['scraped_at'] = pd.to_datetime(df['scraped_at'])
+    return df
+
+
+def iter_query_chunks(query: str , params: Optional[list] = None , chunksize: int = EXPORT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+        Stream a query's results as DataFrames of at most `chunksize` rows.
+
+        Rows are pulled from the cursor with fetchmany, so memory stays flat no matter
+        how many rows the query returns. The connection is held until the iterator
+        is exhausted or closed.
+
+        Args:
+            query: SQL query strings.
+            params: values bound to the query's '?' placeholders
+            chunksize: rows per DataFrame
+    """
+    with get_sql_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query , *(params or []))
+            columns = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield _typed_frame(rows , columns)
+        finally:
+            cursor.close()
+
+
+def _write_csv_chunks(chunks: Iterator[pd.DataFrame] , filename: str) -> int:
+    """ Append chunks to a CSV file, gzip-compressed when the name ends with .gz."""
+    opener = gzip.open if filename.endswith('.gz') else open
+    rows = 0
+    with opener(filename , 'wt' , newline='' , encoding='utf-8') as f:
+        for df in chunks:
+            df.to_csv(f , index=False , header=rows == 0)
+            rows += len(df)
+    return rows
+
+
+def _write_parquet_chunks(chunks: Iterator[pd.DataFrame] , filename: str) -> int:
+    """ Write every chunk as a row group of one Parquet file."""
+    if pa is None:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow)")
+    writer = None
+    rows = 0
+    try:
+        for df in chunks:
+            table = pa.Table.from_pandas(df , preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(filename , table.schema)
+            writer.write_table(table)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def export_data(filename: str , limit: Optional[int] = None , history: bool = False ,
+                chunksize: int = EXPORT_CHUNK_SIZE) -> int:
+    """
+        Stream cryptocurrency data into a file, chunk by chunk.
+
+        The format follows the extension: .csv, .csv.gz (gzip CSV) or .parquet.
+
+        Args:
+            filename: Output filename
+            limit: Number of records to export (None for all)
+            history: export the whole stored history instead of the latest snapshot
+            chunksize: rows read from the database and written per chunk
+        Returns:
+            Number of rows exported.
+    """
+    chunks = iter_query_chunks(export_query(limit , history) , chunksize=chunksize)
+    if filename.endswith('.parquet'):
+        rows = _write_parquet_chunks(chunks , filename)
+    elif filename.endswith(('.csv' , '.csv.gz' , '.gz')):
+        rows = _write_csv_chunks(chunks , filename)
+    else:
+        raise ValueError(f"Unsupported export format for '{filename}'. Use .csv, .csv.gz or .parquet")
+    logger.info(f"Exported {rows} rows to {filename}.")
+    return rows
+
+
+def export_to_csv(filename: str='crypto_data.csv' , limit : Optional[int] = None , history: bool = False) -> bool:
+    """
+    Export cryptocurrency data to CSV file (gzip-compressed for .csv.gz names).
     
     Args:
         filename: Output CSV filename
         limit: Number of records to export (None for all)
+        history: export the whole stored history instead of the latest snapshot
         
     Returns:
         True if successful, False otherwise
     """
 
     try:
-        df = get_latest_crypto_dataframe(limit if limit else 10000)
-        if not df.empty:
-            df.to_csv(filename, index=False)
-            logger.info(f"Data Export to {filename}.")
-            print(f"Exported {len(df)} records to {filename}.")
+        rows = export_data(filename , limit , history)
+        if rows:
+            print(f"Exported {rows} records to {filename}.")
             return True
         else:
             logger.warning("No Data to export.")
             return False
     except Exception as e:
         logger.warning(f"Error Exporting Data {e}.")
+        return False
+
+
+def export_to_parquet(filename: str = 'crypto_data.parquet' , limit: Optional[int] = None , history: bool = False) -> bool:
+    """
+    Export cryptocurrency data to a Parquet file with typed columns (needs pyarrow).
+    
+    Args:
+        filename: Output Parquet filename
+        limit: Number of records to export (None for all)
+        history: export the whole stored history instead of the latest snapshot
+        
+    Returns:
+        True if successful, False otherwise
+    """
+
+    try:
+        rows = export_data(filename , limit , history)
+        if rows:
+            return True
+        logger.warning("No Data to export.")
+        return False
+    except Exception as e:
+        logger.warning(f"Error Exporting Data {e}.")
+        return False
 
 
-def export_to_excel(filename: str = 'crypto_data.xlsx' , limit: Optional[int] = None) -> bool:
+def export_to_excel(filename: str = 'crypto_data.xlsx' , limit: Optional[int] = None , history: bool = False) -> bool:
     """
     Export cryptocurrency data to Excel file.
+
+    Rows are streamed into a write-only workbook, so memory stays flat. A sheet
+    holds at most 1,048,575 rows; larger exports are truncated (use CSV or Parquet).
     
     Args:
         filename: Output Excel filename
         limit: Number of records to export (None for all)
+        history: export the whole stored history instead of the latest snapshot
         
     Returns:
         True if successful, False otherwise
     """
 
     try:
-        df = get_latest_crypto_dataframe(limit if limit else 10000)
-        if not df.empty:
-            df.to_excel(filename , index=False ,engine='openpyxl')
-            logger.info(f"Data Exported to {filename}")
-            return True
-        else:
+        from openpyxl import Workbook
+
+        limit = min(limit , EXCEL_MAX_ROWS) if limit else EXCEL_MAX_ROWS
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        rows = 0
+        for df in iter_query_chunks(export_query(limit , history)):
+            if rows == 0:
+                sheet.append(list(df.columns))
+            for record in df.astype(object).where(df.notna() , None).itertuples(index=False , name=None):
+                sheet.append(list(record))
+            rows += len(df)
+
+        if not rows:
             logger.warning(f"No Data to Export.")
             return False
+        if rows == EXCEL_MAX_ROWS:
+            logger.warning(f"Excel export stopped at {EXCEL_MAX_ROWS} rows (sheet limit).")
+        workbook.save(filename)
+        logger.info(f"Data Exported to {filename}")
+        return True
     except Exception as e:
         logger.warning(f"Error Exporting data {e}.")
         return False
 
 
 
+def _escape_like(text: str) -> str:
+    """ Make LIKE wildcards in user input match literally."""
+    return text.replace('[' , '[[]').replace('%' , '[%]').replace('_' , '[_]')
+
+
 def search_crypto(name:str)-> pd.DataFrame:
     """
         Function to Fetch Crypto Coin by its Name.
 
+        Served from the local analytics cache when it is available. Otherwise the
+        in-memory coin index resolves the coins whose name contains `name` (or whose
+        symbol equals it) and their rows are read with an index seek on coin_id.
+
         Args:
-            name: Name of Coin
+            name: Name (or part of it) or symbol of Coin
         Returns:
             Dataframe with searched Results. 
     """
 
-    query= f"""
-    SELECT
-        rank, name, price, one_hour_change as '1h_change',
-        twenty_four_hour_change as '24h_change', seven_day_change as '7d_change',
-        market_cap, volume_24h, circulating_supply, scraped_at
-    FROM {TABLE_NAME}
-    WHERE name LIKE '%{name}%'
-    ORDER BY scraped_at , rank;
-    """
+    cached = analytics_cache.search(name)
+    if cached is not None:
+        return cached
 
-    return query_to_dataframe(query)
+    index = get_coin_index()
+    if index is None or not len(index):
+        # no coin dimension yet: parameterized scan of the names
+        query = f"""
+        SELECT {EXPORT_COLUMNS_SQL}
+        FROM {TABLE_NAME}
+        WHERE name LIKE ?
+        ORDER BY scraped_at , rank;
+        """
+        return query_to_dataframe(query , params=[f"%{_escape_like(name)}%"])
 
-def get_crypto_by_rank(rank: int) -> pd.DataFrame:
+    coin_ids = index.search(name)
+    if not coin_ids:
+        logger.info(f"No coin matches '{name}'.")
+        return pd.DataFrame()
+
+    # stay under SQL Server's parameter limit per statement
+    batch_size = MAX_STATEMENT_PARAMETERS - 100
+    frames = []
+    for start in range(0 , len(coin_ids) , batch_size):
+        batch = coin_ids[start:start + batch_size]
+        query = f"""
+        SELECT {EXPORT_COLUMNS_SQL}
+        FROM {TABLE_NAME}
+        WHERE coin_id IN ({', '.join('?' * len(batch))})
+        ORDER BY scraped_at , rank;
+        """
+        frames.append(query_to_dataframe(query , params=batch))
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames , ignore_index=True).sort_values(['scraped_at' , 'rank'] , ignore_index=True)
+
+def get_crypto_by_rank(rank: int , history: bool = False) -> pd.DataFrame:
     """
         Function to get crypto currency by rank
         
         args:
             rank : rank of crypto currency to be fetched.
+            history : every stored row that held the rank instead of the current holder
         Retruns:
             Dataframe containing fetched result.
         
     """
     if not isinstance(rank , int) or rank <=0:
         raise ValueError("Rank Must be a positive Integer greater than 0")
+
+    if not history:
+        market = market_cache.get_latest_market()
+        if market is not None:
+            row = market.by_rank(rank)
+            return _market_frame([row] if row else [])
+        query = f"""
+        SELECT
+            rank, name, symbol, price, one_hour_change as '1h_change',
+            twenty_four_hour_change as '24h_change', seven_day_change as '7d_change',
+            market_cap, volume_24h, circulating_supply, scraped_at
+        FROM ({LATEST_SNAPSHOT_ROWS_SQL}) AS snapshot
+        WHERE rank = ?
+        """
+        return query_to_dataframe(query , params=[rank])
+
+    cached = analytics_cache.by_rank(rank)
+    if cached is not None:
+        return cached
     
     query = f"""
     SELECT
-        rank, name, price, one_hour_change as '1h_change',
+        rank, name, symbol, price, one_hour_change as '1h_change',
         twenty_four_hour_change as '24h_change', seven_day_change as '7d_change',
         market_cap, volume_24h, circulating_supply, scraped_at
     FROM {TABLE_NAME}
-    WHERE rank = {rank};
+    WHERE rank = ?
+    ORDER BY scraped_at;
     """
-    return query_to_dataframe(query)
+    return query_to_dataframe(query , params=[rank])
+
+
+def get_crypto_by_symbol(symbol: str) -> pd.DataFrame:
+    """
+        Current row(s) of the coin(s) listed under a ticker (case-insensitive).
+
+        args:
+            symbol : ticker, e.g. 'BTC'
+        Returns:
+            Dataframe with one row per coin using the ticker.
+    """
+    market = market_cache.get_latest_market()
+    if market is not None:
+        return _market_frame(market.by_symbol(symbol))
+
+    query = f"""
+    SELECT
+        rank, name, symbol, price, one_hour_change as '1h_change',
+        twenty_four_hour_change as '24h_change', seven_day_change as '7d_change',
+        market_cap, volume_24h, circulating_supply, scraped_at
+    FROM ({LATEST_SNAPSHOT_ROWS_SQL}) AS snapshot
+    WHERE UPPER(LTRIM(RTRIM(symbol))) = ?
+    ORDER BY rank
+    """
+    return query_to_dataframe(query , params=[normalize_symbol(symbol)])
     
 
+def resolve_coin_id(coin: Union[int , str]) -> int:
+    """
+        Coin id of a Coin.id, exact name or ticker (names win over tickers).
+
+        Raises:
+            ValueError: when nothing matches, or a ticker is shared by several coins
+    """
+    if isinstance(coin , int):
+        return coin
+    index = get_coin_index()
+    if index is None:
+        raise ValueError("The coin index is not available.")
+
+    by_name = [coin_id for coin_id in index.search(coin)
+               if normalize_name(index.coins[coin_id][1]) == normalize_name(coin)]
+    matches = by_name or index.by_symbol(coin)
+    if not matches:
+        raise ValueError(f"Unknown coin '{coin}'.")
+    if len(matches) > 1:
+        listed = ", ".join(f"{coin_id} ({index.coins[coin_id][1]})" for coin_id in matches)
+        raise ValueError(f"'{coin}' matches several coins: {listed}. Pass the coin id instead.")
+    return matches[0]
+
+
+def _rollups_cover(start: Optional[datetime] , end: Optional[datetime]) -> bool:
+    """ True when every finished snapshot started in [start, end) is folded into the rollups."""
+    filters = ["s.finished_at IS NOT NULL"]
+    params: List = []
+    if start is not None:
+        filters.append("s.started_at >= ?")
+        params.append(start)
+    if end is not None:
+        filters.append("s.started_at < ?")
+        params.append(end)
+    df = query_to_dataframe(f"""
+    SELECT COUNT(*) AS missing
+    FROM {SNAPSHOT_TABLE} s
+    WHERE {' AND '.join(filters)}
+      AND NOT EXISTS (SELECT 1 FROM {SNAPSHOT_TOTALS_TABLE} t WHERE t.snapshot_id = s.id)
+    """ , params=params)
+    return not df.empty and int(df['missing'].iloc[0]) == 0
+
+
+def get_price_history(coin: Union[int , str] , start: Optional[datetime] = None , end: Optional[datetime] = None ,
+                      interval: Union[str , int , timedelta] = '1h') -> pd.DataFrame:
+    """
+        OHLC price history of one coin, bucketed by SQL Server.
+
+        Only one row per bucket leaves the database, so a year of minute-level
+        snapshots comes back as ~8,760 hourly rows instead of ~500,000 raw ones.
+        Rows are read through the (coin_id, snapshot_id) index.
+
+        Hourly and daily intervals are read straight from the CoinHourly/CoinDaily
+        rollups (finished snapshots only) when start and end fall on bucket
+        boundaries and every snapshot of the range is rolled up; other intervals,
+        and ranges the rollups do not cover yet, bucket the raw rows.
+
+        In delta mode unchanged prices are not stored, so the raw buckets of quiet
+        periods are missing; forward-fill the result if a continuous series is needed.
+
+        Args:
+            coin: Coin.id, exact name ('Bitcoin') or ticker ('BTC')
+            start: first scrape time included (default: the beginning)
+            end: scrape times before this one are included (default: no limit)
+            interval: bucket width: pandas offset string ('5min', '1h', '1D'),
+                      seconds, or timedelta
+        Returns:
+            DataFrame indexed by bucket start with float64 open, high, low, close,
+            market_cap and volume_24h (last values of the bucket) and int samples.
+    """
+    seconds = int(interval if isinstance(interval , int) else pd.Timedelta(interval).total_seconds())
+    if seconds <= 0:
+        raise ValueError("Interval must be positive.")
+    coin_id = resolve_coin_id(coin)
+
+    filters = ["coin_id = ?"]
+    params: List = [coin_id]
+    if start is not None:
+        filters.append("scraped_at >= ?")
+        params.append(start)
+    if end is not None:
+        filters.append("scraped_at < ?")
+        params.append(end)
+
+    df = None
+    rollup = PRICE_HISTORY_ROLLUPS.get(seconds)
+    if rollup and all(bound is None or (bound - PRICE_HISTORY_ORIGIN).total_seconds() % seconds == 0
+                      for bound in (start , end)) and _rollups_cover(start , end):
+        df = query_to_dataframe(f"""
+        SELECT period_start AS bucket, open_price AS [open], max_price AS high, min_price AS low,
+               close_price AS [close], market_cap, volume_24h, samples
+        FROM {rollup}
+        WHERE {' AND '.join(filters).replace('scraped_at' , 'period_start')}
+        ORDER BY period_start
+        """ , params=params)
+
+    origin = PRICE_HISTORY_ORIGIN.strftime('%Y-%m-%d')
+    query = f"""
+    WITH points AS (
+        SELECT scraped_at, price, market_cap, volume_24h,
+               DATEADD(second, CAST(DATEDIFF_BIG(second, '{origin}', scraped_at) / {seconds} * {seconds} AS INT), '{origin}') AS bucket
+        FROM {TABLE_NAME}
+        WHERE {' AND '.join(filters)}
+    ),
+    ranked AS (
+        SELECT *,
+               ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY scraped_at) AS from_start,
+               ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY scraped_at DESC) AS from_end
+        FROM points
+    )
+    SELECT bucket,
+           MAX(CASE WHEN from_start = 1 THEN price END) AS [open],
+           MAX(price) AS high,
+           MIN(price) AS low,
+           MAX(CASE WHEN from_end = 1 THEN price END) AS [close],
+           MAX(CASE WHEN from_end = 1 THEN market_cap END) AS market_cap,
+           MAX(CASE WHEN from_end = 1 THEN volume_24h END) AS volume_24h,
+           COUNT(*) AS samples
+    FROM ranked
+    GROUP BY bucket
+    ORDER BY bucket
+    """
+    if df is None or df.empty:
+        df = query_to_dataframe(query , params=params)
+    if df.empty:
+        return pd.DataFrame(columns=PRICE_HISTORY_COLUMNS + ['samples'] , index=pd.DatetimeIndex([] , name='bucket'))
+
+    # DECIMAL columns arrive as objects; keep the result numpy-backed
+    df[PRICE_HISTORY_COLUMNS] = df[PRICE_HISTORY_COLUMNS].apply(pd.to_numeric , errors='coerce').astype('float64')
+    df['samples'] = df['samples'].astype('int32')
+    df['bucket'] = pd.to_datetime(df['bucket'])
+    return df.set_index('bucket')
+
+
 if __name__=='__main__':
 
     # Setup Logging for standalone Execution